@@ -8,12 +8,24 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+"""Monitors the CPU usage.
 
+Without options, CPU snapshots are captured interactively and plotted. With
+--output, the CPU and memory usage of named processes is sampled in the
+background until the --duration has passed or the script is interrupted, and
+dumped to a file, see cpu_sampler.py.
+"""
+
+import optparse
+import os
 import psutil
+import signal
 import sys
+import time
 
 import numpy
-from matplotlib import pyplot
+
+import cpu_sampler
 
 
 class CpuSnapshot(object):
@@ -49,7 +61,72 @@ def GrabCpuSamples(sample_count):
   return snapshot
 
 
+def _ParseArgs():
+  parser = optparse.OptionParser()
+  parser.add_option('--output',
+                    help='sample in the background and dump to this file')
+  parser.add_option('--process_names', default='',
+                    help='comma separated names of the processes to sample')
+  parser.add_option('--interval', type='float', default=0.1,
+                    help='time between samples in seconds (default: %default)')
+  parser.add_option('--capacity', type='int', default=1 << 20,
+                    help='number of rows in the ring buffer (default: %default)')
+  parser.add_option('--phases', default='',
+                    help=('comma separated labels of the phases; SIGUSR1 '
+                          'advances to the next one'))
+  parser.add_option('--duration', type='float', default=0,
+                    help='seconds to sample for (default: until interrupted)')
+  options, _ = parser.parse_args()
+  if not options.output and (options.process_names or options.phases or
+                             options.duration):
+    parser.error('--output is required for background sampling.')
+  return options
+
+
+def _Split(names):
+  return [name for name in names.split(',') if name]
+
+
+def RunSampler(options):
+  sampler = cpu_sampler.CpuSampler(_Split(options.process_names),
+                                   interval=options.interval,
+                                   capacity=options.capacity,
+                                   phases=_Split(options.phases))
+  sampler.InstallSignalHandler()
+  # Dump the samples when terminated as well as when interrupted.
+  signal.signal(signal.SIGTERM, signal.default_int_handler)
+  print ('Sampling every %s s; send SIGUSR1 to process %d to start the next '
+         'phase.' % (options.interval, os.getpid()))
+  sampler.Start()
+  try:
+    # Signals like SIGUSR1 end a sleep early, so sleep until the end time.
+    end_time = options.duration and time.time() + options.duration
+    while not end_time or time.time() < end_time:
+      time.sleep(max(end_time - time.time(), 0) if end_time else 1)
+  except KeyboardInterrupt:
+    pass
+  sampler.Stop()
+  sampler.Dump(options.output)
+
+  metadata, samples = cpu_sampler.LoadDump(options.output)
+  print 'Wrote %d samples to %s' % (len(samples), options.output)
+  for phase, pid, tid, cpu_percent, max_rss in cpu_sampler.Summarize(
+      metadata, samples):
+    if tid:
+      continue
+    name = metadata['processes'].get(str(pid), {'name': 'system'})['name']
+    print '%s: %s (%d): cpu=%.1f%%, max_rss=%d' % (phase, name, pid,
+                                                   cpu_percent, max_rss)
+  return 0
+
+
 def main():
+  options = _ParseArgs()
+  if options.output:
+    return RunSampler(options)
+
+  from matplotlib import pyplot
+
   print 'How many seconds to capture per snapshot (enter for 60)?'
   sample_count = raw_input().strip()
   if len(sample_count) > 0 and int(sample_count) > 0:
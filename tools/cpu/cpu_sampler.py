@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Background sampler of the CPU and memory usage of named processes.
+
+Every interval the sampler records one row for the whole system, one per
+matching process and one per thread of each matching process into a
+preallocated ring buffer. Rows hold cumulative CPU times, so sampling does not
+block and the CPU usage is derived offline from the difference between
+samples. Each row is tagged with the current phase, set with SetPhase() or by
+sending SIGUSR1 to advance to the next phase.
+
+The buffer is dumped as a small JSON header followed by the raw rows, see
+Dump() and LoadDump().
+"""
+
+import json
+import signal
+import struct
+import threading
+import time
+
+import numpy
+import psutil
+
+# One row of the ring buffer. The pid is 0 for the system-wide row and the tid
+# is 0 for the rows of whole processes. CPU times are in seconds. RSS is in
+# bytes; it is the used physical memory for the system-wide row and 0 for the
+# rows of threads.
+SAMPLE_DTYPE = numpy.dtype([
+    ('time', '<f8'),
+    ('phase', '<u2'),
+    ('pid', '<i4'),
+    ('tid', '<i4'),
+    ('user', '<f8'),
+    ('system', '<f8'),
+    ('rss', '<u8'),
+])
+
+_DUMP_MAGIC = 'CPUSAMP1'
+
+# How often to look for new matching processes, in seconds.
+_PROCESS_SCAN_INTERVAL = 1.0
+
+
+class CpuSampler(object):
+  def __init__(self, process_names, interval=0.1, capacity=1 << 20,
+               phases=None):
+    """Constructor.
+
+    Args:
+      process_names: Names of the processes to sample, e.g. 'voe_cmd_test'.
+      interval: Time between samples, in seconds.
+      capacity: Number of rows in the ring buffer. When it is full, the oldest
+          rows are overwritten.
+      phases: Labels of the phases SIGUSR1 advances through. Phases set with
+          SetPhase() are added to the list.
+    """
+    self.process_names = set(process_names)
+    self.interval = interval
+    self.phases = list(phases or ['default'])
+    self._phase = 0
+    self._samples = numpy.zeros(capacity, dtype=SAMPLE_DTYPE)
+    self._row_count = 0
+    self._processes = {}
+    self._process_info = {}
+    self._thread_names = {}
+    self._last_scan = None
+    self._stop = threading.Event()
+    self._thread = None
+
+  def Start(self):
+    """Starts sampling in a background thread."""
+    self._stop.clear()
+    self._thread = threading.Thread(target=self._Run, name='CpuSampler')
+    self._thread.daemon = True
+    self._thread.start()
+
+  def Stop(self):
+    """Stops sampling, after the sample in progress."""
+    self._stop.set()
+    if self._thread:
+      self._thread.join()
+      self._thread = None
+
+  def SetPhase(self, label):
+    """Tags the following samples with a phase label."""
+    if label not in self.phases:
+      self.phases.append(label)
+    self._phase = self.phases.index(label)
+
+  def NextPhase(self, *_):
+    """Advances to the next phase; usable as a signal handler."""
+    if self._phase + 1 == len(self.phases):
+      self.phases.append('phase_%d' % len(self.phases))
+    self._phase += 1
+
+  def InstallSignalHandler(self, signal_number=signal.SIGUSR1):
+    """Makes a signal advance to the next phase."""
+    signal.signal(signal_number, self.NextPhase)
+
+  def Samples(self):
+    """Returns the rows in the ring buffer, oldest first."""
+    capacity = len(self._samples)
+    if self._row_count <= capacity:
+      return self._samples[:self._row_count].copy()
+    start = self._row_count % capacity
+    return numpy.concatenate((self._samples[start:], self._samples[:start]))
+
+  def Metadata(self):
+    """Returns the information needed to interpret the rows."""
+    return {
+        'interval': self.interval,
+        'phases': self.phases,
+        'processes': dict((str(pid), info)
+                          for pid, info in self._process_info.iteritems()),
+        'threads': dict((str(tid), name)
+                        for tid, name in self._thread_names.iteritems()),
+        'dropped_rows': max(self._row_count - len(self._samples), 0),
+    }
+
+  def Dump(self, file_name):
+    """Writes the metadata and the rows to a file, see LoadDump()."""
+    header = json.dumps(self.Metadata())
+    with open(file_name, 'wb') as dump_file:
+      dump_file.write(_DUMP_MAGIC)
+      dump_file.write(struct.pack('<I', len(header)))
+      dump_file.write(header)
+      self.Samples().tofile(dump_file)
+
+  def Sample(self):
+    """Records one sample of the system and of the matching processes."""
+    now = time.time()
+    if (self._last_scan is None or
+        now - self._last_scan > _PROCESS_SCAN_INTERVAL):
+      self._ScanProcesses()
+      self._last_scan = now
+
+    cpu_times = psutil.cpu_times()
+    self._AddRow(now, 0, 0, cpu_times.user, cpu_times.system,
+                 psutil.virtual_memory().used)
+    for pid, process in self._processes.items():
+      try:
+        process_times = process.cpu_times()
+        rss = process.memory_info().rss
+        threads = process.threads()
+      except (psutil.NoSuchProcess, psutil.AccessDenied):
+        del self._processes[pid]
+        continue
+      self._AddRow(now, pid, 0, process_times.user, process_times.system, rss)
+      for thread in threads:
+        if thread.id not in self._thread_names:
+          self._thread_names[thread.id] = _ThreadName(pid, thread.id)
+        self._AddRow(now, pid, thread.id, thread.user_time, thread.system_time,
+                     0)
+
+  def _Run(self):
+    next_sample = time.time()
+    while not self._stop.is_set():
+      self.Sample()
+      # Schedule by absolute time, so the time spent sampling does not add up.
+      next_sample += self.interval
+      self._stop.wait(max(next_sample - time.time(), 0))
+
+  def _AddRow(self, now, pid, tid, user, system, rss):
+    self._samples[self._row_count % len(self._samples)] = (
+        now, self._phase, pid, tid, user, system, rss)
+    self._row_count += 1
+
+  def _ScanProcesses(self):
+    for process in psutil.process_iter():
+      if process.pid in self._processes:
+        continue
+      try:
+        name = process.name()
+        if name not in self.process_names:
+          continue
+        self._process_info[process.pid] = {
+            'name': name, 'cmdline': ' '.join(process.cmdline())}
+      except (psutil.NoSuchProcess, psutil.AccessDenied):
+        continue
+      self._processes[process.pid] = process
+
+
+def _ThreadName(pid, tid):
+  """Returns the name of a thread, where the platform exposes it."""
+  try:
+    with open('/proc/%d/task/%d/comm' % (pid, tid)) as comm_file:
+      return comm_file.read().strip()
+  except IOError:
+    return ''
+
+
+def LoadDump(file_name):
+  """Reads a file written by CpuSampler.Dump().
+
+  Returns:
+    A tuple of the metadata dict and the numpy array of SAMPLE_DTYPE rows.
+  """
+  with open(file_name, 'rb') as dump_file:
+    if dump_file.read(len(_DUMP_MAGIC)) != _DUMP_MAGIC:
+      raise ValueError('%s is not a CPU sampler dump.' % file_name)
+    header_size = struct.unpack('<I', dump_file.read(4))[0]
+    metadata = json.loads(dump_file.read(header_size))
+    samples = numpy.fromfile(dump_file, dtype=SAMPLE_DTYPE)
+  return metadata, samples
+
+
+def Summarize(metadata, samples):
+  """Computes the average CPU usage and peak RSS per phase.
+
+  The CPU usage of a row is its CPU time since the previous row of the same
+  process or thread, divided by the elapsed time.
+
+  Returns:
+    A list of (phase, pid, tid, cpu_percent, max_rss) tuples, where the pid
+    and tid are 0 for the system and for whole processes. The system CPU usage
+    is summed over all cores.
+  """
+  # Difference each row with the previous row of its process or thread.
+  samples = samples[numpy.lexsort((samples['time'], samples['tid'],
+                                   samples['pid']))]
+  cpu = samples['user'] + samples['system']
+  same_series = ((samples['pid'][1:] == samples['pid'][:-1]) &
+                 (samples['tid'][1:] == samples['tid'][:-1]))
+  cpu_delta = numpy.diff(cpu)[same_series]
+  time_delta = numpy.diff(samples['time'])[same_series]
+  rows = samples[1:][same_series]
+  if not len(rows):
+    return []
+
+  # Sum up the differences of each phase of each process or thread.
+  order = numpy.lexsort((rows['tid'], rows['pid'], rows['phase']))
+  rows, cpu_delta, time_delta = rows[order], cpu_delta[order], time_delta[order]
+  group_starts = numpy.flatnonzero(numpy.concatenate(([True], (
+      (rows['phase'][1:] != rows['phase'][:-1]) |
+      (rows['pid'][1:] != rows['pid'][:-1]) |
+      (rows['tid'][1:] != rows['tid'][:-1])))))
+  cpu_time = numpy.add.reduceat(cpu_delta, group_starts)
+  elapsed = numpy.add.reduceat(time_delta, group_starts)
+  max_rss = numpy.maximum.reduceat(rows['rss'], group_starts)
+
+  summary = []
+  for index, start in enumerate(group_starts):
+    if not elapsed[index]:
+      continue
+    row = rows[start]
+    summary.append((metadata['phases'][row['phase']], int(row['pid']),
+                    int(row['tid']), 100.0 * cpu_time[index] / elapsed[index],
+                    int(max_rss[index])))
+  return summary
@@ -10,13 +10,16 @@
 """Script for constraining traffic on the local machine."""
 
 
+import copy
 import logging
 import optparse
 import socket
 import sys
 
 import config
+import netem_backend
 import network_emulator
+import network_trace
 
 
 _DEFAULT_LOG_LEVEL = logging.INFO
@@ -95,9 +98,33 @@ def _parse_args():
   parser.add_option('--target-ip', default=None,
                     help=('The interface IP address to apply the rules for. '
                           'Default: the external facing interface IP address.'))
+  parser.add_option('--backend', type='choice', choices=['dummynet', 'netem'],
+                    default='dummynet',
+                    help=('How to constrain the network: dummynet (ipfw) or '
+                          'netem (Linux tc). Default: %default'))
+  parser.add_option('--interface', default=None,
+                    help=('The network interface to constrain with netem. '
+                          'Default: the interface of the target IP address, '
+                          'or lo in a network namespace.'))
+  parser.add_option('--namespace', action='store_true', default=False,
+                    help=('Constrain the loopback interface of a new network '
+                          'namespace instead of the host network. Does not '
+                          'require root privileges. Implies --backend=netem '
+                          'and --target-ip=127.0.0.1.'))
+  parser.add_option('--namespace-pid', type='int', default=None,
+                    help=('Constrain the network namespace of an existing '
+                          'process instead of the host network. Implies '
+                          '--backend=netem.'))
+  parser.add_option('--trace', default=None,
+                    help=('Play back a file of timestamped bandwidth, delay, '
+                          'loss and queue changes instead of applying a '
+                          'preset. See network_trace.py for the format.'))
+  parser.add_option('--timeline', default=None,
+                    help=('File to write the actually applied timeline of '
+                          'the --trace playback to.'))
   parser.add_option('-v', '--verbose', action='store_true', default=False,
                     help=('Turn on verbose output. Will print all \'ipfw\' '
-                          'commands that are executed.'))
+                          'and \'tc\' commands that are executed.'))
 
   options = parser.parse_args()[0]
 
@@ -105,6 +132,13 @@ def _parse_args():
   if options.preset and not _PRESETS_DICT.has_key(options.preset):
     parser.error('Invalid preset: %s' % options.preset)
 
+  if options.namespace and options.namespace_pid:
+    parser.error('--namespace and --namespace-pid are mutually exclusive.')
+  if options.namespace or options.namespace_pid:
+    options.backend = 'netem'
+  if options.namespace and not options.target_ip:
+    options.target_ip = '127.0.0.1'
+
   # Simple validation of the IP address, if supplied.
   if options.target_ip:
     try:
@@ -135,12 +169,41 @@ def _set_logger(verbose):
   logging.basicConfig(level=log_level, format='%(message)s')
 
 
+def _create_backend(options, target_ip, namespace_pid):
+  """Creates the network emulation backend selected by the options."""
+  if options.backend == 'dummynet':
+    return network_emulator.DummynetBackend()
+  interface = options.interface
+  if not interface:
+    if namespace_pid:
+      interface = 'lo'
+    else:
+      interface = netem_backend.find_interface(target_ip)
+  return netem_backend.NetemBackend(interface, namespace_pid=namespace_pid)
+
+
+def _log_connection_config(connection_config):
+  logging.info('  Receive bandwidth: %s kbps (%s kB/s)\n'
+               '  Send bandwidth   : %s kbps (%s kB/s)\n'
+               '  Delay            : %s ms\n'
+               '  Packet loss      : %s %%\n'
+               '  Queue slots      : %s',
+               connection_config.receive_bw_kbps,
+               connection_config.receive_bw_kbps/8,
+               connection_config.send_bw_kbps,
+               connection_config.send_bw_kbps/8,
+               connection_config.delay_ms,
+               connection_config.packet_loss_percent,
+               connection_config.queue_slots)
+
+
 def _main():
   options = _parse_args()
 
   # Build a configuration object. Override any preset configuration settings if
-  # a value of a setting was also given as a flag.
-  connection_config = _PRESETS_DICT[options.preset]
+  # a value of a setting was also given as a flag. The preset is copied, so it
+  # keeps its own values when it is switched to later on.
+  connection_config = copy.copy(_PRESETS_DICT[options.preset])
   if options.receive_bw is not _DEFAULT_PRESET.receive_bw_kbps:
     connection_config.receive_bw_kbps = options.receive_bw
   if options.send_bw is not _DEFAULT_PRESET.send_bw_kbps:
@@ -151,45 +214,111 @@ def _main():
     connection_config.packet_loss_percent = options.packet_loss
   if options.queue is not _DEFAULT_PRESET.queue_slots:
     connection_config.queue_slots = options.queue
-  emulator = network_emulator.NetworkEmulator(connection_config,
-                                              options.port_range)
-  try:
-    emulator.check_permissions()
-  except network_emulator.NetworkEmulatorError as e:
-    logging.error('Error: %s\n\nCause: %s', e.fail_msg, e.error)
-    return -1
+
+  trace = None
+  if options.trace:
+    try:
+      trace = network_trace.read_trace(options.trace)
+    except network_emulator.NetworkEmulatorError as e:
+      logging.error('Error: %s', e.fail_msg)
+      return -1
+    connection_config = trace[0][1]
 
   if not options.target_ip:
     external_ip = _get_external_ip()
   else:
     external_ip = options.target_ip
 
+  namespace = None
+  namespace_pid = options.namespace_pid
+  try:
+    if options.namespace:
+      namespace = netem_backend.create_namespace()
+      namespace_pid = namespace.pid
+      logging.info('Created network namespace. Run commands in it with:\n  %s '
+                   '<command>',
+                   ' '.join(netem_backend.namespace_command(namespace_pid)))
+    return _emulate(options, connection_config, external_ip, namespace_pid,
+                    trace)
+  except network_emulator.NetworkEmulatorError as e:
+    logging.error('Error: %s\n\nCause: %s', e.fail_msg, e.error)
+    return -1
+  finally:
+    if namespace:
+      namespace.stdin.close()
+      namespace.wait()
+
+
+def _play_trace(emulator, trace, timeline_file_name):
+  """Plays back a trace until its end or until interrupted with Ctrl-C."""
+  player = network_trace.TracePlayer(emulator, trace)
+  logging.info('Playing back %d trace entries over %s ms. Press Ctrl-C to '
+               'abort Network Emulation...', len(trace),
+               trace[-1][0] - trace[0][0])
+  try:
+    player.play()
+  except KeyboardInterrupt:
+    logging.info('Trace playback interrupted.')
+  network_trace.log_timeline_summary(player.timeline)
+  if timeline_file_name:
+    network_trace.write_timeline(timeline_file_name, player.timeline)
+    logging.info('Wrote the applied timeline to %s', timeline_file_name)
+
+
+def _emulate(options, connection_config, external_ip, namespace_pid, trace):
+  emulator = network_emulator.NetworkEmulator(
+      connection_config, options.port_range,
+      _create_backend(options, external_ip, namespace_pid))
+  try:
+    emulator.check_permissions()
+  except network_emulator.NetworkEmulatorError as e:
+    logging.error('Error: %s\n\nCause: %s', e.fail_msg, e.error)
+    return -1
+
   logging.info('Constraining traffic to/from IP: %s', external_ip)
+  cleaned_up = False
   try:
-    emulator.emulate(external_ip)
-    logging.info('Started network emulation with the following configuration:\n'
-                 '  Receive bandwidth: %s kbps (%s kB/s)\n'
-                 '  Send bandwidth   : %s kbps (%s kB/s)\n'
-                 '  Delay            : %s ms\n'
-                 '  Packet loss      : %s %%\n'
-                 '  Queue slots      : %s',
-                 connection_config.receive_bw_kbps,
-                 connection_config.receive_bw_kbps/8,
-                 connection_config.send_bw_kbps,
-                 connection_config.send_bw_kbps/8,
-                 connection_config.delay_ms,
-                 connection_config.packet_loss_percent,
-                 connection_config.queue_slots)
-    logging.info('Affected traffic: IP traffic on ports %s-%s',
-                 options.port_range[0], options.port_range[1])
-    raw_input('Press Enter to abort Network Emulation...')
-    logging.info('Flushing all Dummynet rules...')
-    network_emulator.cleanup()
+    try:
+      emulator.emulate(external_ip)
+      logging.info('Started network emulation with the following '
+                   'configuration:')
+      _log_connection_config(connection_config)
+      logging.info('Affected traffic: IP traffic on ports %s-%s',
+                   options.port_range[0], options.port_range[1])
+      # Switch between presets without recreating the pipes until aborted.
+      while not trace:
+        preset = raw_input('Enter a preset ID to switch to it, or press Enter '
+                           'to abort Network Emulation...').strip()
+        if not preset:
+          break
+        if not preset.isdigit() or int(preset) not in _PRESETS_DICT:
+          logging.error('Invalid preset: %s', preset)
+          continue
+        emulator.set_connection_config(_PRESETS_DICT[int(preset)])
+        logging.info('Switched network emulation to preset %s:', preset)
+        _log_connection_config(emulator.connection_config)
+      if trace:
+        _play_trace(emulator, trace, options.timeline)
+    finally:
+      # The rules are also removed if setting them up or changing them failed,
+      # or if the emulation was interrupted, so none are left behind.
+      cleaned_up = _cleanup(emulator)
     logging.info('Completed Network Emulation.')
-    return 0
   except network_emulator.NetworkEmulatorError as e:
     logging.error('Error: %s\n\nCause: %s', e.fail_msg, e.error)
     return -2
+  return 0 if cleaned_up else -2
+
+
+def _cleanup(emulator):
+  """Removes the network emulation rules, logging any failure."""
+  logging.info('Removing the network emulation rules...')
+  try:
+    emulator.cleanup()
+  except network_emulator.NetworkEmulatorError as e:
+    logging.error('Error: %s\n\nCause: %s', e.fail_msg, e.error)
+    return False
+  return True
 
 if __name__ == '__main__':
   sys.exit(_main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+#  Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+import logging
+import optparse
+import unittest
+
+import config
+import emulate
+import network_emulator
+
+
+class FakeBackend(network_emulator.Backend):
+
+  def __init__(self, fail_in):
+    self.fail_in = fail_in
+    self.calls = []
+
+  def _call(self, name):
+    self.calls.append(name)
+    if name == self.fail_in:
+      raise network_emulator.NetworkEmulatorError('%s failed' % name)
+
+  def check_permissions(self):
+    self._call('check_permissions')
+
+  def emulate(self, connection_config, target_ip, port_range):
+    self._call('emulate')
+
+  def update(self, connection_config):
+    self._call('update')
+
+  def cleanup(self):
+    self._call('cleanup')
+
+
+class EmulateTest(unittest.TestCase):
+
+  def setUp(self):
+    logging.disable(logging.CRITICAL)
+    self.create_backend = emulate._create_backend
+    self.options = optparse.Values({'port_range': (5000, 6000),
+                                    'timeline': None})
+    self.trace = [
+        (0, config.ConnectionConfig(1, 'First', 1000, 500, 40, 0, 100)),
+        (1, config.ConnectionConfig(2, 'Second', 0, 0, 40, 0, 100))]
+
+  def tearDown(self):
+    emulate._create_backend = self.create_backend
+    logging.disable(logging.NOTSET)
+
+  def run_emulate(self, backend):
+    emulate._create_backend = lambda options, target_ip, pid: backend
+    return emulate._emulate(self.options, self.trace[0][1], '127.0.0.1', None,
+                            self.trace)
+
+  def test_rules_are_removed_after_trace(self):
+    backend = FakeBackend(fail_in=None)
+    self.assertEqual(0, self.run_emulate(backend))
+    self.assertEqual(['check_permissions', 'emulate', 'update', 'cleanup'],
+                     backend.calls)
+
+  def test_rules_are_removed_if_emulate_fails(self):
+    backend = FakeBackend(fail_in='emulate')
+    self.assertEqual(-2, self.run_emulate(backend))
+    self.assertEqual('cleanup', backend.calls[-1])
+
+  def test_rules_are_removed_if_update_fails(self):
+    backend = FakeBackend(fail_in='update')
+    self.assertEqual(-2, self.run_emulate(backend))
+    self.assertEqual('cleanup', backend.calls[-1])
+
+  def test_failed_cleanup_is_reported(self):
+    backend = FakeBackend(fail_in='cleanup')
+    self.assertEqual(-2, self.run_emulate(backend))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+#  Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+"""Network emulation backend using the Linux traffic control (tc) and netem.
+
+The send pipe is a netem qdisc on the egress of the network interface. Since
+qdiscs only shape outgoing traffic, the incoming traffic of the interface is
+redirected to an IFB device whose egress holds the receive pipe. On both
+devices a prio qdisc sends the traffic matching the target IP and port range
+to the netem band and everything else to an unconstrained band:
+
+  root 1: prio --- 1:1 --- 10: netem   (filter match)
+                \-- 1:2 --- pfifo       (all other traffic)
+
+Each change is applied with a single 'tc -batch' process, so reconfiguring
+both pipes mid-run only takes a few milliseconds and does not touch the
+filters.
+
+Instead of the host network, the backend can constrain a network namespace
+owned by the current user, see create_namespace(). This does not require
+root privileges and allows the emulation to be tested locally over the
+loopback interface.
+"""
+
+import logging
+import os
+import re
+import socket
+import struct
+import subprocess
+
+from network_emulator import Backend, NetworkEmulatorError
+
+_DEFAULT_IFB_DEVICE = 'ifb0'
+
+# Handles of the qdiscs and classes created on each device.
+_ROOT_HANDLE = '1:'
+_NETEM_CLASS = '1:1'
+_NETEM_HANDLE = '10:'
+_INGRESS_HANDLE = 'ffff:'
+
+_IPPROTO_TCP = 6
+_IPPROTO_UDP = 17
+
+# The size of an IPv4 header without options.
+_IP_HEADER_SIZE = 20
+
+
+class NetemBackend(Backend):
+  """Backend constraining the network using tc and netem."""
+
+  def __init__(self, interface, ifb_device=_DEFAULT_IFB_DEVICE,
+               namespace_pid=None):
+    """Constructor.
+
+    Args:
+        interface: The network interface carrying the traffic of the target IP.
+        ifb_device: The name of the IFB device created for the receive pipe.
+        namespace_pid: The PID of a process in the network namespace to
+            constrain, see create_namespace(). Defaults to the host network.
+    """
+    self._interface = interface
+    self._ifb_device = ifb_device
+    self._namespace_pid = namespace_pid
+
+  def check_permissions(self):
+    """Checks if permissions are available to run tc commands.
+
+    Raises:
+      NetworkEmulatorError: If permissions to run tc commands are not
+      available.
+    """
+    if self._namespace_pid is None and os.getuid() != 0:
+      raise NetworkEmulatorError('You must run this script with sudo or '
+                                 'constrain a network namespace instead.')
+
+  def emulate(self, connection_config, target_ip, port_range):
+    """Starts a network emulation by setting up netem qdiscs and filters."""
+    self._run_batch('ip', ['link add %s type ifb' % self._ifb_device,
+                           'link set dev %s up' % self._ifb_device],
+                    'Failed to create the IFB device. Make sure the ifb '
+                    'module is loaded (sudo modprobe ifb).')
+    send_match = _build_match(target_ip, 12, port_range)
+    receive_match = _build_match(target_ip, 16, port_range)
+    commands = (
+        _pipe_commands(self._interface, send_match,
+                       _netem_options(connection_config.send_bw_kbps,
+                                      connection_config)) +
+        ['qdisc add dev %s handle %s ingress' % (self._interface,
+                                                 _INGRESS_HANDLE),
+         'filter add dev %s parent %s protocol ip prio 1 matchall action '
+         'mirred egress redirect dev %s' % (self._interface, _INGRESS_HANDLE,
+                                            self._ifb_device)] +
+        _pipe_commands(self._ifb_device, receive_match,
+                       _netem_options(connection_config.receive_bw_kbps,
+                                      connection_config)))
+    self._run_batch('tc', commands,
+                    'Failed to create the netem pipes. Make sure the sch_netem '
+                    'and sch_prio modules are available.')
+
+  def update(self, connection_config):
+    """Changes the netem qdiscs in place, keeping the filters."""
+    self._run_batch('tc', [
+        _change_netem_command(
+            self._interface,
+            _netem_options(connection_config.send_bw_kbps, connection_config)),
+        _change_netem_command(
+            self._ifb_device,
+            _netem_options(connection_config.receive_bw_kbps,
+                           connection_config)),
+        ], 'Failed to change the netem pipes.')
+
+  def cleanup(self):
+    """Removes the qdiscs and the IFB device created by emulate()."""
+    # The IFB device is also removed if emulate() failed before creating all
+    # of the qdiscs.
+    try:
+      self._run_batch('tc', ['qdisc del dev %s root' % self._interface,
+                             'qdisc del dev %s ingress' % self._interface],
+                      'Failed to remove the netem pipes.')
+    finally:
+      self._run_batch('ip', ['link del %s' % self._ifb_device],
+                      'Failed to remove the IFB device.')
+
+  def _run_batch(self, tool, commands, fail_msg):
+    command_prefix = []
+    if self._namespace_pid is not None:
+      command_prefix = namespace_command(self._namespace_pid)
+    return _run_batch_command(command_prefix + [tool, '-batch', '-'], commands,
+                              fail_msg)
+
+
+def create_namespace():
+  """Starts a process in new user and network namespaces.
+
+  The namespaces are owned by the current user, who is root inside of them, so
+  they can be constrained by a NetemBackend without root privileges on the
+  host. Only the loopback interface, which is brought up, is available in the
+  network namespace. Since traffic over the loopback interface leaves and
+  enters the same interface, each packet passes through both the send and the
+  receive pipe.
+
+  Return:
+      (subprocess.Popen): The process holding the namespaces. Its pid can be
+          passed to NetemBackend and namespace_command(). The namespaces are
+          removed once its stdin is closed.
+  Raises:
+      NetworkEmulatorError: If the namespaces could not be created.
+  """
+  cmd_list = ['unshare', '--user', '--map-root-user', '--net', 'sh', '-c',
+              'ip link set dev lo up && echo ready && exec cat > /dev/null']
+  logging.debug('Running command: %s', ' '.join(cmd_list))
+  process = subprocess.Popen(cmd_list, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  # Wait for the loopback interface to be up before the namespace is used.
+  if process.stdout.readline().strip() != 'ready':
+    output, error = process.communicate()
+    raise NetworkEmulatorError('Failed to create the network namespace.',
+                               ' '.join(cmd_list), process.returncode, output,
+                               error)
+  return process
+
+
+def namespace_command(pid):
+  """Returns the command prefix running a command in a network namespace.
+
+  Args:
+      pid: The PID of a process in the network namespace.
+  Return:
+      (list of strings): The nsenter command to prefix the command with.
+  """
+  cmd_list = ['nsenter', '--target', str(pid), '--net']
+  if os.getuid() != 0:
+    # Unprivileged users need the capabilities they have in the user namespace
+    # owning the network namespace.
+    cmd_list.append('--user')
+  return cmd_list
+
+
+def find_interface(ip_address):
+  """Finds the network interface an IPv4 address is assigned to.
+
+  Args:
+      ip_address: The IP address.
+  Return:
+      (string): The name of the interface.
+  Raises:
+      NetworkEmulatorError: If the address is not assigned to any interface.
+  """
+  output = _run_batch_command(['ip', '-o', '-4', 'addr', 'show'], [],
+                              'Failed to list the network interfaces.')
+  # Lines look like '2: eth0    inet 192.168.1.2/24 brd ...'.
+  for match in re.finditer(r'^\d+:\s+(\S+)\s+inet\s+([\d.]+)/', output,
+                           re.MULTILINE):
+    if match.group(2) == ip_address:
+      return match.group(1)
+  raise NetworkEmulatorError('No network interface has the IP address %s.' %
+                             ip_address)
+
+
+def _netem_options(bandwidth_kbps, connection_config):
+  """Formats the netem options of a pipe.
+
+  Args:
+      bandwidth_kbps: The bandwidth of the pipe. 0 means unlimited, like for
+          Dummynet.
+      connection_config: A config.ConnectionConfig object containing the
+          remaining characteristics of the pipe.
+  Return:
+      (string): The netem options.
+  """
+  # The rate is always given: 'tc qdisc change' keeps the previous rate of the
+  # qdisc when it is omitted, and a rate of 0 removes the limit.
+  return 'delay %sms loss %s%% limit %s rate %skbit' % (
+      connection_config.delay_ms, connection_config.packet_loss_percent,
+      connection_config.queue_slots, bandwidth_kbps)
+
+
+def _build_match(ip_address, address_offset, port_range):
+  """Builds the ematch expression selecting the constrained traffic.
+
+  Like the Dummynet rules, the expression matches the TCP and UDP packets
+  from or to ip_address whose source or destination port is in port_range.
+
+  The ports are read relative to the network header, since the transport
+  header offset is not set yet for the packets redirected from the ingress of
+  the interface to the IFB device. Only IPv4 headers without options and
+  first fragments are matched, so the ports are at offsets 20 and 22.
+
+  Args:
+      ip_address: The IP address to match.
+      address_offset: The offset of the address in the IP header, 12 for the
+          source and 16 for the destination address.
+      port_range: Tuple containing two integers defining the port range.
+  Return:
+      (string): The quoted expression, for use with the 'basic' filter.
+  """
+  address = struct.unpack('!I', socket.inet_aton(ip_address))[0]
+
+  def port_in_range(offset):
+    return ('(not cmp(u16 at %d layer network lt %d) and '
+            'not cmp(u16 at %d layer network gt %d))' %
+            (offset, port_range[0], offset, port_range[1]))
+
+  return ("'cmp(u32 at %d layer network eq %d) and "
+          "cmp(u8 at 0 layer network mask 0x0f eq 5) and "
+          "cmp(u16 at 6 layer network mask 0x1fff eq 0) and "
+          "(cmp(u8 at 9 layer network eq %d) or "
+          "cmp(u8 at 9 layer network eq %d)) and (%s or %s)'" %
+          (address_offset, address, _IPPROTO_TCP, _IPPROTO_UDP,
+           port_in_range(_IP_HEADER_SIZE), port_in_range(_IP_HEADER_SIZE + 2)))
+
+
+def _pipe_commands(device, match, netem_options):
+  """Returns the tc commands creating a pipe on the egress of a device."""
+  return [
+      # All priorities map to the unconstrained second band.
+      'qdisc add dev %s root handle %s prio bands 2 priomap %s' %
+      (device, _ROOT_HANDLE, ' '.join(['1'] * 16)),
+      'qdisc add dev %s parent %s handle %s netem %s' %
+      (device, _NETEM_CLASS, _NETEM_HANDLE, netem_options),
+      'filter add dev %s parent %s protocol ip prio 1 basic match %s '
+      'flowid %s' % (device, _ROOT_HANDLE, match, _NETEM_CLASS),
+      ]
+
+
+def _change_netem_command(device, netem_options):
+  """Returns the tc command changing the pipe of a device."""
+  return 'qdisc change dev %s parent %s handle %s netem %s' % (
+      device, _NETEM_CLASS, _NETEM_HANDLE, netem_options)
+
+
+def _run_batch_command(cmd_list, commands, fail_msg=None):
+  """Executes a command, writing a list of commands to its stdin.
+
+  Args:
+    cmd_list: Command list to execute.
+    commands: List of command lines, for tools like 'tc -batch -'.
+    fail_msg: Message describing the error in case the command fails.
+
+  Raises:
+    NetworkEmulatorError: If command fails a message is set by the fail_msg
+    parameter.
+  """
+  cmd_string = ' '.join(cmd_list)
+  logging.debug('Running command: %s', cmd_string)
+  for command in commands:
+    logging.debug('  %s', command)
+  process = subprocess.Popen(cmd_list, stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  output, error = process.communicate(''.join(command + '\n'
+                                              for command in commands))
+  if process.returncode != 0:
+    raise NetworkEmulatorError(fail_msg, cmd_string, process.returncode, output,
+                               error)
+  return output.strip()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#  Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+import unittest
+
+import config
+import netem_backend
+
+
+class NetemBackendTest(unittest.TestCase):
+
+  def setUp(self):
+    self.batches = []
+    self.run_batch_command = netem_backend._run_batch_command
+    def record_batch(cmd_list, commands, fail_msg=None):
+      self.batches.append((cmd_list, commands))
+      return ''
+    netem_backend._run_batch_command = record_batch
+    self.backend = netem_backend.NetemBackend('eth0')
+
+  def tearDown(self):
+    netem_backend._run_batch_command = self.run_batch_command
+
+  def tc_commands(self):
+    return [command for cmd_list, commands in self.batches
+            if cmd_list[0] == 'tc' for command in commands]
+
+  def filter_command(self, device):
+    commands = [command for command in self.tc_commands()
+                if command.startswith('filter add dev %s ' % device) and
+                ' basic ' in command]
+    self.assertEqual(1, len(commands))
+    return commands[0]
+
+  def test_filters_match_ports_after_the_ip_header(self):
+    self.backend.emulate(config.ConnectionConfig(1, 'Test', 1000, 500, 40, 0,
+                                                 100),
+                         '192.168.1.2', (5000, 6000))
+    address = (192 << 24) + (168 << 16) + (1 << 8) + 2
+    send_filter = self.filter_command('eth0')
+    receive_filter = self.filter_command('ifb0')
+    self.assertIn('cmp(u32 at 12 layer network eq %d)' % address, send_filter)
+    self.assertIn('cmp(u32 at 16 layer network eq %d)' % address,
+                  receive_filter)
+    for match in (send_filter, receive_filter):
+      self.assertNotIn('layer transport', match)
+      self.assertIn('cmp(u8 at 0 layer network mask 0x0f eq 5)', match)
+      for offset in (20, 22):
+        self.assertIn('not cmp(u16 at %d layer network lt 5000) and '
+                      'not cmp(u16 at %d layer network gt 6000)' %
+                      (offset, offset), match)
+
+  def test_update_to_unlimited_bandwidth_clears_rate(self):
+    self.backend.update(config.ConnectionConfig(1, 'Limited', 1000, 500, 40, 0,
+                                                100))
+    self.backend.update(config.ConnectionConfig(2, 'Unlimited', 0, 0, 40, 0,
+                                                100))
+    self.assertEqual([
+        'qdisc change dev eth0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0% limit 100 rate 500kbit',
+        'qdisc change dev ifb0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0% limit 100 rate 1000kbit',
+        'qdisc change dev eth0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0% limit 100 rate 0kbit',
+        'qdisc change dev ifb0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0% limit 100 rate 0kbit',
+        ], self.tc_commands())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -37,52 +37,58 @@ class NetworkEmulatorError(BaseException):
     self.error = error
 
 
-class NetworkEmulator(object):
-  """A network emulator that can constrain the network using Dummynet."""
+class Backend(object):
+  """Interface of the mechanisms used to constrain the network.
 
-  def __init__(self, connection_config, port_range):
-    """Constructor.
+  A backend creates one pipe for the traffic received by the target IP and one
+  for the traffic sent from it. Once created, the characteristics of the pipes
+  can be changed while the emulation is running.
+  """
+
+  def check_permissions(self):
+    """Checks if permissions are available to constrain the network.
+
+    Raises:
+      NetworkEmulatorError: If the permissions are not available.
+    """
+    raise NotImplementedError()
+
+  def emulate(self, connection_config, target_ip, port_range):
+    """Creates the pipes and starts constraining the traffic.
 
     Args:
         connection_config: A config.ConnectionConfig object containing the
-            characteristics for the connection to be emulation.
+            characteristics for the connection to be emulated.
+        target_ip: The IP address of the interface that shall have the
+            network constraints applied to it.
         port_range: Tuple containing two integers defining the port range.
     """
-    self._pipe_counter = 0
-    self._rule_counter = 0
-    self._port_range = port_range
-    self._connection_config = connection_config
+    raise NotImplementedError()
 
-  def emulate(self, target_ip):
-    """Starts a network emulation by setting up Dummynet rules.
+  def update(self, connection_config):
+    """Changes the characteristics of the pipes created by emulate().
 
     Args:
-        target_ip: The IP address of the interface that shall be that have the
-            network constraints applied to it.
+        connection_config: A config.ConnectionConfig object containing the new
+            characteristics for the connection.
     """
-    receive_pipe_id = self._create_dummynet_pipe(
-        self._connection_config.receive_bw_kbps,
-        self._connection_config.delay_ms,
-        self._connection_config.packet_loss_percent,
-        self._connection_config.queue_slots)
-    logging.debug('Created receive pipe: %s', receive_pipe_id)
-    send_pipe_id = self._create_dummynet_pipe(
-        self._connection_config.send_bw_kbps,
-        self._connection_config.delay_ms,
-        self._connection_config.packet_loss_percent,
-        self._connection_config.queue_slots)
-    logging.debug('Created send pipe: %s', send_pipe_id)
+    raise NotImplementedError()
+
+  def cleanup(self):
+    """Stops the network emulation by removing the pipes and their rules."""
+    raise NotImplementedError()
 
-    # Adding the rules will start the emulation.
-    incoming_rule_id = self._create_dummynet_rule(receive_pipe_id, 'any',
-                                                  target_ip, self._port_range)
-    logging.debug('Created incoming rule: %s', incoming_rule_id)
-    outgoing_rule_id = self._create_dummynet_rule(send_pipe_id, target_ip,
-                                                  'any', self._port_range)
-    logging.debug('Created outgoing rule: %s', outgoing_rule_id)
 
-  @staticmethod
-  def check_permissions():
+class DummynetBackend(Backend):
+  """Backend constraining the network using Dummynet."""
+
+  def __init__(self):
+    self._pipe_counter = 0
+    self._rule_counter = 0
+    self._receive_pipe_id = None
+    self._send_pipe_id = None
+
+  def check_permissions(self):
     """Checks if permissions are available to run Dummynet commands.
 
     Raises:
@@ -99,6 +105,46 @@ class NetworkEmulator(object):
         raise NetworkEmulatorError('You must run this script with administrator'
                                    ' privileges.')
 
+  def emulate(self, connection_config, target_ip, port_range):
+    """Starts a network emulation by setting up Dummynet rules."""
+    self._receive_pipe_id = self._create_dummynet_pipe(
+        connection_config.receive_bw_kbps,
+        connection_config.delay_ms,
+        connection_config.packet_loss_percent,
+        connection_config.queue_slots)
+    logging.debug('Created receive pipe: %s', self._receive_pipe_id)
+    self._send_pipe_id = self._create_dummynet_pipe(
+        connection_config.send_bw_kbps,
+        connection_config.delay_ms,
+        connection_config.packet_loss_percent,
+        connection_config.queue_slots)
+    logging.debug('Created send pipe: %s', self._send_pipe_id)
+
+    # Adding the rules will start the emulation.
+    incoming_rule_id = self._create_dummynet_rule(self._receive_pipe_id, 'any',
+                                                  target_ip, port_range)
+    logging.debug('Created incoming rule: %s', incoming_rule_id)
+    outgoing_rule_id = self._create_dummynet_rule(self._send_pipe_id, target_ip,
+                                                  'any', port_range)
+    logging.debug('Created outgoing rule: %s', outgoing_rule_id)
+
+  def update(self, connection_config):
+    """Reconfigures the existing Dummynet pipes, keeping their rules."""
+    _configure_dummynet_pipe(self._receive_pipe_id,
+                             connection_config.receive_bw_kbps,
+                             connection_config.delay_ms,
+                             connection_config.packet_loss_percent,
+                             connection_config.queue_slots)
+    _configure_dummynet_pipe(self._send_pipe_id,
+                             connection_config.send_bw_kbps,
+                             connection_config.delay_ms,
+                             connection_config.packet_loss_percent,
+                             connection_config.queue_slots)
+
+  def cleanup(self):
+    """Flushes all Dummynet rules and pipes, see cleanup()."""
+    cleanup()
+
   def _create_dummynet_rule(self, pipe_id, from_address, to_address,
                             port_range):
     """Creates a network emulation rule and returns its ID.
@@ -137,18 +183,71 @@ class NetworkEmulator(object):
         The ID of the pipe, starting at 1.
     """
     self._pipe_counter += 1
-    cmd = ['pipe', self._pipe_counter, 'config',
-           'bw', str(bandwidth_kbps/8) + 'KByte/s',
-           'delay', '%sms' % delay_ms,
-           'plr', (packet_loss_percent/100.0),
-           'queue', queue_slots]
-    error_message = 'Failed to create Dummynet pipe. '
-    if sys.platform.startswith('linux'):
-      error_message += ('Make sure you have loaded the ipfw_mod.ko module to '
-                        'your kernel (sudo insmod /path/to/ipfw_mod.ko).')
-    _run_ipfw_command(cmd, error_message)
+    _configure_dummynet_pipe(self._pipe_counter, bandwidth_kbps, delay_ms,
+                             packet_loss_percent, queue_slots)
     return self._pipe_counter
 
+
+class NetworkEmulator(object):
+  """A network emulator that can constrain the network.
+
+  The network is constrained through a Backend, Dummynet unless another backend
+  is given.
+  """
+
+  def __init__(self, connection_config, port_range, backend=None):
+    """Constructor.
+
+    Args:
+        connection_config: A config.ConnectionConfig object containing the
+            characteristics for the connection to be emulation.
+        port_range: Tuple containing two integers defining the port range.
+        backend: The Backend constraining the network. Defaults to a
+            DummynetBackend.
+    """
+    self._port_range = port_range
+    self._connection_config = connection_config
+    self._backend = backend or DummynetBackend()
+
+  @property
+  def connection_config(self):
+    return self._connection_config
+
+  def emulate(self, target_ip):
+    """Starts a network emulation.
+
+    Args:
+        target_ip: The IP address of the interface that shall be that have the
+            network constraints applied to it.
+    """
+    self._backend.emulate(self._connection_config, target_ip, self._port_range)
+
+  def set_connection_config(self, connection_config):
+    """Changes the characteristics of a running network emulation.
+
+    The pipes created by emulate() are reconfigured in place, so the rules
+    matching the traffic stay in effect while the change is applied.
+
+    Args:
+        connection_config: A config.ConnectionConfig object containing the new
+            characteristics for the connection.
+    """
+    self._backend.update(connection_config)
+    self._connection_config = connection_config
+
+  def check_permissions(self):
+    """Checks if permissions are available to constrain the network.
+
+    Raises:
+      NetworkEmulatorError: If the permissions are not available.
+    """
+    self._backend.check_permissions()
+
+  def cleanup(self):
+    """Stops the network emulation."""
+    self._backend.cleanup()
+
+
 def cleanup():
   """Stops the network emulation by flushing all Dummynet rules.
 
@@ -160,6 +259,28 @@ def cleanup():
   _run_ipfw_command(['-f', 'pipe', 'flush'],
                           'Failed to flush Dummynet pipes!')
 
+def _configure_dummynet_pipe(pipe_id, bandwidth_kbps, delay_ms,
+                             packet_loss_percent, queue_slots):
+  """Creates a Dummynet pipe or changes the configuration of an existing one.
+
+  Args:
+      pipe_id: integer ID of the pipe.
+      bandwidth_kbps: Bandwidth.
+      delay_ms: Delay for a one-way trip of a packet.
+      packet_loss_percent: Float value of packet loss, in percent.
+      queue_slots: Size of the queue.
+  """
+  cmd = ['pipe', pipe_id, 'config',
+         'bw', str(bandwidth_kbps/8) + 'KByte/s',
+         'delay', '%sms' % delay_ms,
+         'plr', (packet_loss_percent/100.0),
+         'queue', queue_slots]
+  error_message = 'Failed to configure Dummynet pipe. '
+  if sys.platform.startswith('linux'):
+    error_message += ('Make sure you have loaded the ipfw_mod.ko module to '
+                      'your kernel (sudo insmod /path/to/ipfw_mod.ko).')
+  _run_ipfw_command(cmd, error_message)
+
 def _run_ipfw_command(command, fail_msg=None):
   """Executes a command and prefixes the appropriate command for
      Windows or Linux/UNIX.
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+#  Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+"""Playback of time-varying network traces.
+
+A trace file contains one line per change of the connection characteristics:
+
+  # time_ms receive_kbps send_kbps delay_ms packet_loss_percent [queue_slots]
+  0     1000  500  40  0
+  1500   300  150  80  0.5
+  3000  2000 1000  30  0   50
+
+Fields may be separated by whitespace or commas. Times are relative to the
+start of the playback and must not decrease. The queue size defaults to the
+one of the previous line. A bandwidth of 0 means unlimited. Fractional
+bandwidths and delays are rounded to whole kbps and ms, keeping bandwidths
+above 0 limited.
+"""
+
+import logging
+import time
+
+import config
+from network_emulator import NetworkEmulatorError
+
+_DEFAULT_QUEUE_SLOTS = 100
+
+# How long before a scheduled change to stop sleeping and busy-wait instead,
+# since sleeping may overshoot by up to a scheduler tick.
+_SPIN_TIME_S = 0.005
+
+
+def _parse_bandwidth(field):
+  bandwidth_kbps = float(field)
+  if 0 < bandwidth_kbps < 1:
+    return 1
+  return int(round(bandwidth_kbps))
+
+
+def read_trace(file_name):
+  """Reads a network trace.
+
+  Args:
+      file_name: The name of the trace file.
+  Return:
+      (list of tuples): The time in ms and the config.ConnectionConfig of each
+          entry of the trace.
+  Raises:
+      NetworkEmulatorError: If the trace is malformed.
+  """
+  trace = []
+  queue_slots = _DEFAULT_QUEUE_SLOTS
+  with open(file_name) as trace_file:
+    for line_number, line in enumerate(trace_file, 1):
+      fields = line.split('#', 1)[0].replace(',', ' ').split()
+      if not fields:
+        continue
+      try:
+        if len(fields) not in (5, 6):
+          raise ValueError()
+        time_ms = float(fields[0])
+        if len(fields) == 6:
+          queue_slots = int(fields[5])
+        connection_config = config.ConnectionConfig(
+            len(trace) + 1, 'Trace at %s ms' % fields[0],
+            _parse_bandwidth(fields[1]), _parse_bandwidth(fields[2]),
+            int(round(float(fields[3]))), float(fields[4]), queue_slots)
+      except ValueError:
+        raise NetworkEmulatorError('Invalid entry in %s, line %d: %s' %
+                                   (file_name, line_number, line.strip()))
+      if trace and time_ms < trace[-1][0]:
+        raise NetworkEmulatorError('Decreasing time in %s, line %d.' %
+                                   (file_name, line_number))
+      trace.append((time_ms, connection_config))
+  if not trace:
+    raise NetworkEmulatorError('The trace %s is empty.' % file_name)
+  return trace
+
+
+class TracePlayer(object):
+  """Applies the entries of a trace to a running network emulation.
+
+  The changes are applied through NetworkEmulator.set_connection_config(), so
+  the pipes of the emulation are reused. To keep the scheduling jitter low,
+  the player sleeps until shortly before each change and busy-waits for the
+  rest of the time.
+  """
+
+  def __init__(self, emulator, trace):
+    """Constructor.
+
+    Args:
+        emulator: A network_emulator.NetworkEmulator, on which emulate() was
+            called with the config of the first entry of the trace.
+        trace: A trace, as returned by read_trace().
+    """
+    self._emulator = emulator
+    self._trace = trace
+    self.timeline = []
+
+  def play(self):
+    """Applies the entries of the trace at their times.
+
+    The first entry is considered applied when play() is called. The timeline
+    attribute records each change as it is applied, so it is complete up to
+    the last change even if the playback is interrupted.
+
+    Return:
+        (list of tuples): The timeline; for each entry the scheduled time, the
+            time the change was started and the time it took to apply, all in
+            ms, and the config.ConnectionConfig.
+    """
+    start_time = time.time()
+    start_ms = self._trace[0][0]
+    self.timeline = [(start_ms, start_ms, 0.0, self._trace[0][1])]
+    for time_ms, connection_config in self._trace[1:]:
+      target_time = start_time + (time_ms - start_ms) / 1000.0
+      remaining_time = target_time - time.time()
+      if remaining_time > _SPIN_TIME_S:
+        time.sleep(remaining_time - _SPIN_TIME_S)
+      while time.time() < target_time:
+        pass
+      applied_time = time.time()
+      self._emulator.set_connection_config(connection_config)
+      done_time = time.time()
+      self.timeline.append((time_ms,
+                            start_ms + (applied_time - start_time) * 1000.0,
+                            (done_time - applied_time) * 1000.0,
+                            connection_config))
+      logging.debug('Applied trace entry at %s ms: %s', time_ms,
+                    connection_config)
+    return self.timeline
+
+
+def write_timeline(file_name, timeline):
+  """Writes the timeline of a trace playback.
+
+  Each line contains the scheduled time, the applied time and the time it took
+  to apply the change in ms, followed by the fields of the applied entry in
+  the trace format.
+
+  Args:
+      file_name: The name of the file to write.
+      timeline: A timeline, as returned by TracePlayer.play().
+  """
+  with open(file_name, 'w') as timeline_file:
+    timeline_file.write('# scheduled_ms applied_ms apply_duration_ms '
+                        'receive_kbps send_kbps delay_ms packet_loss_percent '
+                        'queue_slots\n')
+    for scheduled_ms, applied_ms, duration_ms, connection_config in timeline:
+      timeline_file.write('%.3f %.3f %.3f %s %s %s %s %s\n' % (
+          scheduled_ms, applied_ms, duration_ms,
+          connection_config.receive_bw_kbps, connection_config.send_bw_kbps,
+          connection_config.delay_ms, connection_config.packet_loss_percent,
+          connection_config.queue_slots))
+
+
+def log_timeline_summary(timeline):
+  """Logs the scheduling jitter of a trace playback."""
+  if len(timeline) < 2:
+    return
+  lateness = [applied_ms - scheduled_ms
+              for scheduled_ms, applied_ms, _, _ in timeline[1:]]
+  durations = [duration_ms for _, _, duration_ms, _ in timeline[1:]]
+  logging.info('Applied %d trace changes. Start lateness: mean %.3f ms, max '
+               '%.3f ms. Apply duration: mean %.3f ms, max %.3f ms.',
+               len(lateness), sum(lateness) / len(lateness), max(lateness),
+               sum(durations) / len(durations), max(durations))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#  Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+#  Use of this source code is governed by a BSD-style license
+#  that can be found in the LICENSE file in the root of the source
+#  tree. An additional intellectual property rights grant can be found
+#  in the file PATENTS.  All contributing project authors may
+#  be found in the AUTHORS file in the root of the source tree.
+
+import os
+import tempfile
+import unittest
+
+import netem_backend
+import network_emulator
+import network_trace
+
+
+class NetworkTraceTest(unittest.TestCase):
+
+  def setUp(self):
+    trace_file, self.trace_path = tempfile.mkstemp()
+    os.write(trace_file, '# time_ms receive_kbps send_kbps delay_ms loss\n'
+                         '0     1.5  500   37.5  0\n'
+                         '10    0    0     40    0.5  50\n')
+    os.close(trace_file)
+
+  def tearDown(self):
+    os.remove(self.trace_path)
+
+  def test_read_fractional_entry_and_step_to_unlimited(self):
+    trace = network_trace.read_trace(self.trace_path)
+    self.assertEqual([0.0, 10.0], [time_ms for time_ms, _ in trace])
+    self.assertEqual(
+        [(2, 500, 38, 0.0, 100), (0, 0, 40, 0.5, 50)],
+        [(c.receive_bw_kbps, c.send_bw_kbps, c.delay_ms,
+          c.packet_loss_percent, c.queue_slots) for _, c in trace])
+
+  def test_play_step_to_unlimited_removes_rate(self):
+    batches = []
+    def record_batch(cmd_list, commands, fail_msg=None):
+      batches.append(commands)
+      return ''
+    run_batch_command = netem_backend._run_batch_command
+    netem_backend._run_batch_command = record_batch
+    try:
+      trace = network_trace.read_trace(self.trace_path)
+      emulator = network_emulator.NetworkEmulator(
+          trace[0][1], (5000, 6000), netem_backend.NetemBackend('eth0'))
+      timeline = network_trace.TracePlayer(emulator, trace).play()
+    finally:
+      netem_backend._run_batch_command = run_batch_command
+    self.assertEqual(2, len(timeline))
+    self.assertEqual([
+        'qdisc change dev eth0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0.5% limit 50 rate 0kbit',
+        'qdisc change dev ifb0 parent 1:1 handle 10: netem '
+        'delay 40ms loss 0.5% limit 50 rate 0kbit',
+        ], batches[-1])
+
+  def test_invalid_entry(self):
+    with open(self.trace_path, 'a') as trace_file:
+      trace_file.write('20 fast 100 40 0\n')
+    self.assertRaises(network_emulator.NetworkEmulatorError,
+                      network_trace.read_trace, self.trace_path)
+
+
+if __name__ == '__main__':
+  unittest.main()
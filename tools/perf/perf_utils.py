@@ -10,6 +10,9 @@
 
 # Copied from /src/chrome/test/pyautolib/pyauto_utils.py in Chromium.
 
+import collections
+import json
+import math
 import sys
 
 def PrintPerfResult(graph_name, series_name, data_point, units,
@@ -30,8 +33,154 @@ def PrintPerfResult(graph_name, series_name, data_point, units,
                        buildbot waterfall itself (in the buildbot step running
                        this test on the waterfall page, not the stdio page).
   """
+  print _FormatPerfResult(graph_name, series_name, data_point, units,
+                          show_on_waterfall)
+  sys.stdout.flush()
+
+
+def _FormatPerfResult(graph_name, series_name, data_point, units,
+                      show_on_waterfall):
+  """Formats a RESULT line, see PrintPerfResult()."""
   waterfall_indicator = ['', '*'][show_on_waterfall]
-  print '%sRESULT %s: %s= %s %s' % (
+  return '%sRESULT %s: %s= %s %s' % (
       waterfall_indicator, graph_name, series_name,
       str(data_point).replace(' ', ''), units)
-  sys.stdout.flush()
+
+
+class PerfResultsRecorder(object):
+  """Buffers perf results and writes them all at once.
+
+  Unlike PrintPerfResult(), adding a result does not write anything. The
+  values are collected by graph and series, and Flush() writes one RESULT line
+  per series in the format of PrintPerfResult() and, optionally, a Chart JSON
+  file. The recorder can be used as a context manager which flushes on exit.
+
+  Example:
+    with perf_utils.PerfResultsRecorder('audio_e2e', 'results.json') as r:
+      for delay in delays:
+        r.AddResult('audio_delay', 'delay', delay, 'ms')
+  """
+
+  def __init__(self, benchmark_name='', chart_json_file_name=None,
+               output_stream=None):
+    """Constructor.
+
+    Args:
+      benchmark_name: The name of the benchmark in the Chart JSON output.
+      chart_json_file_name: File to write the Chart JSON output to. No Chart
+                            JSON is written if not set.
+      output_stream: Stream to write the RESULT lines to. Defaults to
+                     sys.stdout.
+    """
+    self._benchmark_name = benchmark_name
+    self._chart_json_file_name = chart_json_file_name
+    self._output_stream = output_stream
+    # Maps (graph_name, series_name) to a dict with the units, the
+    # show_on_waterfall flag and the list of values of the series.
+    self._series = collections.OrderedDict()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.Flush()
+
+  def AddResult(self, graph_name, series_name, data_point, units,
+                show_on_waterfall=False):
+    """Adds values to a series, see PrintPerfResult() for the arguments.
+
+    All values of a series must have the same units. Values added to a series
+    in several calls are reported together, as a list.
+    """
+    series = self._series.get((graph_name, series_name))
+    if series is None:
+      series = self._series[(graph_name, series_name)] = {
+          'units': units, 'show_on_waterfall': show_on_waterfall,
+          'values': []}
+    elif series['units'] != units:
+      raise ValueError('Series %s of graph %s has units %s, not %s.' %
+                       (series_name, graph_name, series['units'], units))
+    series['show_on_waterfall'] |= show_on_waterfall
+    if isinstance(data_point, (list, tuple)):
+      series['values'].extend(data_point)
+    else:
+      series['values'].append(data_point)
+
+  def GetSummary(self):
+    """Computes summary statistics of all series.
+
+    Return:
+      An OrderedDict mapping (graph_name, series_name) to a dict with the
+      count, mean, std (sample standard deviation), min and max of the values
+      of the series.
+    """
+    summary = collections.OrderedDict()
+    for key, series in self._series.iteritems():
+      summary[key] = _ComputeSummary([float(value)
+                                      for value in series['values']])
+    return summary
+
+  def Flush(self):
+    """Writes all buffered results and clears the recorder.
+
+    Return:
+      The summary of the written results, see GetSummary().
+    """
+    summary = self.GetSummary()
+    output_stream = self._output_stream or sys.stdout
+    lines = []
+    for (graph_name, series_name), series in self._series.iteritems():
+      values = series['values']
+      lines.append(_FormatPerfResult(
+          graph_name, series_name, values[0] if len(values) == 1 else values,
+          series['units'], series['show_on_waterfall']))
+    if lines:
+      output_stream.write('\n'.join(lines) + '\n')
+      output_stream.flush()
+
+    if self._chart_json_file_name:
+      with open(self._chart_json_file_name, 'w') as chart_json_file:
+        json.dump(self._AsChartDict(summary), chart_json_file, indent=2)
+        chart_json_file.write('\n')
+    self._series.clear()
+    return summary
+
+  def _AsChartDict(self, summary):
+    """Converts the buffered results to a Chart JSON dict."""
+    charts = collections.OrderedDict()
+    for key, series in self._series.iteritems():
+      graph_name, series_name = key
+      values = [float(value) for value in series['values']]
+      chart_value = {
+          'name': graph_name,
+          'units': series['units'],
+          'important': series['show_on_waterfall'],
+      }
+      if len(values) == 1:
+        chart_value['type'] = 'scalar'
+        chart_value['value'] = values[0]
+      else:
+        chart_value['type'] = 'list_of_scalar_values'
+        chart_value['values'] = values
+        chart_value['std'] = summary[key]['std']
+      charts.setdefault(graph_name, collections.OrderedDict())[series_name] = (
+          chart_value)
+    return {
+        'format_version': '0.1',
+        'benchmark_name': self._benchmark_name,
+        'charts': charts,
+    }
+
+
+def _ComputeSummary(values):
+  """Computes the summary statistics of a list of floats."""
+  count = len(values)
+  if not count:
+    return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+  mean = math.fsum(values) / count
+  std = 0.0
+  if count > 1:
+    std = math.sqrt(math.fsum((value - mean) ** 2 for value in values) /
+                    (count - 1))
+  return {'count': count, 'mean': mean, 'std': std, 'min': min(values),
+          'max': max(values)}
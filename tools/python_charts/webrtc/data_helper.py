@@ -9,10 +9,72 @@
 
 __author__ = 'kjellander@webrtc.org (Henrik Kjellander)'
 
+import json
+import os
+
+# Maps data file names to a (modification time, Dataset) tuple.
+_dataset_cache = {}
+
+
+class Dataset(object):
+  """
+  The data of one test run, as written by video_quality_measurement with the
+  --python flag, stored column-wise.
+  """
+
+  def __init__(self, test_configuration, table_description, frame_data):
+    """ Initializes the Dataset.
+
+    Args:
+      test_configuration: List of dictionaries with 'name' and 'value' keys.
+      table_description: dictionary describing the data types of all
+        columns, as defined in the gviz_api.DataTable documentation.
+      frame_data: List of dictionaries, one per frame, mapping the columns
+        to their values.
+    """
+    self.test_configuration = test_configuration
+    self.table_description = table_description
+    self.columns = _RowsToColumns(frame_data, table_description)
+    self.number_of_frames = len(frame_data)
+
+
+def LoadDataset(filename):
+  """ Loads a data file, reusing the Dataset loaded before if the file has
+  not been modified since.
+
+  Args:
+    filename: Name of a Python file defining the test_configuration,
+      frame_data_types and frame_data variables.
+  Returns:
+    A Dataset.
+  """
+  mtime = os.path.getmtime(filename)
+  cached = _dataset_cache.get(filename)
+  if cached and cached[0] == mtime:
+    return cached[1]
+  read_vars = {} # empty dictionary to load the data into.
+  execfile(filename, read_vars, read_vars)
+  dataset = Dataset(read_vars.get('test_configuration'),
+                    read_vars.get('frame_data_types'),
+                    read_vars.get('frame_data'))
+  _dataset_cache[filename] = (mtime, dataset)
+  return dataset
+
+
+def _RowsToColumns(rows, table_description):
+  """ Converts a list of row dictionaries to a dictionary of column lists.
+  Values missing in a row are None. """
+  columns = {}
+  for column_name in table_description or []:
+    columns[column_name] = [row.get(column_name) for row in rows or []]
+  return columns
+
+
 class DataHelper(object):
   """
   Helper class for managing table data.
   This class does not verify the consistency of the data tables sent into it.
+  The data is stored column-wise, one dictionary of columns per data set.
   """
 
   def __init__(self, data_list, table_description, names_list, messages):
@@ -30,12 +92,35 @@ class DataHelper(object):
         columns after. Usually different runs of data collection.
       messages: List of strings we might append error messages to.
     """
-    self.data_list = data_list
     self.table_description = table_description
     self.names_list = names_list
     self.messages = messages
-    self.number_of_datasets = len(data_list)
-    self.number_of_frames = len(data_list[0])
+    self._SetColumns([_RowsToColumns(data, table_description)
+                      for data in data_list],
+                     len(data_list[0]) if data_list else 0)
+
+  @classmethod
+  def FromDatasets(cls, datasets, names_list, messages):
+    """ Creates a DataHelper sharing the columns of already loaded data sets.
+
+    Args:
+      datasets: List of one or more Dataset objects. The table description of
+        the first one is used for all of them.
+      names_list: List of strings of what we're going to name the data
+        columns after.
+      messages: List of strings we might append error messages to.
+    """
+    helper = cls([], datasets[0].table_description, names_list, messages)
+    helper._SetColumns([dataset.columns for dataset in datasets],
+                       datasets[0].number_of_frames)
+    return helper
+
+  def _SetColumns(self, columns_list, number_of_frames):
+    """ Sets the columns of all data sets and the number of frames of the
+    first one. """
+    self.columns_list = columns_list
+    self.number_of_datasets = len(columns_list)
+    self.number_of_frames = number_of_frames
 
   def CreateData(self, field_name, start_frame=0, end_frame=0):
     """ Creates a data structure for a specified data field.
@@ -76,38 +161,105 @@ class DataHelper(object):
         ]
     """
 
-    # Build dictionary that describes the data types
+    result_table_description = self._CreateDescription(field_name)
+    columns = self._SliceColumns(field_name, start_frame, end_frame)
+
+    # We're going to have one dictionary per row, with the frame_number
+    # values taken from the first data set.
+    column_names = ['frame_number'] + ['%s_%s' % (field_name, dataset_index)
+                                       for dataset_index
+                                       in range(self.number_of_datasets)]
+    result_data_table = []
+    for values in zip(*columns):
+      row_dict = {}
+      for column_name, value in zip(column_names, values):
+        if value is not None:
+          row_dict[column_name] = value
+      result_data_table.append(row_dict)
+    return result_table_description, result_data_table
+
+  def CreateJson(self, field_name, start_frame=0, end_frame=0, max_rows=0,
+                 constant_columns=None):
+    """ Creates the JSON of a data table for a specified data field.
+
+    The result is the same data table as built by CreateData, in the JSON
+    format of gviz_api.DataTable.ToJSon with the columns ordered as by
+    GetOrdering, but it is generated directly from the columns. The frame
+    numbers are converted to strings, as the Chart API requires for values of
+    the X-axis.
+
+    Args:
+      field_name: String name of the field, see CreateData.
+      start_frame: Frame number to start at (zero indexed). Default: 0.
+      end_frame: Frame number to be the last frame. If zero all frames
+        will be included. Default: 0.
+      max_rows: If non-zero and the frame range has more frames, consecutive
+        frames are averaged so that at most max_rows rows are created, each
+        labeled with the number of its first frame. Default: 0.
+      constant_columns: Optional dictionary mapping names of additional
+        columns to a tuple of their description and their value in all rows.
+
+    Returns:
+      A JSON string.
+    """
+    description = self._CreateDescription(field_name)
+    columns = self._SliceColumns(field_name, start_frame, end_frame)
+    frame_numbers = [str(frame_number) for frame_number in columns[0]]
+    values = columns[1:]
+    if max_rows and len(frame_numbers) > max_rows:
+      step = -(-len(frame_numbers) // max_rows)
+      frame_numbers = frame_numbers[::step]
+      values = [_AverageChunks(column, step) for column in values]
+
+    constant_columns = constant_columns or {}
+    for column_name, (column_description, _) in constant_columns.items():
+      description[column_name] = column_description
+    ordering = self.GetOrdering(description)
+    cells = {'frame_number': frame_numbers}
+    for dataset_index, column in enumerate(values):
+      cells['%s_%s' % (field_name, dataset_index)] = column
+    for column_name, (_, value) in constant_columns.items():
+      cells[column_name] = [value] * len(frame_numbers)
+
+    cols = [{'id': column_name, 'label': description[column_name][1],
+             'type': description[column_name][0]}
+            for column_name in ordering]
+    rows = [{'c': [None if value is None else {'v': value}
+                   for value in row_values]}
+            for row_values in zip(*[cells[column_name]
+                                    for column_name in ordering])]
+    return json.dumps({'cols': cols, 'rows': rows}, separators=(',', ':'))
+
+  def _CreateDescription(self, field_name):
+    """ Builds the dictionary that describes the data types of a data table
+    for a specified data field, see CreateData. """
     result_table_description = {'frame_number': ('string', 'Frame number')}
     for dataset_index in range(self.number_of_datasets):
       column_name = '%s_%s' % (field_name, dataset_index)
       column_type = self.table_description[field_name][0]
       column_description = self.names_list[dataset_index]
       result_table_description[column_name] = (column_type, column_description)
+    return result_table_description
 
-    # Build data table of all the data
-    result_data_table = []
-    # We're going to have one dictionary per row.
-    # Create that and copy frame_number values from the first data set
-    for source_row in self.data_list[0]:
-      row_dict = {'frame_number': source_row['frame_number']}
-      result_data_table.append(row_dict)
-
-    # Pick target field data points from the all data tables
+  def _SliceColumns(self, field_name, start_frame, end_frame):
+    """ Returns the frame_number column of the first data set and the
+    field_name column of each data set for a range of frames. Data sets that
+    are missing frames of the range are padded with None. """
     if end_frame == 0:  # Default to all frames
       end_frame = self.number_of_frames
-
+    end_frame = min(end_frame, self.number_of_frames)
+    columns = [self.columns_list[0]['frame_number'][start_frame:end_frame]]
     for dataset_index in range(self.number_of_datasets):
-      for row_number in range(start_frame, end_frame):
-        column_name = '%s_%s' % (field_name, dataset_index)
-        # Stop if any of the data sets are missing the frame
-        try:
-          result_data_table[row_number][column_name] = \
-          self.data_list[dataset_index][row_number][field_name]
-        except IndexError:
-          self.messages.append("Couldn't find frame data for row %d "
-          "for %s" % (row_number, self.names_list[dataset_index]))
-          break
-    return result_table_description, result_data_table
+      column = self.columns_list[dataset_index][field_name][start_frame:
+                                                            end_frame]
+      missing_frames = end_frame - start_frame - len(column)
+      if missing_frames > 0:
+        self.messages.append("Couldn't find frame data for row %d "
+        "for %s" % (start_frame + len(column),
+                    self.names_list[dataset_index]))
+        column = column + [None] * missing_frames
+      columns.append(column)
+    return columns
 
   def GetOrdering(self, table_description):  # pylint: disable=R0201
     """ Creates a list of column names, ordered alphabetically except for the
@@ -181,3 +333,21 @@ class DataHelper(object):
         result_description[name] = 'string'
         data[name] = value
     return result_description, result_data
+
+
+def _AverageChunks(column, chunk_size):
+  """ Averages consecutive chunks of a column, ignoring missing values.
+  Columns of other than numbers are decimated by keeping the first value of
+  each chunk instead. """
+  result = []
+  for start in range(0, len(column), chunk_size):
+    chunk = [value for value in column[start:start + chunk_size]
+             if value is not None]
+    if not chunk:
+      result.append(None)
+    elif all(isinstance(value, (int, long, float)) and
+             not isinstance(value, bool) for value in chunk):
+      result.append(float(sum(chunk)) / len(chunk))
+    else:
+      result.append(chunk[0])
+  return result
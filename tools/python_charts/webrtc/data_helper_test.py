@@ -7,6 +7,9 @@
 #  in the file PATENTS.  All contributing project authors may
 #  be found in the AUTHORS file in the root of the source tree.
 
+import json
+import os
+import tempfile
 import unittest
 import webrtc.data_helper
 
@@ -109,5 +112,70 @@ class Test(unittest.TestCase):
     self.assertEquals('Test 0', data[0]['name'])
     self.assertEquals('Test 1', data[1]['name'])
 
+  def testCreateJson(self):
+    messages = []
+    helper = webrtc.data_helper.DataHelper(self.all_data, self.type_description,
+                                           self.names, messages)
+    table = json.loads(helper.CreateJson('ssim'))
+    self.assertEqual(0, len(messages))
+    self.assertEqual(['frame_number', 'ssim_0', 'ssim_1'],
+                     [column['id'] for column in table['cols']])
+    self.assertEqual('string', table['cols'][0]['type'])
+    self.assertEqual('Test 1', table['cols'][2]['label'])
+    self.assertEqual([[{'v': '0'}, {'v': 0.5}, {'v': 0.6}],
+                      [{'v': '1'}, {'v': 0.55}, {'v': 0.66}]],
+                     [row['c'] for row in table['rows']])
+
+  def testCreateJsonFrameRangeAndConstantColumn(self):
+    messages = []
+    helper = webrtc.data_helper.DataHelper(self.all_data, self.type_description,
+                                           self.names, messages)
+    table = json.loads(helper.CreateJson(
+        'psnr', start_frame=1,
+        constant_columns={'desired': (('number', 'Desired'), 7)}))
+    self.assertEqual(['frame_number', 'desired', 'psnr_0', 'psnr_1'],
+                     [column['id'] for column in table['cols']])
+    self.assertEqual([[{'v': '1'}, {'v': 7}, {'v': 30.55}, {'v': 30.66}]],
+                     [row['c'] for row in table['rows']])
+
+  def testCreateJsonDecimation(self):
+    frame_data = [{'frame_number': i, 'ssim': float(i)} for i in range(10)]
+    messages = []
+    helper = webrtc.data_helper.DataHelper([frame_data, frame_data[:5]],
+                                           self.type_description,
+                                           self.names, messages)
+    table = json.loads(helper.CreateJson('ssim', max_rows=3))
+    # Four frames per row; the second data set is missing frames 5 to 9.
+    self.assertEqual([[{'v': '0'}, {'v': 1.5}, {'v': 1.5}],
+                      [{'v': '4'}, {'v': 5.5}, {'v': 4.0}],
+                      [{'v': '8'}, {'v': 8.5}, None]],
+                     [row['c'] for row in table['rows']])
+    self.assertEqual(1, len(messages))
+
+  def testLoadDatasetCache(self):
+    handle, filename = tempfile.mkstemp(suffix='.py')
+    try:
+      os.write(handle, "test_configuration = [{'name': 'name', 'value': 'A'}]\n"
+                       "frame_data_types = {'frame_number': ('number', 'F'),\n"
+                       "                    'ssim': ('number', 'SSIM')}\n"
+                       "frame_data = [{'frame_number': 0, 'ssim': 0.5}]\n")
+      os.close(handle)
+      dataset = webrtc.data_helper.LoadDataset(filename)
+      self.assertEqual([0.5], dataset.columns['ssim'])
+      self.assertTrue(dataset is webrtc.data_helper.LoadDataset(filename))
+
+      # A modified file is loaded again.
+      mtime = os.path.getmtime(filename)
+      os.utime(filename, (mtime + 1, mtime + 1))
+      reloaded = webrtc.data_helper.LoadDataset(filename)
+      self.assertFalse(dataset is reloaded)
+
+      helper = webrtc.data_helper.DataHelper.FromDatasets([reloaded], ['A'],
+                                                          [])
+      _, data_table = helper.CreateData('ssim')
+      self.assertEqual([{'frame_number': 0, 'ssim_0': 0.5}], data_table)
+    finally:
+      os.remove(filename)
+
 if __name__ == "__main__":
   unittest.main()
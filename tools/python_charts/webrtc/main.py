@@ -7,6 +7,7 @@
 #  in the file PATENTS.  All contributing project authors may
 #  be found in the AUTHORS file in the root of the source tree.
 
+import cgi
 import os
 import gviz_api
 import webrtc.data_helper
@@ -31,6 +32,10 @@ def main():
   The HTML file is shipped with the script, while the data file must be
   generated by running video_quality_measurement with the --python flag
   specified.
+
+  Parsed data files are cached between requests until they are modified. The
+  frame range and the maximum number of rows of the charts can be set with
+  the start_frame, end_frame and max_rows query parameters.
   """
   print 'Content-type: text/html\n' # the newline is required!
 
@@ -56,69 +61,62 @@ def main():
       messages.append('Cannot open data file: %s' % filename)
       data_filenames.remove(filename)
 
+  # Read the frame range and decimation from the query parameters.
+  form = cgi.FieldStorage()
+  try:
+    start_frame = int(form.getfirst('start_frame', 0))
+    end_frame = int(form.getfirst('end_frame', 0))
+    max_rows = int(form.getfirst('max_rows', 0))
+  except ValueError:
+    ShowErrorPage('Invalid start_frame, end_frame or max_rows parameter.')
+    return
+
   # Read data from all existing input files.
-  data_list = []
+  datasets = []
   test_configurations = []
   names = []
 
   for filename in data_filenames:
-    read_vars = {} # empty dictionary to load the data into.
-    execfile(filename, read_vars, read_vars)
-
-    test_configuration = read_vars['test_configuration']
-    table_description = read_vars['frame_data_types']
-    table_data = read_vars['frame_data']
+    dataset = webrtc.data_helper.LoadDataset(filename)
+    test_configuration = dataset.test_configuration
 
     # Verify the data in the file loaded properly.
-    if not table_description or not table_data:
+    if not dataset.table_description or not dataset.number_of_frames:
       messages.append('Invalid input file: %s. Missing description list or '
                       'data dictionary variables.' % filename)
       continue
 
-    # Frame numbers appear as number type in the data, but Chart API requires
-    # values of the X-axis to be of string type.
-    # Change the frame_number column data type:
-    table_description['frame_number'] = ('string', 'Frame number')
-    # Convert all the values to string types:
-    for row in table_data:
-      row['frame_number'] = str(row['frame_number'])
-
-    # Store the unique data from this file in the high level lists.
-    test_configurations.append(test_configuration)
-    data_list.append(table_data)
     # Name of the test run must be present.
     test_name = FindConfiguration(test_configuration, 'name')
     if not test_name:
       messages.append('Invalid input file: %s. Missing configuration key '
-                      '"name"', filename)
+                      '"name"' % filename)
       continue
+    # Store the unique data from this file in the high level lists.
+    test_configurations.append(test_configuration)
+    datasets.append(dataset)
     names.append(test_name)
 
+  if not datasets:
+    ShowErrorPage('No valid data files.<br>%s' % '<br>'.join(messages))
+    return
+
   # Create data helper and build data tables for each graph.
-  helper = webrtc.data_helper.DataHelper(data_list, table_description,
-                                         names, messages)
+  helper = webrtc.data_helper.DataHelper.FromDatasets(datasets, names,
+                                                      messages)
 
   # Loading it into gviz_api.DataTable objects and create JSON strings.
   description, data = helper.CreateConfigurationTable(test_configurations)
   configurations = gviz_api.DataTable(description, data)
   json_configurations = configurations.ToJSon()  # pylint: disable=W0612
 
-  description, data = helper.CreateData('ssim')
-  ssim = gviz_api.DataTable(description, data)
-  # pylint: disable=W0612
-  json_ssim_data = ssim.ToJSon(helper.GetOrdering(description))
-
-  description, data = helper.CreateData('psnr')
-  psnr = gviz_api.DataTable(description, data)
-  # pylint: disable=W0612
-  json_psnr_data = psnr.ToJSon(helper.GetOrdering(description))
-
-  description, data = helper.CreateData('packets_dropped')
-  packet_loss = gviz_api.DataTable(description, data)
+  # The chart tables are converted to JSON directly from the columns.
   # pylint: disable=W0612
-  json_packet_loss_data = packet_loss.ToJSon(helper.GetOrdering(description))
+  json_ssim_data = helper.CreateJson('ssim', start_frame, end_frame, max_rows)
+  json_psnr_data = helper.CreateJson('psnr', start_frame, end_frame, max_rows)
+  json_packet_loss_data = helper.CreateJson('packets_dropped', start_frame,
+                                            end_frame, max_rows)
 
-  description, data = helper.CreateData('bit_rate')
   # Add a column of data points for the desired bit rate to be plotted.
   # (uses test configuration from the last data set, assuming it is the same
   # for all of them)
@@ -127,13 +125,11 @@ def main():
     ShowErrorPage('Cannot configuration field named "bit_rate_in_kbps"')
     return
   desired_bit_rate = int(desired_bit_rate)
-  # Add new column data type description.
-  description['desired_bit_rate'] = ('number', 'Desired bit rate (kbps)')
-  for row in data:
-    row['desired_bit_rate'] = desired_bit_rate
-  bit_rate = gviz_api.DataTable(description, data)
   # pylint: disable=W0612
-  json_bit_rate_data = bit_rate.ToJSon(helper.GetOrdering(description))
+  json_bit_rate_data = helper.CreateJson(
+      'bit_rate', start_frame, end_frame, max_rows,
+      {'desired_bit_rate': (('number', 'Desired bit rate (kbps)'),
+                            desired_bit_rate)})
 
   # Format the messages list with newlines.
   messages = '\n'.join(messages)
@@ -4,7 +4,6 @@
 # found in the LICENSE file.
 
 import collections
-import json
 import os
 import sys
 
@@ -12,8 +11,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir))
 from telemetry.internal.results import buildbot_output_formatter
 from telemetry.internal.results import page_test_results
 from telemetry.page import page as page_module
-from telemetry.timeline import model
-from telemetry.timeline import tracing_timeline_data
+from telemetry.timeline import model_cache
 from telemetry.web_perf.metrics import smoothness
 from telemetry.web_perf import timeline_interaction_record as tir_module
 
@@ -53,11 +51,8 @@ def Main(args):
   if len(args) is not 1:
     print 'Invalid arguments. Usage: measure_trace.py <trace file>'
     return 1
-  with open(args[0]) as trace_file:
-    trace_data = tracing_timeline_data.TracingTimelineData(
-        json.load(trace_file))
-
-  timeline_model = model.TimelineModel(trace_data)
+  # Reruns on the same trace load the model cached next to it.
+  timeline_model = model_cache.LoadTimelineModel(args[0])
   smoothness_metric = smoothness.SmoothnessMetric()
   formatters = [
       buildbot_output_formatter.BuildbotOutputFormatter(sys.stdout)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Measures the throughput of the timeline importers on synthetic traces.
+
+A Chrome trace of the requested size and shape is generated and imported
+several times, each time in a fresh process. The time of each stage of the
+import and the peak memory use of the import are reported in Chart JSON, with
+the label of the trace shape as trace name, e.g.:
+
+  timeline_import_benchmark.py --events=200000 --threads=16 --label=wide \\
+      --output=wide.json
+"""
+
+import collections
+import json
+import multiprocessing
+import optparse
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir))
+from telemetry.internal.results import chart_json_output_formatter
+from telemetry.timeline import model as model_module
+from telemetry.timeline import trace_data as trace_data_module
+from telemetry import value as value_module
+from telemetry.value import list_of_scalar_values
+
+# The stages of TimelineModel.ImportTraces, in order. The events are decoded
+# as they are imported, so decoding is part of import_events.
+STAGES = ['create_trace_data', 'import_events', 'finalize_import',
+          'shift_world_to_zero', 'update_bounds']
+
+# Has the fields of benchmark.BenchmarkMetadata used by ResultsAsChartDict,
+# without importing the browser stack that telemetry.benchmark needs.
+_BenchmarkMetadata = collections.namedtuple(
+    '_BenchmarkMetadata', ['name', 'description', 'rerun_options'])
+
+_EVENT_NAMES = ['Task%d' % i for i in xrange(64)]
+
+
+def CreateTraceEvents(options):
+  """Returns the events of a synthetic Chrome trace.
+
+  Every thread runs a sequence of tasks, each made of options.depth nested
+  complete events. The async slices, flows and counter samples are spread over
+  the threads of all processes, and every process takes part in each memory
+  dump.
+  """
+  rand = random.Random(options.seed)
+  threads = [(pid, pid * 1000 + tid)
+             for pid in xrange(1, options.processes + 1)
+             for tid in xrange(options.threads)]
+  events = []
+  for pid, tid in threads:
+    events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                   'args': {'name': 'Thread%d' % tid}})
+
+  # Nested complete events, each task lasting 100us.
+  tasks = max(options.events / options.depth / len(threads), 1)
+  for pid, tid in threads:
+    for task in xrange(tasks):
+      ts = task * 100
+      for level in xrange(options.depth):
+        events.append({
+            'name': rand.choice(_EVENT_NAMES), 'cat': 'benchmark',
+            'ph': 'X', 'pid': pid, 'tid': tid, 'ts': ts + level,
+            'dur': 90 - 2 * level, 'tts': ts + level, 'tdur': 50,
+            'args': {'level': level}})
+  duration = tasks * 100
+
+  for i in xrange(options.async_slices):
+    pid, tid = rand.choice(threads)
+    ts = rand.uniform(0, duration)
+    events.append({'name': 'Async', 'cat': 'benchmark', 'ph': 'S', 'id': i,
+                   'pid': pid, 'tid': tid, 'ts': ts, 'args': {}})
+    for step in xrange(options.async_steps):
+      events.append({'name': 'Async', 'cat': 'benchmark', 'ph': 'T', 'id': i,
+                     'pid': pid, 'tid': tid, 'ts': ts + step + 1,
+                     'args': {'step': 'Step%d' % step}})
+    events.append({'name': 'Async', 'cat': 'benchmark', 'ph': 'F', 'id': i,
+                   'pid': pid, 'tid': tid, 'ts': ts + options.async_steps + 1,
+                   'args': {}})
+
+  for i in xrange(options.flows):
+    ts = rand.uniform(0, duration)
+    for phase, offset in (('s', 0), ('t', 5), ('f', 10)):
+      pid, tid = rand.choice(threads)
+      events.append({'name': 'Flow', 'cat': 'benchmark', 'ph': phase, 'id': i,
+                     'pid': pid, 'tid': tid, 'ts': ts + offset, 'args': {}})
+
+  for i in xrange(options.counters):
+    pid, tid = rand.choice(threads)
+    events.append({'name': 'Counter', 'cat': 'benchmark', 'ph': 'C',
+                   'pid': pid, 'tid': tid, 'ts': duration * i / options.counters,
+                   'args': {'value': rand.randint(0, 1000)}})
+
+  for i in xrange(options.memory_dumps):
+    ts = duration * i / options.memory_dumps
+    for pid in xrange(1, options.processes + 1):
+      events.append({'name': 'periodic_interval', 'cat': 'benchmark',
+                     'ph': 'v', 'id': '%x' % i, 'pid': pid, 'ts': ts + pid,
+                     'args': {'dumps': {'allocators': {'malloc': {'attrs': {
+                         'size': {'value': hex(rand.randint(0, 1 << 30))}}}}}}})
+  return events
+
+
+def _PeakMemoryKB():
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Mac OS reports bytes, Linux kilobytes.
+  return peak / 1024 if sys.platform == 'darwin' else peak
+
+
+def ImportTrace(raw_trace, import_jobs=1):
+  """Imports a serialized trace like TimelineModel.ImportTraces.
+
+  Returns:
+    A dict with the time of each of the STAGES in ms, and the increase of the
+    peak memory use of the process in MB.
+  """
+  timings = {}
+  initial_peak_memory = _PeakMemoryKB()
+  def Time(stage, function, *args):
+    start = time.time()
+    result = function(*args)
+    timings[stage] = (time.time() - start) * 1000
+    return result
+
+  trace_data = Time('create_trace_data', trace_data_module.TraceData,
+                    raw_trace)
+  model = model_module.TimelineModel(import_jobs=import_jobs)
+  importers = model._CreateImporters(trace_data) # pylint: disable=W0212
+  def ImportEvents():
+    for importer in importers:
+      importer.ImportEvents()
+  Time('import_events', ImportEvents)
+  Time('finalize_import', model.FinalizeImport, False, importers)
+  Time('shift_world_to_zero', model.ShiftWorldToZero)
+  Time('update_bounds', model.UpdateBounds)
+  timings['peak_memory'] = (_PeakMemoryKB() - initial_peak_memory) / 1024.0
+  return timings
+
+
+def _ImportTraceInChild(raw_trace, import_jobs, queue):
+  queue.put(ImportTrace(raw_trace, import_jobs))
+
+
+def _ImportTraceInNewProcess(raw_trace, import_jobs):
+  # The peak memory use of a process never decreases, so every run needs its
+  # own process.
+  queue = multiprocessing.Queue()
+  child = multiprocessing.Process(target=_ImportTraceInChild,
+                                  args=(raw_trace, import_jobs, queue))
+  child.start()
+  timings = queue.get()
+  child.join()
+  return timings
+
+
+def ResultsAsChartDict(label, runs):
+  """Returns the Chart JSON of several runs of ImportTrace."""
+  values = []
+  for stage in STAGES + ['peak_memory']:
+    values.append(list_of_scalar_values.ListOfScalarValues(
+        None, value_module.ValueNameFromTraceAndChartName(label, stage),
+        'MB' if stage == 'peak_memory' else 'ms',
+        [run[stage] for run in runs]))
+  return chart_json_output_formatter.ResultsAsChartDict(
+      _BenchmarkMetadata('timeline_import', __doc__.split('\n')[0], None),
+      [], values)
+
+
+def Main(args):
+  parser = optparse.OptionParser(usage='%prog [options]')
+  parser.add_option('--events', type='int', default=100000,
+                    help='number of complete events')
+  parser.add_option('--processes', type='int', default=4)
+  parser.add_option('--threads', type='int', default=4,
+                    help='number of threads per process')
+  parser.add_option('--depth', type='int', default=4,
+                    help='nesting depth of the complete events')
+  parser.add_option('--async-slices', type='int', default=1000)
+  parser.add_option('--async-steps', type='int', default=2,
+                    help='number of steps, i.e. sub-slices, per async slice')
+  parser.add_option('--flows', type='int', default=1000)
+  parser.add_option('--counters', type='int', default=1000,
+                    help='number of counter samples')
+  parser.add_option('--memory-dumps', type='int', default=10)
+  parser.add_option('--seed', type='int', default=0)
+  parser.add_option('--import-jobs', type='int', default=1,
+                    help='see TimelineModel')
+  parser.add_option('--repeat', type='int', default=3,
+                    help='number of imports, each in a new process')
+  parser.add_option('--label', default='default',
+                    help='trace name of the results in the Chart JSON')
+  parser.add_option('--output', help='Chart JSON file, instead of stdout')
+  options, args = parser.parse_args(args)
+  if args:
+    parser.error('Unexpected arguments: %s' % ' '.join(args))
+  if min(options.processes, options.threads, options.depth) < 1:
+    parser.error('--processes, --threads and --depth must be positive.')
+
+  raw_trace = json.dumps({'traceEvents': CreateTraceEvents(options)})
+  runs = []
+  for _ in xrange(options.repeat):
+    runs.append(_ImportTraceInNewProcess(raw_trace, options.import_jobs))
+    print >> sys.stderr, ', '.join('%s: %.1f' % (stage, runs[-1][stage])
+                                   for stage in STAGES + ['peak_memory'])
+
+  chart_dict = ResultsAsChartDict(options.label, runs)
+  if options.output:
+    with open(options.output, 'w') as output_file:
+      json.dump(chart_dict, output_file, indent=2)
+  else:
+    json.dump(chart_dict, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(Main(sys.argv[1:]))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Times the passes of the timeline import that link events to each other.
+
+Synthetic traces with a growing number of async slices, flows and timeline
+markers are imported, and the time of each linking pass is printed with its
+growth over the previous size. The passes should grow about linearly, i.e. by
+a factor close to 2 when the size doubles.
+
+Usage: timeline_linking_benchmark.py [initial size] [number of doublings]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir))
+from telemetry.timeline import model as model_module
+from telemetry.timeline import trace_data as trace_data_module
+from telemetry.timeline import trace_event_importer
+
+_MARKER_NAME = 'Interaction.Benchmark'
+
+
+def _CreateTraceEvents(size):
+  events = []
+  for i in xrange(size):
+    ts = i * 100
+    # An async slice with a step, on two threads.
+    events.append({'name': 'Async', 'cat': 'c', 'ph': 'S', 'id': i,
+                   'ts': ts, 'pid': 1, 'tid': 1, 'args': {}})
+    events.append({'name': 'Async', 'cat': 'c', 'ph': 'T', 'id': i,
+                   'ts': ts + 30, 'pid': 1, 'tid': 2,
+                   'args': {'step': 'Step'}})
+    events.append({'name': 'Async', 'cat': 'c', 'ph': 'F', 'id': i,
+                   'ts': ts + 250, 'pid': 1, 'tid': 2, 'args': {}})
+    # A flow across the threads.
+    events.append({'name': 'Flow', 'cat': 'c', 'ph': 's', 'id': i,
+                   'ts': ts, 'pid': 1, 'tid': 1, 'args': {}})
+    events.append({'name': 'Flow', 'cat': 'c', 'ph': 'f', 'id': i,
+                   'ts': ts + 50, 'pid': 1, 'tid': 2, 'args': {}})
+    # Non-overlapping timeline markers.
+    events.append({'name': _MARKER_NAME, 'cat': 'c', 'ph': 'X',
+                   'ts': ts, 'dur': 50, 'pid': 1, 'tid': 3, 'args': {}})
+  return events
+
+
+def _Time(function, *args):
+  start = time.time()
+  function(*args)
+  return time.time() - start
+
+
+def _TimeLinkingPasses(size):
+  builder = trace_data_module.TraceDataBuilder()
+  builder.AddEventsTo(trace_data_module.CHROME_TRACE_PART,
+                      _CreateTraceEvents(size))
+  model = model_module.TimelineModel()
+  importer = trace_event_importer.TraceEventTimelineImporter(
+      model, builder.AsData())
+  importer.ImportEvents()
+  # pylint: disable=W0212
+  timings = [
+      ('async slices', _Time(importer._CreateAsyncSlices)),
+      ('flows', _Time(importer._CreateFlowSlices)),
+  ]
+  model.FinalizeImport()
+  timings.append(('timeline markers', _Time(model.FindTimelineMarkers,
+                                            [_MARKER_NAME] * size)))
+  return timings
+
+
+def Main(args):
+  size = int(args[0]) if args else 2000
+  doublings = int(args[1]) if len(args) > 1 else 4
+  previous = None
+  for _ in xrange(doublings + 1):
+    timings = _TimeLinkingPasses(size)
+    for index, (name, seconds) in enumerate(timings):
+      growth = ''
+      if previous and previous[index][1]:
+        growth = ' (x%.1f)' % (seconds / previous[index][1])
+      print '%8d %-16s %8.3fs%s' % (size, name, seconds, growth)
+    previous = timings
+    size *= 2
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(Main(sys.argv[1:]))
@@ -187,7 +187,7 @@ class Benchmark(command_line.Command):
     benchmark_metadata = self.GetMetadata()
     with results_options.CreateResults(
         benchmark_metadata, finder_options,
-        self.ValueCanBeAddedPredicate) as results:
+        self.ValueCanBeAddedPredicate, stories) as results:
       try:
         story_runner.Run(pt, stories, expectations, finder_options, results,
                               max_failures=self._max_failures)
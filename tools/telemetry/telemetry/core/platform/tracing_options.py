@@ -23,10 +23,15 @@ class TracingOptions(object):
                     record modes in chrome (see
                     TraceRecordMode in base/trace_event/trace_event_impl.h for
                     more information)
+         trace_file_dir: if set, chrome trace data is written to a gzipped
+                       file in this directory as it is received, instead of
+                       being kept in memory. The file is removed by
+                       CleanUp() on the returned TraceData.
   """
   def __init__(self):
     self.enable_chrome_trace = False
     self.enable_platform_display_trace = False
+    self.trace_file_dir = None
     self._record_mode = RECORD_AS_MUCH_AS_POSSIBLE
 
   @property
@@ -3,7 +3,9 @@
 # found in the LICENSE file.
 
 import logging
+import os
 import socket
+import tempfile
 import time
 
 from telemetry.core.platform import tracing_options
@@ -38,6 +40,8 @@ class TracingBackend(object):
     self._inspector_websocket.Connect(
         'ws://127.0.0.1:%i/devtools/browser' % devtools_port)
     self._trace_events = []
+    self._trace_file_writer = None
+    self._trace_file = None
     self._is_tracing_running = False
     self._has_received_all_tracing_data = False
 
@@ -54,6 +58,12 @@ class TracingBackend(object):
       return False
     # Reset collected tracing data from previous tracing calls.
     self._trace_events = []
+    self._trace_file = None
+    if self._trace_file_writer:
+      # The data of a run that failed to stop is incomplete, and not part of
+      # any TraceData that would clean up its file.
+      self._trace_file_writer.Close().CleanUp()
+      self._trace_file_writer = None
 
     if not self.IsTracingSupported():
       raise TracingUnsupportedException(
@@ -74,6 +84,9 @@ class TracingBackend(object):
     if custom_categories:
       req['params']['categories'] = custom_categories
     self._inspector_websocket.SyncRequest(req, timeout)
+    if trace_options.trace_file_dir is not None:
+      self._trace_file_writer = self._CreateTraceFileWriter(
+          trace_options.trace_file_dir)
     self._is_tracing_running = True
     return True
 
@@ -84,7 +97,7 @@ class TracingBackend(object):
     tracing run is pushed.
     """
     if not self.is_tracing_running:
-      if not self._trace_events:
+      if not self._trace_events and not self._trace_file:
         raise TracingHasNotRunException()
     else:
       req = {'method': 'Tracing.end'}
@@ -93,9 +106,24 @@ class TracingBackend(object):
       # containing trace data. This is until Tracing.tracingComplete is sent,
       # which means there is no trace buffers pending flush.
       self._CollectTracingData(timeout)
+      if self._trace_file_writer:
+        self._trace_file = self._trace_file_writer.Close()
+        self._trace_file_writer = None
     self._is_tracing_running = False
-    trace_data_builder.AddEventsTo(
-      trace_data_module.CHROME_TRACE_PART, self._trace_events)
+    if self._trace_file:
+      trace_data_builder.AddTraceFileTo(
+        trace_data_module.CHROME_TRACE_PART, self._trace_file)
+    else:
+      trace_data_builder.AddEventsTo(
+        trace_data_module.CHROME_TRACE_PART, self._trace_events)
+
+  @staticmethod
+  def _CreateTraceFileWriter(trace_file_dir):
+    fd, path = tempfile.mkstemp(prefix='chrome_trace_', suffix='.json.gz',
+                                dir=trace_file_dir)
+    os.close(fd)
+    logging.info('Writing chrome trace data to %s', path)
+    return trace_data_module.TraceFileWriter(path)
 
   def _CollectTracingData(self, timeout):
     """Collects tracing data. Assumes that Tracing.end has already been sent.
@@ -133,11 +161,14 @@ class TracingBackend(object):
     if 'Tracing.dataCollected' == res.get('method'):
       value = res.get('params', {}).get('value')
       if type(value) in [str, unicode]:
-        self._trace_events.append(value)
-      elif type(value) is list:
-        self._trace_events.extend(value)
-      else:
+        value = [value]
+      elif type(value) is not list:
         logging.warning('Unexpected type in tracing data')
+        return
+      if self._trace_file_writer:
+        self._trace_file_writer.WriteEvents(value)
+      else:
+        self._trace_events.extend(value)
     elif 'Tracing.tracingComplete' == res.get('method'):
       self._has_received_all_tracing_data = True
       return True
@@ -2,6 +2,9 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from telemetry.core.platform import tracing_category_filter
@@ -44,6 +47,9 @@ class FakeInspectorWebsocket(object):
   def Connect(self, _):
     pass
 
+  def SyncRequest(self, req, timeout=None):  # pylint: disable=W0613
+    return {}
+
   def DispatchNotifications(self, timeout):
     current_time = self._mock_timer.time()
     if not self._responses:
@@ -137,3 +143,51 @@ class TracingBackendUnitTest(unittest.TestCase):
     backend._CollectTracingData(10)
     self.assertEqual(2, len(backend._trace_events))
     self.assertTrue(backend._has_received_all_tracing_data)
+
+  def testCollectTracingDataToFile(self):
+    inspector = FakeInspectorWebsocket(self._mock_timer)
+    inspector.AddResponse('Tracing.dataCollected', [{'ph': 'B'}], 9)
+    inspector.AddResponse('Tracing.dataCollected', [{'ph': 'E'}], 14)
+    inspector.AddResponse('Tracing.tracingComplete', 'asdf3', 19)
+
+    with mock.patch('telemetry.internal.backends.chrome_inspector.'
+                    'inspector_websocket.InspectorWebsocket') as mock_class:
+      mock_class.return_value = inspector
+      backend = tracing_backend.TracingBackend(devtools_port=65000)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+      backend._trace_file_writer = backend._CreateTraceFileWriter(temp_dir)
+      backend._CollectTracingData(10)
+      self.assertEqual(0, len(backend._trace_events))
+
+      trace_file = backend._trace_file_writer.Close()
+      self.assertEqual(2, trace_file.event_count)
+      self.assertEqual(temp_dir, os.path.dirname(trace_file.file_path))
+      self.assertEqual([{'ph': 'B'}, {'ph': 'E'}],
+                       list(trace_file.IterEvents()))
+    finally:
+      shutil.rmtree(temp_dir)
+
+  def testStartTracingRemovesFileOfFailedRun(self):
+    inspector = FakeInspectorWebsocket(self._mock_timer)
+    with mock.patch('telemetry.internal.backends.chrome_inspector.'
+                    'inspector_websocket.InspectorWebsocket') as mock_class:
+      mock_class.return_value = inspector
+      backend = tracing_backend.TracingBackend(devtools_port=65000)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+      # A writer left open by a run whose trace data was not all collected.
+      backend._trace_file_writer = backend._CreateTraceFileWriter(temp_dir)
+      stale_path = os.listdir(temp_dir)[0]
+
+      options = tracing_options.TracingOptions()
+      options.trace_file_dir = temp_dir
+      self.assertTrue(backend.StartTracing(options))
+      self.assertEqual(1, len(os.listdir(temp_dir)))
+      self.assertNotIn(stale_path, os.listdir(temp_dir))
+      backend._trace_file_writer.Close().CleanUp()
+      self.assertEqual([], os.listdir(temp_dir))
+    finally:
+      shutil.rmtree(temp_dir)
@@ -6,12 +6,14 @@ import collections
 import copy
 import datetime
 import logging
+import os
 import random
 import sys
 import traceback
 
 from catapult_base import cloud_storage
 from telemetry.internal.results import progress_reporter as reporter_module
+from telemetry.internal.results import results_log
 from telemetry.internal.results import story_run
 from telemetry import value as value_module
 from telemetry.value import failure
@@ -22,7 +24,8 @@ from telemetry.value import trace
 class PageTestResults(object):
   def __init__(self, output_stream=None, output_formatters=None,
                progress_reporter=None, trace_tag='', output_dir=None,
-               value_can_be_added_predicate=lambda v, is_first: True):
+               value_can_be_added_predicate=lambda v, is_first: True,
+               results_log_path=None, stories=None):
     """
     Args:
       output_stream: The output stream to use to write test results.
@@ -40,6 +43,11 @@ class PageTestResults(object):
           or trace.TraceValue) and a boolean (True when the value is part of
           the first result for the story). It returns True if the value
           can be added to the test results and False otherwise.
+      results_log_path: If set, the values of each story run are appended to
+          this file as soon as the run ends, see results_log. The runs already
+          logged in it are read back as the first runs of these results.
+      stories: The stories run, needed with results_log_path to match the
+          logged runs to the stories.
     """
     # TODO(chrishenry): Figure out if trace_tag is still necessary.
 
@@ -63,6 +71,23 @@ class PageTestResults(object):
     self._pages_to_profiling_files = collections.defaultdict(list)
     self._pages_to_profiling_files_cloud_url = collections.defaultdict(list)
 
+    self._results_log_writer = None
+    self._logged_run_counts = collections.defaultdict(int)
+    if results_log_path:
+      assert stories is not None, 'The stories of a results log are needed.'
+      if os.path.exists(results_log_path):
+        for run in results_log.ReadStoryRuns(results_log_path, stories):
+          self._AddLoggedRun(run)
+      self._results_log_writer = results_log.ResultsLogWriter(
+          results_log_path, stories)
+
+  def _AddLoggedRun(self, run):
+    for value in run.values:
+      self._ValidateValue(value)
+    self._all_page_runs.append(run)
+    self._all_stories.add(run.story)
+    self._logged_run_counts[run.story] += 1
+
   def __copy__(self):
     cls = self.__class__
     result = cls.__new__(cls)
@@ -149,6 +174,12 @@ class PageTestResults(object):
 
   def __exit__(self, _, __, ___):
     self.CleanUp()
+    if self._results_log_writer:
+      self._results_log_writer.Close()
+
+  def GetLoggedRunCount(self, story):
+    """Returns the number of runs of a story read back from the results log."""
+    return self._logged_run_counts[story]
 
   def WillRunPage(self, page):
     assert not self._current_page_run, 'Did not call DidRunPage.'
@@ -162,6 +193,8 @@ class PageTestResults(object):
     """
     assert self._current_page_run, 'Did not call WillRunPage.'
     self._progress_reporter.DidRunPage(self)
+    if self._results_log_writer:
+      self._results_log_writer.WriteStoryRun(self._current_page_run)
     self._all_page_runs.append(self._current_page_run)
     self._all_stories.add(self._current_page_run.story)
     self._current_page_run = None
@@ -3,6 +3,8 @@
 # found in the LICENSE file.
 
 import os
+import shutil
+import tempfile
 import unittest
 
 from telemetry import story
@@ -187,6 +189,35 @@ class PageTestResultsTest(base_test_results_unittest.BaseTestResultsUnittest):
     self.assertEquals(
         [value1, value2, value3], results.all_page_specific_values)
 
+  def testResumeFromResultsLog(self):
+    temp_dir = tempfile.mkdtemp()
+    try:
+      log_path = os.path.join(temp_dir, 'results.jsonl')
+      results = page_test_results.PageTestResults(results_log_path=log_path,
+                                                  stories=self.pages)
+      results.WillRunPage(self.pages[0])
+      results.AddValue(scalar.ScalarValue(self.pages[0], 'a', 'seconds', 3))
+      results.DidRunPage(self.pages[0])
+      # The run is interrupted while the second page runs.
+      results.WillRunPage(self.pages[1])
+
+      results = page_test_results.PageTestResults(results_log_path=log_path,
+                                                  stories=self.pages)
+      self.assertEqual(1, results.GetLoggedRunCount(self.pages[0]))
+      self.assertEqual(0, results.GetLoggedRunCount(self.pages[1]))
+      results.WillRunPage(self.pages[1])
+      results.AddValue(scalar.ScalarValue(self.pages[1], 'a', 'seconds', 7))
+      results.DidRunPage(self.pages[1])
+
+      values = results.FindAllPageSpecificValuesNamed('a')
+      self.assertEqual([(self.pages[0], 3), (self.pages[1], 7)],
+                       [(v.page, v.value) for v in values])
+      results = page_test_results.PageTestResults(results_log_path=log_path,
+                                                  stories=self.pages)
+      self.assertEqual(2, len(results.all_page_runs))
+    finally:
+      shutil.rmtree(temp_dir)
+
   def testTraceValue(self):
     results = page_test_results.PageTestResults()
     results.WillRunPage(self.pages[0])
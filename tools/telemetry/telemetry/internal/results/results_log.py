@@ -0,0 +1,138 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""Logs the results of each story run as soon as the run ends.
+
+The log is a JSON lines file with one record per story run, holding the story
+and the values of the run as serialized by AsDict. It is only ever appended
+to, so a benchmark that crashes loses at most the story it was running, and a
+new run given the same log resumes from the stories that are already logged.
+
+Trace values are not logged: they are kept in their own files, and cannot be
+read back with Value.FromDict.
+"""
+
+import collections
+import json
+import logging
+import os
+
+from telemetry.internal.results import story_run
+from telemetry import value as value_module
+from telemetry.value import trace
+
+FORMAT_VERSION = '0.1'
+
+
+def _StoryFields(story_dict):
+  return tuple(sorted((k, v) for k, v in story_dict.iteritems() if k != 'id'))
+
+
+def _StoryKeys(stories):
+  """Returns the keys identifying stories across runs, by story.
+
+  Story IDs differ in each run, so a story is identified by its other
+  serialized fields, and by its position among the stories sharing them, such
+  as unnamed stories or pages with the same URL.
+  """
+  keys = {}
+  occurrences = collections.defaultdict(int)
+  for story in stories:
+    fields = _StoryFields(story.AsDict())
+    keys[story] = (fields, occurrences[fields])
+    occurrences[fields] += 1
+  return keys
+
+
+class ResultsLogWriter(object):
+  def __init__(self, path, stories):
+    """
+    Args:
+      path: The log file, which is appended to.
+      stories: The stories whose runs are logged.
+    """
+    self._story_occurrences = dict(
+        (story, occurrence)
+        for story, (_, occurrence) in _StoryKeys(stories).iteritems())
+    self._file = open(path, 'a')
+    # The last record of an interrupted run may have been cut short. It must
+    # not swallow the first record of this run.
+    if self._file.tell() and not _EndsWithNewline(path):
+      self._file.write('\n')
+
+  def WriteStoryRun(self, run):
+    record = {
+      'format_version': FORMAT_VERSION,
+      'story': run.story.AsDict(),
+      'story_occurrence': self._story_occurrences[run.story],
+      'values': [v.AsDict() for v in run.values
+                 if not isinstance(v, trace.TraceValue)]
+    }
+    self._file.write(json.dumps(record) + '\n')
+    # Write the record through to disk, so it outlives a crash of the browser
+    # taking the machine down with it.
+    self._file.flush()
+    os.fsync(self._file.fileno())
+
+  def Close(self):
+    self._file.close()
+
+
+def _EndsWithNewline(path):
+  with open(path, 'rb') as f:
+    f.seek(-1, os.SEEK_END)
+    return f.read(1) == '\n'
+
+
+def _ReadRecords(path):
+  with open(path) as f:
+    for line_number, line in enumerate(f, 1):
+      if not line.strip():
+        continue
+      try:
+        yield json.loads(line)
+      except ValueError:
+        logging.warning('Ignoring incomplete record on line %d of results log '
+                        '%s.', line_number, path)
+
+
+def ReadStoryRuns(path, stories):
+  """Returns the StoryRuns logged in a results log, in the order they ran.
+
+  Args:
+    path: A results log written by ResultsLogWriter.
+    stories: The stories of the run to resume. The logged runs of other
+        stories are ignored.
+  """
+  stories = list(stories)
+  story_keys = _StoryKeys(stories)
+  story_indexes = dict((story_keys[story], index)
+                       for index, story in enumerate(stories))
+
+  logged_runs = []
+  value_dicts = []
+  for record in _ReadRecords(path):
+    index = story_indexes.get((_StoryFields(record['story']),
+                               record['story_occurrence']))
+    if index is None:
+      logging.warning('Ignoring logged run of unknown story %s.',
+                      record['story'])
+      continue
+    for value_dict in record['values']:
+      # The page IDs of the log are those of the run that wrote it.
+      if 'page_id' in value_dict:
+        value_dict['page_id'] = index
+    logged_runs.append((index, len(record['values'])))
+    value_dicts.extend(record['values'])
+
+  values = value_module.Value.ListOfValuesFromListOfDicts(
+      value_dicts, dict(enumerate(stories)))
+  runs = []
+  first_value = 0
+  for index, number_of_values in logged_runs:
+    run = story_run.StoryRun(stories[index])
+    for value in values[first_value:first_value + number_of_values]:
+      run.AddValue(value)
+    first_value += number_of_values
+    runs.append(run)
+  return runs
@@ -0,0 +1,99 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from telemetry import story
+from telemetry.internal.results import results_log
+from telemetry.internal.results import story_run
+from telemetry import page as page_module
+from telemetry.timeline import trace_data
+from telemetry.value import failure
+from telemetry.value import scalar
+from telemetry.value import trace
+
+
+def _CreateStorySet(urls):
+  story_set = story.StorySet(base_dir=os.path.dirname(__file__))
+  for url in urls:
+    story_set.AddStory(page_module.Page(url, story_set, story_set.base_dir))
+  return story_set
+
+
+class ResultsLogTest(unittest.TestCase):
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._log_path = os.path.join(self._temp_dir, 'results.jsonl')
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def _WriteRuns(self, stories, values_per_story):
+    writer = results_log.ResultsLogWriter(self._log_path, stories)
+    for s, values in zip(stories, values_per_story):
+      run = story_run.StoryRun(s)
+      for value in values(s):
+        run.AddValue(value)
+      writer.WriteStoryRun(run)
+    writer.Close()
+
+  def testRunsAreReadBackForTheStoriesOfANewRun(self):
+    urls = ['http://www.foo.com/', 'http://www.bar.com/']
+    logged_stories = _CreateStorySet(urls).stories
+    trace_value = trace.TraceValue(None, trace_data.TraceData({'test': 1}))
+    try:
+      self._WriteRuns(logged_stories, [
+          lambda s: [scalar.ScalarValue(s, 'a', 'ms', 3), trace_value],
+          lambda s: [failure.FailureValue.FromMessage(s, 'message')]])
+    finally:
+      trace_value.CleanUp()
+
+    # The stories of the new run have other IDs.
+    stories = _CreateStorySet(reversed(urls)).stories
+    runs = results_log.ReadStoryRuns(self._log_path, stories)
+    self.assertEqual([stories[1], stories[0]], [run.story for run in runs])
+    self.assertTrue(runs[0].ok)
+    self.assertEqual(1, len(runs[0].values))
+    value = runs[0].values[0]
+    self.assertEqual(('a', 'ms', 3, stories[1]),
+                     (value.name, value.units, value.value, value.page))
+    self.assertTrue(runs[1].failed)
+    self.assertEqual(stories[0], runs[1].values[0].page)
+
+  def testRunsOfOtherStoriesAreIgnored(self):
+    self._WriteRuns(_CreateStorySet(['http://www.foo.com/']).stories,
+                    [lambda s: [scalar.ScalarValue(s, 'a', 'ms', 3)]])
+    stories = _CreateStorySet(['http://www.bar.com/']).stories
+    self.assertEqual([], results_log.ReadStoryRuns(self._log_path, stories))
+
+  def testStoriesWithTheSameFieldsAreToldApart(self):
+    urls = ['http://www.foo.com/', 'http://www.foo.com/']
+    logged_stories = _CreateStorySet(urls).stories
+    writer = results_log.ResultsLogWriter(self._log_path, logged_stories)
+    run = story_run.StoryRun(logged_stories[1])
+    run.AddValue(scalar.ScalarValue(logged_stories[1], 'a', 'ms', 3))
+    writer.WriteStoryRun(run)
+    writer.Close()
+
+    stories = _CreateStorySet(urls).stories
+    runs = results_log.ReadStoryRuns(self._log_path, stories)
+    self.assertEqual([stories[1]], [run.story for run in runs])
+    self.assertEqual(stories[1], runs[0].values[0].page)
+
+  def testIncompleteRecordOfInterruptedRunIsIgnored(self):
+    urls = ['http://www.foo.com/', 'http://www.bar.com/']
+    stories = _CreateStorySet(urls).stories
+    self._WriteRuns(stories[:1],
+                    [lambda s: [scalar.ScalarValue(s, 'a', 'ms', 3)]])
+    with open(self._log_path, 'a') as f:
+      f.write('{"story": {"id": ')
+
+    self._WriteRuns(stories[1:],
+                    [lambda s: [scalar.ScalarValue(s, 'a', 'ms', 4)]])
+    runs = results_log.ReadStoryRuns(self._log_path, stories)
+    self.assertEqual([stories[0], stories[1]], [run.story for run in runs])
+    self.assertEqual([3, 4], [run.values[0].value for run in runs])
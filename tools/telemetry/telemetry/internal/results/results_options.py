@@ -60,6 +60,11 @@ def AddResultsOptions(parser):
   group.add_option('--results-label',
                     default=None,
                     help='Optional label to use for the results of a run .')
+  group.add_option('--results-log',
+                   default=None,
+                   help='Append the results of each story to this JSON lines '
+                   'file as soon as the story ends. If the file already has '
+                   'results, the run resumes after the stories logged in it.')
   group.add_option('--suppress_gtest_report',
                    default=False,
                    help='Whether to suppress GTest progress report.')
@@ -111,10 +116,12 @@ def _GetProgressReporter(output_skipped_tests_summary, suppress_gtest_report):
 
 
 def CreateResults(benchmark_metadata, options,
-                  value_can_be_added_predicate=lambda v, is_first: True):
+                  value_can_be_added_predicate=lambda v, is_first: True,
+                  stories=None):
   """
   Args:
     options: Contains the options specified in AddResultsOptions.
+    stories: The stories to be run, needed to resume from --results-log.
   """
   if not options.output_formats:
     options.output_formats = [_OUTPUT_FORMAT_CHOICES[0]]
@@ -163,9 +170,14 @@ def CreateResults(benchmark_metadata, options,
   # results too (in a separate patch), and see if we break anything.
   output_skipped_tests_summary = 'gtest' in options.output_formats
 
+  if options.results_log and stories is None:
+    # The logged runs could not be matched to the stories to resume.
+    raise Exception('--results-log is not supported by this command.')
+
   reporter = _GetProgressReporter(output_skipped_tests_summary,
                                   options.suppress_gtest_report)
   return page_test_results.PageTestResults(
       output_formatters=output_formatters, progress_reporter=reporter,
       output_dir=options.output_dir,
-      value_can_be_added_predicate=value_can_be_added_predicate)
+      value_can_be_added_predicate=value_can_be_added_predicate,
+      results_log_path=options.results_log, stories=stories)
@@ -188,6 +188,14 @@ def Run(test, story_set, expectations, finder_options, results,
         stories):
       return
 
+  # The runs of the run resumed from the results log take the place of the
+  # first repeats of their stories, which are not run again.
+  runs_per_story = finder_options.pageset_repeat * finder_options.page_repeat
+  logged_run_counts = dict((story, results.GetLoggedRunCount(story))
+                           for story in stories)
+  stories = [story for story in stories
+             if logged_run_counts[story] < runs_per_story]
+
   if not stories:
     return
 
@@ -206,6 +214,9 @@ def Run(test, story_set, expectations, finder_options, results,
       for _ in xrange(finder_options.pageset_repeat):
         for story in group.stories:
           for _ in xrange(finder_options.page_repeat):
+            if logged_run_counts[story]:
+              logged_run_counts[story] -= 1
+              continue
             if not state:
               state = group.shared_state_class(
                   test, finder_options, story_set)
@@ -3,8 +3,10 @@
 # found in the LICENSE file.
 
 import os
+import shutil
 import StringIO
 import sys
+import tempfile
 import unittest
 
 from catapult_base import cloud_storage
@@ -206,6 +208,36 @@ class StoryRunnerTest(unittest.TestCase):
     self.assertEquals(expected_successes,
                       GetNumberOfSuccessfulPageRuns(self.results))
 
+  def testRunResumesFromResultsLog(self):
+    story_set = story_module.StorySet()
+    foo = DummyLocalStory(FooStoryState, name='foo')
+    bar = DummyLocalStory(FooStoryState, name='bar')
+    story_set.AddStory(foo)
+    story_set.AddStory(bar)
+    self.options.pageset_repeat = 3
+    temp_dir = tempfile.mkdtemp()
+    try:
+      self.options.results_log = os.path.join(temp_dir, 'results.jsonl')
+      # The run was interrupted after the first repeat of foo.
+      with results_options.CreateResults(
+          EmptyMetadataForTest(), self.options, stories=story_set) as results:
+        results.WillRunPage(foo)
+        results.DidRunPage(foo)
+
+      with results_options.CreateResults(
+          EmptyMetadataForTest(), self.options, stories=story_set) as results:
+        story_runner.Run(
+            DummyTest(), story_set, self.expectations, self.options, results)
+        self.assertEquals([foo, bar, foo, bar, foo, bar],
+                          [run.story for run in results.all_page_runs])
+    finally:
+      shutil.rmtree(temp_dir)
+
+  def testResultsLogNeedsStories(self):
+    self.options.results_log = 'results.jsonl'
+    self.assertRaises(Exception, results_options.CreateResults,
+                      EmptyMetadataForTest(), self.options)
+
   def testStoryTest(self):
     all_foo = [FooStoryState, FooStoryState, FooStoryState]
     one_bar = [FooStoryState, FooStoryState, BarStoryState]
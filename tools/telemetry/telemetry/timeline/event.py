@@ -11,7 +11,13 @@ class TimelineEvent(object):
   on trace events and the corresponding attributes in TimelineEvent will be
   set to None (not 0) if not present. Users of this class need to properly
   handle this case.
+
+  Traces have millions of events, so events only have the attributes listed
+  in __slots__; subclasses list theirs too.
   """
+  __slots__ = ('category', 'name', 'start', 'duration', 'thread_start',
+               'thread_duration', 'args')
+
   def __init__(self, category, name, start, duration, thread_start=None,
                thread_duration=None, args=None):
     self.category = category
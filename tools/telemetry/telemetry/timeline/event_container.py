@@ -11,9 +11,18 @@ class TimelineEventContainer(object):
   """Represents a container for events.
 
   """
+  # The types a container passes to the event_type_predicate of
+  # IterEventsInThisContainer, in the order it yields them. The events of
+  # containers that list their types are indexed by name, see
+  # IterAllEventsOfName. None for containers whose events are not indexed.
+  INDEXED_EVENT_TYPES = None
+
   def __init__(self, name, parent):
     self.parent = parent
     self.name = name
+    # Maps event names to lists of (event type, event) in the order of
+    # IterEventsInThisContainer. Built on first use.
+    self._events_by_name = None
 
   @staticmethod
   def IsAsyncSlice(t):
@@ -70,6 +79,54 @@ class TimelineEventContainer(object):
         yield e
       return
 
+    # Actually create the iterator.
+    for c in self._GetContainersRecursive():
+      for e in c.IterEventsInThisContainer(event_type_predicate,
+                                           event_predicate):
+        yield e
+
+  def InvalidateIndexes(self):
+    """Drops the indexes of the events in this container.
+
+    Containers call this when events are added to them, so it only needs to be
+    called after events are changed in place.
+    """
+    self._events_by_name = None
+
+  def _GetEventsByName(self):
+    if self._events_by_name is None:
+      events_by_name = {}
+      for event_type in self.INDEXED_EVENT_TYPES:
+        for event in self.IterEventsInThisContainer(
+            lambda t, event_type=event_type: t == event_type,
+            lambda e: True):
+          events_by_name.setdefault(event.name, []).append((event_type, event))
+      self._events_by_name = events_by_name
+    return self._events_by_name
+
+  def _IterAllEventsOfName(self, name, recursive,
+                           event_type_predicate, event_predicate):
+    """Like IterAllEvents, for events of a name.
+
+    The events of indexed containers are looked up by name instead of walking
+    all of them.
+    """
+    containers = [self]
+    if recursive:
+      containers = self._GetContainersRecursive()
+    for c in containers:
+      if c.INDEXED_EVENT_TYPES is None:
+        for e in c.IterEventsInThisContainer(
+            event_type_predicate,
+            lambda e: e.name == name and event_predicate(e)):
+          yield e
+        continue
+      # pylint: disable=W0212
+      for event_type, e in c._GetEventsByName().get(name, ()):
+        if event_type_predicate(event_type) and event_predicate(e):
+          yield e
+
+  def _GetContainersRecursive(self):
     # TODO(nduca): Write this as a proper iterator instead of one that creates a
     # list and then iterates it.
     containers = []
@@ -78,20 +135,15 @@ class TimelineEventContainer(object):
       for container in container.IterChildContainers():
         GetContainersRecursive(container)
     GetContainersRecursive(self)
-
-    # Actually create the iterator.
-    for c in containers:
-      for e in c.IterEventsInThisContainer(event_type_predicate,
-                                           event_predicate):
-        yield e
+    return containers
 
   # Helper functions for finding common kinds of events. Must always take an
   # optinal recurisve parameter and be implemented in terms fo IterAllEvents.
-  def IterAllEventsOfName(self, name, recursive=True):
-    return self.IterAllEvents(
-      recursive=recursive,
+  def IterAllEventsOfName(self, name, recursive=True, category=None):
+    return self._IterAllEventsOfName(
+      name, recursive,
       event_type_predicate=lambda t: True,
-      event_predicate=lambda e: e.name == name)
+      event_predicate=lambda e: category is None or e.category == category)
 
   def IterAllSlices(self, recursive=True):
     return self.IterAllEvents(
@@ -105,22 +157,22 @@ class TimelineEventContainer(object):
       event_predicate=lambda s: s.start >= start and s.end <= end)
 
   def IterAllSlicesOfName(self, name, recursive=True):
-    return self.IterAllEvents(
-      recursive=recursive,
+    return self._IterAllEventsOfName(
+      name, recursive,
       event_type_predicate=lambda t: t == slice_module.Slice,
-      event_predicate=lambda e: e.name == name)
+      event_predicate=lambda e: True)
 
   def IterAllToplevelSlicesOfName(self, name, recursive=True):
-    return self.IterAllEvents(
-      recursive=recursive,
+    return self._IterAllEventsOfName(
+      name, recursive,
       event_type_predicate=lambda t: t == slice_module.Slice,
-      event_predicate=lambda e: e.name == name and e.parent_slice == None)
+      event_predicate=lambda e: e.parent_slice == None)
 
   def IterAllAsyncSlicesOfName(self, name, recursive=True):
-    return self.IterAllEvents(
-      recursive=recursive,
+    return self._IterAllEventsOfName(
+      name, recursive,
       event_type_predicate=self.IsAsyncSlice,
-      event_predicate=lambda e: e.name == name)
+      event_predicate=lambda e: True)
 
   def IterAllAsyncSlicesStartsWithName(self, name, recursive=True):
     return self.IterAllEvents(
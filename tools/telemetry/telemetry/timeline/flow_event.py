@@ -9,6 +9,8 @@ class FlowEvent(event.TimelineEvent):
   """A FlowEvent represents an interval of time plus parameters associated
   with that interval.
   """
+  __slots__ = ('event_id',)
+
   def __init__(self, category, event_id, name, start, args=None):
     super(FlowEvent, self).__init__(
         category, name, start, duration=0, args=args)
@@ -0,0 +1,93 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import bisect
+import math
+
+
+def _DurationLevel(duration):
+  """Returns the group of events of a duration, see IntervalIndex."""
+  if duration <= 0:
+    return None
+  # The binary exponent, so durations in a group differ at most twofold.
+  return math.frexp(duration)[1]
+
+
+class IntervalIndex(object):
+  """A static index of timeline events, for queries by time range.
+
+  The events are grouped by the magnitude of their duration, and sorted by
+  start time within each group. The events of a group that intersect a range
+  start at most the longest duration of the group before it, so they are
+  found with two binary searches per group, plus a few events of a similar
+  duration that end just before the range.
+
+  Results are sorted by start time. Events with the same start time keep the
+  order in which they were given.
+  """
+  def __init__(self, events):
+    groups = {}
+    for order, event in enumerate(events):
+      groups.setdefault(_DurationLevel(event.duration), []).append(
+          (event.start, order, event))
+    self._groups = []
+    self._size = 0
+    for group in groups.itervalues():
+      group.sort()
+      self._groups.append((
+          max(event.duration for _, _, event in group),
+          [start for start, _, _ in group],
+          group))
+      self._size += len(group)
+
+  def __len__(self):
+    return self._size
+
+  def GetIntersecting(self, start, end):
+    """Returns the events that intersect [start, end], bounds included."""
+    results = []
+    for max_duration, starts, group in self._groups:
+      first = bisect.bisect_left(starts, start - max_duration)
+      last = bisect.bisect_right(starts, end)
+      results.extend(item for item in group[first:last]
+                     if item[2].end >= start)
+    return _SortedEvents(results)
+
+  def GetContained(self, start, end):
+    """Returns the events within [start, end], bounds included."""
+    results = []
+    for _, starts, group in self._groups:
+      first = bisect.bisect_left(starts, start)
+      last = bisect.bisect_right(starts, end)
+      results.extend(item for item in group[first:last] if item[2].end <= end)
+    return _SortedEvents(results)
+
+  def GetStartingIn(self, start, end):
+    """Returns the events that start within [start, end], bounds included."""
+    results = []
+    for _, starts, group in self._groups:
+      first = bisect.bisect_left(starts, start)
+      last = bisect.bisect_right(starts, end)
+      results.extend(group[first:last])
+    return _SortedEvents(results)
+
+
+def _SortedEvents(items):
+  items.sort()
+  return [event for _, _, event in items]
+
+
+def GetCachedIndex(cache, iter_events, name=None):
+  """Returns the IntervalIndex of some events, building it on first use.
+
+  Args:
+    cache: A dict owned by the container of the events, which it clears when
+        its events change.
+    iter_events: A function taking a name, or None for all names, and
+        returning an iterable of the events of that name to index.
+    name: If set, only the events of this name are indexed.
+  """
+  if name not in cache:
+    cache[name] = IntervalIndex(iter_events(name))
+  return cache[name]
@@ -0,0 +1,64 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+import random
+import unittest
+
+from telemetry.timeline import event
+from telemetry.timeline import interval_index
+
+
+class IntervalIndexTest(unittest.TestCase):
+
+  def setUp(self):
+    rand = random.Random(0)
+    self.events = []
+    for i in xrange(500):
+      # Mix durations of several magnitudes, including zero.
+      duration = rand.choice([0, 0.5, 3, 40, 700]) * rand.random()
+      self.events.append(event.TimelineEvent(
+          'cat', 'event %d' % i, rand.uniform(0, 1000), duration))
+    self.index = interval_index.IntervalIndex(self.events)
+
+  def Expected(self, predicate):
+    return sorted((e for e in self.events if predicate(e)),
+                  key=lambda e: e.start)
+
+  def testLen(self):
+    self.assertEqual(500, len(self.index))
+    self.assertEqual(0, len(interval_index.IntervalIndex([])))
+
+  def testGetIntersecting(self):
+    for start, end in [(100, 200), (0, 1000), (-10, 0), (999, 2000),
+                       (500, 500), (300, 301)]:
+      self.assertEqual(
+          self.Expected(lambda e: e.start <= end and e.end >= start),
+          self.index.GetIntersecting(start, end))
+
+  def testGetContained(self):
+    for start, end in [(100, 200), (0, 1000), (500, 500), (300, 350)]:
+      self.assertEqual(
+          self.Expected(lambda e: e.start >= start and e.end <= end),
+          self.index.GetContained(start, end))
+
+  def testGetStartingIn(self):
+    for start, end in [(100, 200), (0, 1000), (300, 350)]:
+      self.assertEqual(
+          self.Expected(lambda e: start <= e.start <= end),
+          self.index.GetStartingIn(start, end))
+
+  def testTiesKeepOrder(self):
+    events = [event.TimelineEvent('cat', name, 10, duration)
+              for name, duration in [('a', 5), ('b', 0), ('c', 100), ('d', 5)]]
+    index = interval_index.IntervalIndex(events)
+    self.assertEqual(events, index.GetIntersecting(0, 20))
+
+  def testGetCachedIndex(self):
+    def IterEvents(name):
+      return [e for e in self.events if name is None or e.name == name]
+    cache = {}
+    index = interval_index.GetCachedIndex(cache, IterEvents)
+    self.assertIs(index, interval_index.GetCachedIndex(cache, IterEvents))
+    named_index = interval_index.GetCachedIndex(cache, IterEvents, 'event 7')
+    self.assertEqual([self.events[7]], named_index.GetIntersecting(-1, 2000))
+    self.assertEqual(2, len(cache))
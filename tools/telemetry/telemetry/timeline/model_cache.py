@@ -0,0 +1,127 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+"""Caches the TimelineModel of a saved trace in a file next to the trace.
+
+Importing a large trace takes much longer than reading back the finalized
+model, so tools that compute metrics on the same saved traces again and again
+should load them with LoadTimelineModel.
+
+The cache file starts with a key made of the content hash of the trace, the
+version of the importers and the import options, and is rebuilt when the key
+does not match.
+"""
+
+import cPickle
+import gc
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+
+from telemetry.timeline import model as model_module
+from telemetry.timeline import trace_data as trace_data_module
+
+# Increment when a change to the importers or to the timeline classes changes
+# the models built from traces, so the cached models are rebuilt.
+IMPORTER_VERSION = 1
+
+CACHE_FILE_SUFFIX = '.timeline_model'
+
+_MAGIC = 'telemetry timeline model cache\n'
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def GetCachePath(trace_path):
+  return trace_path + CACHE_FILE_SUFFIX
+
+
+def LoadTimelineModel(trace_path, shift_world_to_zero=True, import_jobs=1):
+  """Returns the TimelineModel of a trace file, importing it only once.
+
+  Args:
+    trace_path: A JSON trace file, such as written by TraceData.Serialize.
+        Files ending in .gz are decompressed.
+    shift_world_to_zero: See TimelineModel.
+    import_jobs: See TimelineModel. Only used if the trace is imported.
+  """
+  key = (_HashFile(trace_path), IMPORTER_VERSION, shift_world_to_zero)
+  cache_path = GetCachePath(trace_path)
+  model = _ReadCache(cache_path, key)
+  if model is not None:
+    return model
+
+  model = model_module.TimelineModel(
+      _ReadTraceData(trace_path), shift_world_to_zero=shift_world_to_zero,
+      import_jobs=import_jobs)
+  _WriteCache(cache_path, key, model)
+  return model
+
+
+def _HashFile(path):
+  digest = hashlib.sha1()
+  with open(path, 'rb') as f:
+    while True:
+      chunk = f.read(_HASH_CHUNK_SIZE)
+      if not chunk:
+        break
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def _ReadTraceData(trace_path):
+  if trace_path.endswith('.gz'):
+    with gzip.open(trace_path, 'rb') as f:
+      return trace_data_module.TraceData(f.read())
+  with open(trace_path, 'rb') as f:
+    return trace_data_module.TraceData(f.read())
+
+
+def _ReadCache(cache_path, key):
+  if not os.path.exists(cache_path):
+    return None
+  # The model consists of millions of objects, none of them garbage. Keeping
+  # the collector from scanning them as they are created makes loading several
+  # times faster.
+  gc_was_enabled = gc.isenabled()
+  gc.disable()
+  try:
+    with open(cache_path, 'rb') as f:
+      if f.read(len(_MAGIC)) != _MAGIC:
+        return None
+      if cPickle.load(f) != key:
+        logging.info('Cached model %s is out of date.', cache_path)
+        return None
+      return cPickle.load(f)
+  except Exception:
+    logging.warning('Could not read cached model %s.', cache_path,
+                    exc_info=True)
+    return None
+  finally:
+    if gc_was_enabled:
+      gc.enable()
+
+
+def _WriteCache(cache_path, key, model):
+  # The indexes are rebuilt on demand, and would only make the cache larger.
+  model.InvalidateIndexes()
+  cache_dir = os.path.dirname(os.path.abspath(cache_path))
+  try:
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=CACHE_FILE_SUFFIX)
+  except OSError:
+    logging.warning('Cannot write cached model to %s.', cache_dir)
+    return
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      f.write(_MAGIC)
+      cPickle.dump(key, f, cPickle.HIGHEST_PROTOCOL)
+      cPickle.dump(model, f, cPickle.HIGHEST_PROTOCOL)
+    # Readers see either the previous cache file or the complete new one.
+    os.rename(temp_path, cache_path)
+  except Exception:
+    logging.warning('Could not write cached model %s.', cache_path,
+                    exc_info=True)
+    if os.path.exists(temp_path):
+      os.remove(temp_path)
@@ -0,0 +1,98 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+import os
+import shutil
+import tempfile
+import unittest
+
+from telemetry.timeline import model_cache
+from telemetry.timeline import trace_data
+
+
+def _WriteTrace(path, events):
+  builder = trace_data.TraceDataBuilder()
+  builder.AddEventsTo(trace_data.CHROME_TRACE_PART, events)
+  with open(path, 'w') as f:
+    builder.AsData().Serialize(f)
+
+
+_EVENTS = [
+    {'name': 'a', 'args': {}, 'pid': 1, 'ts': 100, 'cat': 'foo', 'tid': 2,
+     'ph': 'X', 'dur': 50},
+    {'name': 'b', 'args': {'x': 1}, 'pid': 1, 'ts': 110, 'cat': 'foo',
+     'tid': 2, 'ph': 'X', 'dur': 10},
+    {'name': 'c', 'args': {}, 'pid': 1, 'ts': 120, 'cat': 'foo', 'tid': 2,
+     'ph': 'S', 'id': 7},
+    {'name': 'c', 'args': {}, 'pid': 1, 'ts': 170, 'cat': 'foo', 'tid': 2,
+     'ph': 'F', 'id': 7},
+]
+
+
+class ModelCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._trace_path = os.path.join(self._temp_dir, 'trace.json')
+    _WriteTrace(self._trace_path, _EVENTS)
+    self._real_read_trace_data = model_cache._ReadTraceData
+    self._imported_paths = []
+    def ReadTraceData(path):
+      self._imported_paths.append(path)
+      return self._real_read_trace_data(path)
+    model_cache._ReadTraceData = ReadTraceData
+
+  def tearDown(self):
+    model_cache._ReadTraceData = self._real_read_trace_data
+    shutil.rmtree(self._temp_dir)
+
+  def testCachedModelMatchesImportedModel(self):
+    imported = model_cache.LoadTimelineModel(self._trace_path)
+    self.assertTrue(
+        os.path.exists(model_cache.GetCachePath(self._trace_path)))
+    cached = model_cache.LoadTimelineModel(self._trace_path)
+    self.assertEqual(1, len(self._imported_paths))
+
+    self.assertEqual(imported.bounds.min, cached.bounds.min)
+    self.assertEqual(imported.bounds.max, cached.bounds.max)
+    thread = cached.GetAllProcesses()[0].threads[2]
+    a, b = thread.all_slices
+    self.assertEqual(('a', 0, 0.05), (a.name, a.start, a.duration))
+    self.assertEqual([b], a.sub_slices)
+    self.assertIs(a, b.parent_slice)
+    self.assertIs(thread, b.parent_thread)
+    self.assertEqual({'x': 1}, b.args)
+    self.assertEqual(['c'], [s.name for s in thread.async_slices])
+    self.assertIs(thread, thread.async_slices[0].start_thread)
+    self.assertEqual([b], list(cached.IterAllSlicesOfName('b')))
+
+  def testChangedTraceIsImportedAgain(self):
+    model_cache.LoadTimelineModel(self._trace_path)
+    _WriteTrace(self._trace_path, _EVENTS[:1])
+    model = model_cache.LoadTimelineModel(self._trace_path)
+    self.assertEqual(2, len(self._imported_paths))
+    self.assertEqual(['a'], [s.name for s in model.IterAllSlices()])
+
+  def testImportOptionsAreCachedSeparately(self):
+    model_cache.LoadTimelineModel(self._trace_path)
+    model = model_cache.LoadTimelineModel(self._trace_path,
+                                          shift_world_to_zero=False)
+    self.assertEqual(2, len(self._imported_paths))
+    self.assertEqual(0.1, model.bounds.min)
+
+  def testNewImporterVersionInvalidatesCache(self):
+    model_cache.LoadTimelineModel(self._trace_path)
+    version = model_cache.IMPORTER_VERSION
+    model_cache.IMPORTER_VERSION = version + 1
+    try:
+      model_cache.LoadTimelineModel(self._trace_path)
+    finally:
+      model_cache.IMPORTER_VERSION = version
+    self.assertEqual(2, len(self._imported_paths))
+
+  def testCorruptCacheIsReplaced(self):
+    with open(model_cache.GetCachePath(self._trace_path), 'wb') as f:
+      f.write('garbage')
+    model_cache.LoadTimelineModel(self._trace_path)
+    model_cache.LoadTimelineModel(self._trace_path)
+    self.assertEqual(1, len(self._imported_paths))
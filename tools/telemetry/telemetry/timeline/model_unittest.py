@@ -22,3 +22,65 @@ class TimelineModelUnittest(unittest.TestCase):
     ])
     model = model_module.TimelineModel(builder.AsData())
     self.assertEquals(5, model.browser_process.pid)
+
+  def testIterAllEventsOfNameUsesUpToDateIndex(self):
+    model = model_module.TimelineModel()
+    thread = model.GetOrCreateProcess(1).GetOrCreateThread(2)
+    thread.PushCompleteSlice('cat1', 'a', 10, 5, None, None)
+    thread.PushCompleteSlice('cat2', 'b', 20, 5, None, None)
+    self.assertEqual([10], [s.start for s in model.IterAllSlicesOfName('a')])
+
+    # Adding events drops the index of their container.
+    thread.PushCompleteSlice('cat2', 'a', 30, 5, None, None)
+    thread.AddSample('cat1', 'a', 40)
+    other_thread = model.GetOrCreateProcess(3).GetOrCreateThread(4)
+    other_thread.PushCompleteSlice('cat1', 'a', 50, 5, None, None)
+    model.FinalizeImport(shift_world_to_zero=False)
+
+    self.assertEqual(
+        list(model.IterAllEvents(event_predicate=lambda e: e.name == 'a')),
+        list(model.IterAllEventsOfName('a')))
+    self.assertEqual([10, 30, 50],
+                     [s.start for s in model.IterAllSlicesOfName('a')])
+    self.assertEqual([10, 40, 50], [
+        e.start for e in model.IterAllEventsOfName('a', category='cat1')])
+    self.assertEqual([30], [
+        s.start for s in thread.IterAllToplevelSlicesOfName('a')
+        if s.category == 'cat2'])
+    self.assertEqual([], list(model.IterAllEventsOfName('c')))
+
+  def _CreateModelWithMarkers(self, markers):
+    model = model_module.TimelineModel()
+    process = model.GetOrCreateProcess(1)
+    for name, start, duration in markers:
+      # Markers on the same thread would be nested instead of overlapping.
+      thread = process.GetOrCreateThread(len(process.threads))
+      thread.PushCompleteSlice('cat', name, start, duration, None, None)
+    model.FinalizeImport(shift_world_to_zero=False)
+    return model
+
+  def testFindTimelineMarkers(self):
+    model = self._CreateModelWithMarkers([('b', 20, 5), ('a', 0, 10)])
+    self.assertEqual([0, 20], [
+        e.start for e in model.FindTimelineMarkers(['a', None, 'b'])])
+    self.assertRaises(model_module.MarkerMismatchError,
+                      model.FindTimelineMarkers, ['b', 'a'])
+    self.assertRaises(model_module.MarkerMismatchError,
+                      model.FindTimelineMarkers, ['a', 'a', 'b'])
+
+  def testFindTimelineMarkersDetectsOverlapWithAnyEarlierMarker(self):
+    # 'c' only overlaps 'a', which is not the marker right before it.
+    model = self._CreateModelWithMarkers(
+        [('a', 0, 100), ('b', 10, 5), ('c', 30, 5)])
+    self.assertRaises(model_module.MarkerOverlapError,
+                      model.FindTimelineMarkers, ['a', 'b', 'c'])
+
+  def testFindTimelineMarkersWithManyMarkers(self):
+    # Would take minutes with a quadratic overlap check.
+    count = 20000
+    model = model_module.TimelineModel()
+    thread = model.GetOrCreateProcess(1).GetOrCreateThread(2)
+    for i in xrange(count):
+      thread.PushCompleteSlice('cat', 'm', i * 10, 5, None, None)
+    model.FinalizeImport(shift_world_to_zero=False)
+    self.assertEqual(count, len(model.FindTimelineMarkers(['m'] * count)))
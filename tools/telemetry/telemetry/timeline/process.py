@@ -5,18 +5,24 @@
 import telemetry.timeline.counter as tracing_counter
 import telemetry.timeline.event as event_module
 import telemetry.timeline.event_container as event_container
+import telemetry.timeline.interval_index as interval_index
 import telemetry.timeline.thread as tracing_thread
 
 
 class Process(event_container.TimelineEventContainer):
   """The Process represents a single userland process in the trace.
   """
+  INDEXED_EVENT_TYPES = (event_module.TimelineEvent,)
+
   def __init__(self, parent, pid):
     super(Process, self).__init__('process %s' % pid, parent)
     self.pid = pid
     self._threads = {}
     self._counters = {}
     self._trace_buffer_overflow_event = None
+    # IntervalIndexes by event name, None for all events. See GetSliceIndex.
+    self._slice_indexes = {}
+    self._async_slice_indexes = {}
 
   @property
   def trace_buffer_did_overflow(self):
@@ -34,6 +40,46 @@ class Process(event_container.TimelineEventContainer):
   def counters(self):
     return self._counters
 
+  def GetSliceIndex(self, name=None):
+    """Returns an IntervalIndex of the slices of all threads of the process.
+
+    The index is built on first use, and rebuilt after FinalizeImport or when
+    threads are added. Use the index of a thread while adding its slices.
+
+    Args:
+      name: If set, only the slices of this name are indexed.
+    """
+    return interval_index.GetCachedIndex(
+        self._slice_indexes, self._IterSlicesToIndex, name)
+
+  def GetAsyncSliceIndex(self, name=None):
+    """Returns an IntervalIndex of the top level async slices of the process.
+
+    Args:
+      name: If set, only the async slices of this name are indexed.
+    """
+    return interval_index.GetCachedIndex(
+        self._async_slice_indexes, self._IterAsyncSlicesToIndex, name)
+
+  def InvalidateIndexes(self):
+    """Drops the indexes of the process and of its threads."""
+    super(Process, self).InvalidateIndexes()
+    self._slice_indexes.clear()
+    self._async_slice_indexes.clear()
+    for thread in self._threads.itervalues():
+      thread.InvalidateIndexes()
+
+  def _IterSlicesToIndex(self, name=None):
+    for thread in self._threads.itervalues():
+      for s in thread._IterSlicesToIndex(name): # pylint: disable=W0212
+        yield s
+
+  def _IterAsyncSlicesToIndex(self, name=None):
+    for thread in self._threads.itervalues():
+      # pylint: disable=W0212
+      for async_slice in thread._IterAsyncSlicesToIndex(name):
+        yield async_slice
+
   def IterChildContainers(self):
     for thread in self._threads.itervalues():
       yield thread
@@ -54,6 +100,7 @@ class Process(event_container.TimelineEventContainer):
       return thread
     thread = tracing_thread.Thread(self, tid)
     self._threads[tid] = thread
+    self.InvalidateIndexes()
     return thread
 
   def GetCounter(self, category, name):
@@ -79,9 +126,11 @@ class Process(event_container.TimelineEventContainer):
     # TODO: use instant event for trace_buffer_overflow_event
     self._trace_buffer_overflow_event = event_module.TimelineEvent(
         "TraceBufferInfo", "trace_buffer_overflowed", timestamp, 0)
+    self._events_by_name = None
 
   def FinalizeImport(self):
     for thread in self._threads.itervalues():
       thread.FinalizeImport()
     for counter in self._counters.itervalues():
       counter.FinalizeImport()
+    self.InvalidateIndexes()
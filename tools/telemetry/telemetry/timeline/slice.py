@@ -14,6 +14,8 @@ class Slice(timeline_event.TimelineEvent):
 
   All time units are stored in milliseconds.
   """
+  __slots__ = ('parent_thread', 'parent_slice', 'sub_slices', 'did_not_finish')
+
   def __init__(self, parent_thread, category, name, timestamp, duration=0,
                thread_timestamp=None, thread_duration=None, args=None):
     super(Slice, self).__init__(
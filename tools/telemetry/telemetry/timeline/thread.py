@@ -1,9 +1,12 @@
 # Copyright 2014 The Chromium Authors. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
+import itertools
+
 import telemetry.timeline.async_slice as async_slice_module
 import telemetry.timeline.event_container as event_container
 import telemetry.timeline.flow_event as flow_event_module
+import telemetry.timeline.interval_index as interval_index
 import telemetry.timeline.sample as sample_module
 import telemetry.timeline.slice as slice_module
 
@@ -14,6 +17,9 @@ class Thread(event_container.TimelineEventContainer):
   subrow 0 has all the root slices, subrow 1 those nested 1 deep, and so on.
   The asynchronous slices are stored in an AsyncSliceGroup object.
   """
+  INDEXED_EVENT_TYPES = (slice_module.Slice, async_slice_module.AsyncSlice,
+                         flow_event_module.FlowEvent, sample_module.Sample)
+
   def __init__(self, process, tid):
     super(Thread, self).__init__('thread %s' % tid, parent=process)
     self.tid = tid
@@ -22,6 +28,9 @@ class Thread(event_container.TimelineEventContainer):
     self._samples = []
     self._toplevel_slices = []
     self._all_slices = []
+    # IntervalIndexes by event name, None for all events. See GetSliceIndex.
+    self._slice_indexes = {}
+    self._async_slice_indexes = {}
 
     # State only valid during import.
     self._open_slices = []
@@ -47,6 +56,38 @@ class Thread(event_container.TimelineEventContainer):
   def open_slice_count(self):
     return len(self._open_slices)
 
+  def GetSliceIndex(self, name=None):
+    """Returns an IntervalIndex of the slices of the thread, at all depths.
+
+    The index is built on first use and rebuilt when slices are added.
+
+    * name: If set, only the slices of this name are indexed.
+    """
+    return interval_index.GetCachedIndex(
+        self._slice_indexes, self._IterSlicesToIndex, name)
+
+  def GetAsyncSliceIndex(self, name=None):
+    """Returns an IntervalIndex of the top level async slices of the thread.
+
+    * name: If set, only the async slices of this name are indexed.
+    """
+    return interval_index.GetCachedIndex(
+        self._async_slice_indexes, self._IterAsyncSlicesToIndex, name)
+
+  def InvalidateIndexes(self):
+    super(Thread, self).InvalidateIndexes()
+    self._slice_indexes.clear()
+    self._async_slice_indexes.clear()
+
+  def _IterSlicesToIndex(self, name=None):
+    if name is not None:
+      return self.IterAllSlicesOfName(name)
+    return itertools.chain(self._newly_added_slices, self._all_slices)
+
+  def _IterAsyncSlicesToIndex(self, name=None):
+    return [async_slice for async_slice in self._async_slices
+            if name is None or async_slice.name == name]
+
   def IterChildContainers(self):
     return
     yield # pylint: disable=W0101
@@ -85,12 +126,15 @@ class Thread(event_container.TimelineEventContainer):
     sample = sample_module.Sample(self,
         category, name, timestamp, args=args)
     self._samples.append(sample)
+    self._events_by_name = None
 
   def AddAsyncSlice(self, async_slice):
     self._async_slices.append(async_slice)
+    self.InvalidateIndexes()
 
   def AddFlowEvent(self, flow_event):
     self._flow_events.append(flow_event)
+    self._events_by_name = None
 
   def BeginSlice(self, category, name, timestamp, thread_timestamp=None,
                  args=None):
@@ -161,6 +205,9 @@ class Thread(event_container.TimelineEventContainer):
 
   def PushSlice(self, new_slice):
     self._newly_added_slices.append(new_slice)
+    self._events_by_name = None
+    if self._slice_indexes:
+      self._slice_indexes.clear()
     return new_slice
 
   def AutoCloseOpenSlices(self, max_timestamp, max_thread_timestamp):
@@ -172,6 +219,7 @@ class Thread(event_container.TimelineEventContainer):
           s.thread_duration = max_thread_timestamp - s.thread_start
           assert s.thread_duration >= 0
     self._open_slices = []
+    self._slice_indexes.clear()
 
   def IsTimestampValidForBeginOrEnd(self, timestamp):
     if not len(self._open_slices):
@@ -180,6 +228,7 @@ class Thread(event_container.TimelineEventContainer):
 
   def FinalizeImport(self):
     self._BuildSliceSubRows()
+    self.InvalidateIndexes()
 
   def _BuildSliceSubRows(self):
     """This function works by walking through slices by start time.
@@ -30,3 +30,36 @@ class ThreadUnittest(unittest.TestCase):
     slice_names = set(s.name for s in
                       renderer_main.IterAllSlicesInRange(start=12, end=65))
     self.assertEqual(slice_names, {'Z', 'Y', 'T'})
+
+  def testGetSliceIndex(self):
+    model = model_module.TimelineModel()
+    renderer_main = model.GetOrCreateProcess(1).GetOrCreateThread(2)
+    renderer_main.BeginSlice('cat1', 'X', 10)
+    renderer_main.BeginSlice('cat1', 'Z', 20)
+    renderer_main.EndSlice(30)
+    renderer_main.EndSlice(40)
+    self.assertEqual(['X', 'Z'], [
+        s.name for s in renderer_main.GetSliceIndex().GetIntersecting(0, 100)])
+
+    # Adding slices updates the index.
+    renderer_main.PushCompleteSlice('cat1', 'Z', 50, 10, None, None)
+    model.FinalizeImport(shift_world_to_zero=False)
+    self.assertEqual([20, 50], [
+        s.start for s in renderer_main.GetSliceIndex('Z').GetIntersecting(
+            0, 100)])
+    self.assertEqual(['Z'], [
+        s.name for s in renderer_main.GetSliceIndex().GetContained(15, 45)])
+    self.assertEqual([20, 50], [
+        s.start for s in model.GetOrCreateProcess(1).GetSliceIndex(
+            'Z').GetIntersecting(0, 100)])
+
+  def testIndexesAreUpdatedAfterShiftWorldToZero(self):
+    model = model_module.TimelineModel()
+    renderer_main = model.GetOrCreateProcess(1).GetOrCreateThread(2)
+    renderer_main.PushCompleteSlice('cat1', 'X', 100, 10, None, None)
+    model.FinalizeImport(shift_world_to_zero=True)
+    self.assertEqual(['X'], [
+        s.name for s in renderer_main.GetSliceIndex().GetContained(0, 10)])
+    self.assertEqual(['X'], [
+        s.name for s in model.GetOrCreateProcess(1).GetSliceIndex(
+            'X').GetContained(0, 10)])
@@ -2,7 +2,10 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import gzip
 import json
+import os
+import re
 
 class NonSerializableTraceData(Exception):
   """Raised when raw trace data cannot be serialized to TraceData."""
@@ -18,6 +21,63 @@ def _ValidateRawData(raw):
     raise NonSerializableTraceData('TraceData is not serilizable: %s' % e)
 
 
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _SkipWhitespace(raw, index):
+  return _WHITESPACE_RE.match(raw, index).end()
+
+
+def _Expect(raw, index, chars):
+  if index >= len(raw) or raw[index] not in chars:
+    raise ValueError('Expected %s at position %d of the trace data' %
+                     (' or '.join(repr(c) for c in chars), index))
+
+
+def _IterJsonArray(raw, index, end=None, allow_unterminated=False):
+  """Decodes the items of a JSON array in a string one at a time.
+
+  Args:
+    raw: The string containing the array.
+    index: The index of the opening '[' of the array in raw.
+    end: If set, a list to which the index after the array is appended once
+        all of its items have been yielded.
+    allow_unterminated: Whether the array may end with the string, with or
+        without a trailing ','.
+  """
+  _Expect(raw, index, '[')
+  # Bound to locals, since this loop runs once per event of the trace.
+  raw_length = len(raw)
+  skip_whitespace = _WHITESPACE_RE.match
+  decode = _JSON_DECODER.raw_decode
+  index = skip_whitespace(raw, index + 1).end()
+  if index < raw_length and raw[index] == ']':
+    index += 1
+  else:
+    while True:
+      if allow_unterminated and index == raw_length:
+        break
+      item, index = decode(raw, index)
+      yield item
+      index = skip_whitespace(raw, index).end()
+      if index < raw_length and raw[index] == ',':
+        index = skip_whitespace(raw, index + 1).end()
+        continue
+      if allow_unterminated and index == raw_length:
+        break
+      _Expect(raw, index, ']')
+      index += 1
+      break
+  if end is not None:
+    end.append(index)
+
+
+def _IsEmptyJsonArray(raw, index):
+  index = _SkipWhitespace(raw, index + 1)
+  return index == len(raw) or raw[index] == ']'
+
+
 class TraceDataPart(object):
   """TraceData can have a variety of events.
 
@@ -45,13 +105,87 @@ ALL_TRACE_PARTS = {CHROME_TRACE_PART,
                    TAB_ID_PART}
 
 
-def _HasEventsFor(part, raw):
+def _HasEventsFor(part, raw, trace_files=None):
   assert isinstance(part, TraceDataPart)
+  if trace_files and any(trace_file.event_count for trace_file
+                         in trace_files.get(part.raw_field_name, [])):
+    return True
   if part.raw_field_name not in raw:
     return False
   return len(raw[part.raw_field_name]) > 0
 
 
+class TraceFileHandle(object):
+  """A reference to trace events stored in a file by a TraceFileWriter.
+
+  The events are only read when they are iterated, so a TraceData holding
+  TraceFileHandles stays small regardless of the length of the trace.
+  """
+  def __init__(self, file_path, event_count):
+    self._file_path = file_path
+    self._event_count = event_count
+
+  def __repr__(self):
+    return 'TraceFileHandle("%s", %d)' % (self._file_path, self._event_count)
+
+  @property
+  def file_path(self):
+    return self._file_path
+
+  @property
+  def event_count(self):
+    return self._event_count
+
+  def CleanUp(self):
+    """Removes the file once its events are no longer needed.
+
+    The events cannot be iterated afterwards. CleanUp() may be called more than
+    once without error.
+    """
+    if os.path.exists(self._file_path):
+      os.remove(self._file_path)
+
+  def IterEvents(self):
+    """Yields the events of the file one at a time."""
+    with gzip.open(self._file_path, 'rb') as f:
+      for line in f:
+        # Each event is on its own line, followed by the separator of the
+        # array. The brackets of the array are on lines of their own.
+        line = line.strip().rstrip(',')
+        if line not in ('', '[', ']', '[]'):
+          yield json.loads(line)
+
+
+class TraceFileWriter(object):
+  """Writes trace events to a gzipped file as they are received.
+
+  The file holds a JSON array with one event per line, so it is a regular
+  trace file that can also be read back one event at a time.
+  """
+  def __init__(self, file_path):
+    self._file_path = file_path
+    self._file = gzip.open(file_path, 'wb')
+    self._event_count = 0
+
+  def WriteEvents(self, events):
+    if self._file is None:
+      raise Exception('Already called Close() on this writer.')
+    lines = []
+    for event in events:
+      lines.append(',\n' if self._event_count else '[\n')
+      lines.append(json.dumps(event))
+      self._event_count += 1
+    self._file.write(''.join(lines))
+
+  def Close(self):
+    """Finishes the file and returns a TraceFileHandle referencing it."""
+    if self._file is not None:
+      self._file.write('\n]\n' if self._event_count else '[]\n')
+      self._file.close()
+      self._file = None
+    return TraceFileHandle(self._file_path, self._event_count)
+
+
 class TraceData(object):
   """Validates, parses, and serializes raw data.
 
@@ -65,26 +199,33 @@ class TraceData(object):
   2. A json-parseable array: assumed to be chrome trace data.
   3. A json-parseable array missing the final ']': assumed to be chrome trace
      data.
+
+  The events in raw data given as a string are decoded one at a time as they
+  are iterated, so the whole decoded trace is never held in memory. Malformed
+  events are only reported then.
+
+  Events of a part can also be stored in files, see TraceFileWriter. These are
+  only read when the events are requested.
   """
   def __init__(self, raw_data=None):
     """Creates TraceData from the given data."""
     self._raw_data = {}
+    self._trace_files = {}
+    # The string holding the events of the parts in _raw_parts, which maps the
+    # field names of the parts to the index of their array in the string and
+    # whether the array may be missing its final ']'.
+    self._raw_string = None
+    self._raw_parts = {}
     self._events_are_safely_mutable = False
     if not raw_data:
       return
-    _ValidateRawData(raw_data)
 
     if isinstance(raw_data, basestring):
-      if raw_data.startswith('[') and not raw_data.endswith(']'):
-        if raw_data.endswith(','):
-          raw_data = raw_data[:-1]
-        raw_data += ']'
-      json_data = json.loads(raw_data)
-      # The parsed data isn't shared with anyone else, so we mark this value
-      # as safely mutable.
-      self._events_are_safely_mutable = True
-    else:
-      json_data = raw_data
+      self._SetFromString(raw_data)
+      return
+
+    _ValidateRawData(raw_data)
+    json_data = raw_data
 
     if isinstance(json_data, dict):
       self._raw_data = json_data
@@ -95,8 +236,46 @@ class TraceData(object):
     else:
       raise Exception('Unrecognized data format.')
 
-  def _SetFromBuilder(self, d):
+  def _SetFromString(self, raw):
+    # The parsed data isn't shared with anyone else, so we mark this value
+    # as safely mutable.
+    self._events_are_safely_mutable = True
+    self._raw_string = raw
+    index = _SkipWhitespace(raw, 0)
+    if index == len(raw):
+      return
+    _Expect(raw, index, '[{')
+    if raw[index] == '[':
+      self._raw_parts[CHROME_TRACE_PART.raw_field_name] = (index, True)
+      return
+
+    # Walk the container, decoding everything but the arrays of the parts.
+    part_field_names = {p.raw_field_name for p in ALL_TRACE_PARTS}
+    index = _SkipWhitespace(raw, index + 1)
+    if index < len(raw) and raw[index] == '}':
+      return
+    while True:
+      key, index = _JSON_DECODER.raw_decode(raw, index)
+      index = _SkipWhitespace(raw, index)
+      _Expect(raw, index, ':')
+      index = _SkipWhitespace(raw, index + 1)
+      if key in part_field_names and raw.startswith('[', index):
+        self._raw_parts[key] = (index, False)
+        end = []
+        for _ in _IterJsonArray(raw, index, end):
+          pass
+        index = end[0]
+      else:
+        self._raw_data[key], index = _JSON_DECODER.raw_decode(raw, index)
+      index = _SkipWhitespace(raw, index)
+      _Expect(raw, index, ',}')
+      if raw[index] == '}':
+        break
+      index = _SkipWhitespace(raw, index + 1)
+
+  def _SetFromBuilder(self, d, trace_files):
     self._raw_data = d
+    self._trace_files = trace_files
     self._events_are_safely_mutable = True
 
   @property
@@ -116,7 +295,10 @@ class TraceData(object):
 
   @property
   def active_parts(self):
-    return {p for p in ALL_TRACE_PARTS if p.raw_field_name in self._raw_data}
+    return {p for p in ALL_TRACE_PARTS
+            if p.raw_field_name in self._raw_data or
+            p.raw_field_name in self._trace_files or
+            p.raw_field_name in self._raw_parts}
 
   @property
   def metadata_records(self):
@@ -130,13 +312,53 @@ class TraceData(object):
       }
 
   def HasEventsFor(self, part):
-    return _HasEventsFor(part, self._raw_data)
+    if part.raw_field_name in self._raw_parts:
+      index, _ = self._raw_parts[part.raw_field_name]
+      return not _IsEmptyJsonArray(self._raw_string, index)
+    return _HasEventsFor(part, self._raw_data, self._trace_files)
 
   def GetEventsFor(self, part):
     if not self.HasEventsFor(part):
       return []
     assert isinstance(part, TraceDataPart)
-    return self._raw_data[part.raw_field_name]
+    if (part.raw_field_name not in self._trace_files and
+        part.raw_field_name not in self._raw_parts):
+      return self._raw_data[part.raw_field_name]
+    return list(self.IterEventsFor(part))
+
+  def CleanUp(self):
+    """Removes the files holding events of this TraceData, if any.
+
+    A TraceData built from trace files owns them, see TraceFileWriter. Its
+    events in files cannot be used after CleanUp().
+    """
+    for trace_files in self._trace_files.itervalues():
+      for trace_file in trace_files:
+        trace_file.CleanUp()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _, __, ___):
+    self.CleanUp()
+
+  def IterEventsFor(self, part):
+    """Yields the events of a part.
+
+    Events stored in files or given as a string are decoded as they are
+    yielded.
+    """
+    assert isinstance(part, TraceDataPart)
+    for event in self._raw_data.get(part.raw_field_name, []):
+      yield event
+    for trace_file in self._trace_files.get(part.raw_field_name, []):
+      for event in trace_file.IterEvents():
+        yield event
+    if part.raw_field_name in self._raw_parts:
+      index, allow_unterminated = self._raw_parts[part.raw_field_name]
+      for event in _IterJsonArray(self._raw_string, index,
+                                  allow_unterminated=allow_unterminated):
+        yield event
 
   def Serialize(self, f, gzip_result=False):
     """Serializes the trace result to a file-like object.
@@ -144,7 +366,30 @@ class TraceData(object):
     Always writes in the trace container format.
     """
     assert not gzip_result, 'Not implemented'
-    json.dump(self._raw_data, f)
+    if not self._trace_files and not self._raw_parts:
+      json.dump(self._raw_data, f)
+      return
+    # Copy the events stored in files or strings one at a time, so they are
+    # never all decoded at once.
+    field_names = (set(self._raw_data) | set(self._trace_files) |
+                   set(self._raw_parts))
+    f.write('{')
+    for i, field_name in enumerate(sorted(field_names)):
+      if i:
+        f.write(', ')
+      f.write('%s: ' % json.dumps(field_name))
+      if (field_name not in self._trace_files and
+          field_name not in self._raw_parts):
+        json.dump(self._raw_data[field_name], f)
+        continue
+      f.write('[')
+      for j, event in enumerate(
+          self.IterEventsFor(TraceDataPart(field_name))):
+        if j:
+          f.write(', ')
+        json.dump(event, f)
+      f.write(']')
+    f.write('}')
 
 
 class TraceDataBuilder(object):
@@ -155,14 +400,16 @@ class TraceDataBuilder(object):
   """
   def __init__(self):
     self._raw_data = {}
+    self._trace_files = {}
 
   def AsData(self):
     if self._raw_data == None:
       raise Exception('Can only AsData once')
 
     data = TraceData()
-    data._SetFromBuilder(self._raw_data)
+    data._SetFromBuilder(self._raw_data, self._trace_files)
     self._raw_data = None
+    self._trace_files = None
     return data
 
   def AddEventsTo(self, part, events):
@@ -178,5 +425,17 @@ class TraceDataBuilder(object):
 
     self._raw_data.setdefault(part.raw_field_name, []).extend(events)
 
+  def AddTraceFileTo(self, part, trace_file):
+    """Adds the events stored in a file, see TraceFileWriter.
+
+    The events of the file follow those added with AddEventsTo().
+    """
+    assert isinstance(part, TraceDataPart)
+    assert isinstance(trace_file, TraceFileHandle)
+    if self._raw_data == None:
+      raise Exception('Already called AsData() on this builder.')
+
+    self._trace_files.setdefault(part.raw_field_name, []).append(trace_file)
+
   def HasEventsFor(self, part):
-    return _HasEventsFor(part, self._raw_data)
+    return _HasEventsFor(part, self._raw_data, self._trace_files)
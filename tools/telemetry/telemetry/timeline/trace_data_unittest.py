@@ -3,7 +3,11 @@
 # found in the LICENSE file.
 
 import cStringIO
+import gzip
 import json
+import os
+import shutil
+import tempfile
 import unittest
 
 from telemetry.timeline import trace_data
@@ -65,6 +69,39 @@ class TraceDataTest(unittest.TestCase):
       {"ph": "B"},""")
     self.assertTrue(d.HasEventsFor(trace_data.CHROME_TRACE_PART))
 
+  def testCorrectlyMalformedStringFormWithWhitespace(self):
+    d = trace_data.TraceData('[{"ph": "B"},\n  {"ph": "E"},\n')
+    self.assertEquals([{'ph': 'B'}, {'ph': 'E'}],
+                      d.GetEventsFor(trace_data.CHROME_TRACE_PART))
+
+  def testStringFormIsParsedIncrementally(self):
+    d = trace_data.TraceData('[{"ph": "B"}, {"ph": "E"}, {"ph":')
+    events = d.IterEventsFor(trace_data.CHROME_TRACE_PART)
+    self.assertEquals({'ph': 'B'}, next(events))
+    self.assertEquals({'ph': 'E'}, next(events))
+    self.assertRaises(ValueError, next, events)
+
+  def testContainerStringForm(self):
+    d = trace_data.TraceData(
+        ' { "metadata": {"a": [1]}, "traceEvents": [ {"ph": "B"} ],'
+        '"tabIds": [], "inspectorTimelineEvents": [1, 2] } ')
+    self.assertEquals({trace_data.CHROME_TRACE_PART, trace_data.TAB_ID_PART,
+                       trace_data.INSPECTOR_TRACE_PART}, d.active_parts)
+    self.assertFalse(d.HasEventsFor(trace_data.TAB_ID_PART))
+    self.assertEquals([{'ph': 'B'}],
+                      d.GetEventsFor(trace_data.CHROME_TRACE_PART))
+    self.assertEquals([1, 2], d.GetEventsFor(trace_data.INSPECTOR_TRACE_PART))
+
+  def testContainerStringFormMustBeTerminated(self):
+    with self.assertRaises(ValueError):
+      trace_data.TraceData('{"traceEvents": [{"ph": "B"}')
+
+  def testSerializeStringForm(self):
+    raw = '{"traceEvents": [{"ph": "B"}, {"ph": "E"}], "tabIds": ["tab-7"]}'
+    f = cStringIO.StringIO()
+    trace_data.TraceData(raw).Serialize(f)
+    self.assertEquals(json.loads(raw), json.loads(f.getvalue()))
+
 class TraceDataBuilderTest(unittest.TestCase):
   def testBasicChrome(self):
     builder = trace_data.TraceDataBuilder()
@@ -76,3 +113,74 @@ class TraceDataBuilderTest(unittest.TestCase):
     self.assertTrue(d.HasEventsFor(trace_data.TAB_ID_PART))
 
     self.assertRaises(Exception, builder.AsData)
+
+
+class TraceFileTest(unittest.TestCase):
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._file_path = os.path.join(self._temp_dir, 'trace.json.gz')
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def _WriteTraceFile(self, *chunks):
+    writer = trace_data.TraceFileWriter(self._file_path)
+    for chunk in chunks:
+      writer.WriteEvents(chunk)
+    return writer.Close()
+
+  def testRoundTrip(self):
+    events = [{'ph': 'B', 'name': 'a,\n]'}, {'ph': 'E'}, 'legacy', 3]
+    trace_file = self._WriteTraceFile(events[:1], [], events[1:])
+    self.assertEquals(4, trace_file.event_count)
+    self.assertEquals(events, list(trace_file.IterEvents()))
+
+  def testFileIsValidJson(self):
+    self._WriteTraceFile([{'ph': 'B'}, {'ph': 'E'}])
+    with gzip.open(self._file_path) as f:
+      self.assertEquals([{'ph': 'B'}, {'ph': 'E'}], json.load(f))
+
+  def testEmptyFile(self):
+    trace_file = self._WriteTraceFile()
+    self.assertEquals([], list(trace_file.IterEvents()))
+    with gzip.open(self._file_path) as f:
+      self.assertEquals([], json.load(f))
+
+    builder = trace_data.TraceDataBuilder()
+    builder.AddTraceFileTo(trace_data.CHROME_TRACE_PART, trace_file)
+    self.assertFalse(builder.HasEventsFor(trace_data.CHROME_TRACE_PART))
+
+  def testCleanUpRemovesTraceFiles(self):
+    trace_file = self._WriteTraceFile([{'ph': 'B'}])
+    builder = trace_data.TraceDataBuilder()
+    builder.AddTraceFileTo(trace_data.CHROME_TRACE_PART, trace_file)
+    with builder.AsData() as data:
+      self.assertEquals([{'ph': 'B'}],
+                        data.GetEventsFor(trace_data.CHROME_TRACE_PART))
+    self.assertFalse(os.path.exists(self._file_path))
+    data.CleanUp()
+
+  def testBuilderWithFile(self):
+    trace_file = self._WriteTraceFile([{'ph': 'E'}])
+    builder = trace_data.TraceDataBuilder()
+    builder.AddEventsTo(trace_data.CHROME_TRACE_PART, [{'ph': 'B'}])
+    builder.AddTraceFileTo(trace_data.CHROME_TRACE_PART, trace_file)
+    self.assertTrue(builder.HasEventsFor(trace_data.CHROME_TRACE_PART))
+
+    d = builder.AsData()
+    self.assertEquals({trace_data.CHROME_TRACE_PART}, d.active_parts)
+    self.assertEquals([{'ph': 'B'}, {'ph': 'E'}],
+                      d.GetEventsFor(trace_data.CHROME_TRACE_PART))
+    self.assertEquals([{'ph': 'B'}, {'ph': 'E'}],
+                      list(d.IterEventsFor(trace_data.CHROME_TRACE_PART)))
+
+  def testSerializeWithFile(self):
+    trace_file = self._WriteTraceFile([{'ph': 'B'}, {'ph': 'E'}])
+    builder = trace_data.TraceDataBuilder()
+    builder.AddTraceFileTo(trace_data.CHROME_TRACE_PART, trace_file)
+    builder.AddEventsTo(trace_data.TAB_ID_PART, ['tab-7'])
+    f = cStringIO.StringIO()
+    builder.AsData().Serialize(f)
+
+    self.assertEquals({'traceEvents': [{'ph': 'B'}, {'ph': 'E'}],
+                       'tabIds': ['tab-7']}, json.loads(f.getvalue()))
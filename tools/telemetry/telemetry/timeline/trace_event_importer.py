@@ -8,6 +8,9 @@ https://code.google.com/p/trace-viewer/
 """
 
 import copy
+import gc
+import multiprocessing
+import sys
 
 import telemetry.timeline.async_slice as tracing_async_slice
 import telemetry.timeline.flow_event as tracing_flow_event
@@ -15,6 +18,14 @@ from telemetry.timeline import importer
 from telemetry.timeline import memory_dump_event
 from telemetry.timeline import trace_data as trace_data_module
 
+# Phases of the events that only affect the process they belong to. When
+# importing in parallel, these are imported separately for each process.
+_PROCESS_LOCAL_PHASES = frozenset(['B', 'E', 'X', 'I', 'i', 'P', 'C', 'M'])
+
+# The events of each process, by pid, while a pool of workers imports them.
+# Forked workers inherit them instead of receiving them through a pipe.
+_events_by_pid_to_import = {}
+
 
 class TraceEventTimelineImporter(importer.TimelineImporter):
   def __init__(self, model, trace_data):
@@ -27,13 +38,26 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
     self._all_object_events = []
     self._all_flow_events = []
     self._all_memory_dump_events_by_dump_id = {}
+    # Maps each event name and category to a single string object shared by
+    # all events, see _Intern.
+    self._interned_strings = {}
 
-    self._events = trace_data.GetEventsFor(trace_data_module.CHROME_TRACE_PART)
+    # Events stored in files are read as they are imported.
+    self._events = trace_data.IterEventsFor(
+        trace_data_module.CHROME_TRACE_PART)
 
   @staticmethod
   def GetSupportedPart():
     return trace_data_module.CHROME_TRACE_PART
 
+  def _Intern(self, string):
+    """Returns a shared copy of a repeated name or category.
+
+    Decoded JSON has a new string object for every event, intern() does not
+    accept unicode strings.
+    """
+    return self._interned_strings.setdefault(string, string)
+
   def _GetOrCreateProcess(self, pid):
     return self._model.GetOrCreateProcess(pid)
 
@@ -99,8 +123,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
       return
 
     if event['ph'] == 'B':
-      thread.BeginSlice(event['cat'],
-                        event['name'],
+      thread.BeginSlice(self._Intern(event['cat']),
+                        self._Intern(event['name']),
                         event['ts'] / 1000.0,
                         event['tts'] / 1000.0 if 'tts' in event else None,
                         event['args'])
@@ -131,8 +155,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
     thread = (self._GetOrCreateProcess(event['pid'])
         .GetOrCreateThread(event['tid']))
     thread.PushCompleteSlice(
-        event['cat'],
-        event['name'],
+        self._Intern(event['cat']),
+        self._Intern(event['name']),
         event['ts'] / 1000.0,
         event['dur'] / 1000.0 if 'dur' in event else None,
         event['tts'] / 1000.0 if 'tts' in event else None,
@@ -159,8 +183,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
     # SliceTrack's redraw() knows how to handle this.
     thread = (self._GetOrCreateProcess(event['pid'])
       .GetOrCreateThread(event['tid']))
-    thread.BeginSlice(event['cat'],
-                      event['name'],
+    thread.BeginSlice(self._Intern(event['cat']),
+                      self._Intern(event['name']),
                       event['ts'] / 1000.0,
                       args=event.get('args'))
     thread.EndSlice(event['ts'] / 1000.0)
@@ -168,8 +192,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
   def _ProcessSampleEvent(self, event):
     thread = (self._GetOrCreateProcess(event['pid'])
         .GetOrCreateThread(event['tid']))
-    thread.AddSample(event['cat'],
-                     event['name'],
+    thread.AddSample(self._Intern(event['cat']),
+                     self._Intern(event['name']),
                      event['ts'] / 1000.0,
                      event.get('args'))
 
@@ -193,39 +217,98 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
     """Walks through the events_ list and outputs the structures discovered to
     model_.
     """
+    if self._model.import_jobs > 1:
+      self._ImportEventsInParallel(self._model.import_jobs)
+    else:
+      for event in self._events:
+        self._ProcessEvent(event)
+    return self._model
+
+  def _ImportEventsInParallel(self, jobs):
+    """Imports the process-local events of each process in a pool of worker
+    processes.
+
+    The resulting processes are added to the model before the remaining
+    events, which may link threads of different processes, are processed.
+    This is experimental and not faster on its own, see TimelineModel.
+    """
+    events_by_pid = {}
+    other_events = []
     for event in self._events:
-      phase = event.get('ph', None)
-      if phase == 'B' or phase == 'E':
-        self._ProcessDurationEvent(event)
-      elif phase == 'X':
-        self._ProcessCompleteEvent(event)
-      # Note, S, F, T are deprecated and replaced by 'b' and 'e'. For
-      # backwards compatibility continue to support them here.
-      elif phase == 'S' or phase == 'F' or phase == 'T':
-        self._ProcessAsyncEvent(event)
-      elif phase == 'b' or phase == 'e':
-        self._ProcessAsyncEvent(event)
-      # Note, I is historic. The instant event marker got changed, but we
-      # want to support loading old trace files so we have both I and i.
-      elif phase == 'I' or phase == 'i':
-        self._ProcessInstantEvent(event)
-      elif phase == 'P':
-        self._ProcessSampleEvent(event)
-      elif phase == 'C':
-        self._ProcessCounterEvent(event)
-      elif phase == 'M':
-        self._ProcessMetadataEvent(event)
-      elif phase == 'N' or phase == 'D' or phase == 'O':
-        self._ProcessObjectEvent(event)
-      elif phase == 's' or phase == 't' or phase == 'f':
-        self._ProcessFlowEvent(event)
-      elif phase == 'v':
-        self._ProcessMemoryDumpEvent(event)
+      # Processes that other importers created are imported here.
+      if (event.get('ph') in _PROCESS_LOCAL_PHASES and
+          event['pid'] not in self._model.processes):
+        events_by_pid.setdefault(event['pid'], []).append(event)
       else:
-        self._model.import_errors.append('Unrecognized event phase: ' +
-            phase + '(' + event['name'] + ')')
+        other_events.append(event)
 
-    return self._model
+    if len(events_by_pid) > 1:
+      self._ImportProcessesInPool(events_by_pid, jobs)
+    else:
+      for events in events_by_pid.itervalues():
+        for event in events:
+          self._ProcessEvent(event)
+
+    for event in other_events:
+      self._ProcessEvent(event)
+
+  def _ImportProcessesInPool(self, events_by_pid, jobs):
+    # Start with the largest processes, to keep all workers busy.
+    pids = sorted(events_by_pid, key=lambda pid: -len(events_by_pid[pid]))
+    if sys.platform == 'win32':
+      # Workers are not forked, so the events are sent to them.
+      work = [(pid, events_by_pid[pid]) for pid in pids]
+    else:
+      work = [(pid, None) for pid in pids]
+      _events_by_pid_to_import.update(events_by_pid)
+    # The results are mostly new objects, which only trigger pointless
+    # garbage collections while they are unpickled.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    pool = multiprocessing.Pool(min(jobs, len(work)), initializer=gc.disable)
+    try:
+      for process, import_errors in pool.imap_unordered(
+          _ImportProcessEvents, work, chunksize=1):
+        self._model.AddProcess(process)
+        self._model.import_errors.extend(import_errors)
+    finally:
+      pool.terminate()
+      pool.join()
+      _events_by_pid_to_import.clear()
+      if gc_was_enabled:
+        gc.enable()
+
+  def _ProcessEvent(self, event):
+    phase = event.get('ph', None)
+    if phase == 'B' or phase == 'E':
+      self._ProcessDurationEvent(event)
+    elif phase == 'X':
+      self._ProcessCompleteEvent(event)
+    # Note, S, F, T are deprecated and replaced by 'b' and 'e'. For
+    # backwards compatibility continue to support them here.
+    elif phase == 'S' or phase == 'F' or phase == 'T':
+      self._ProcessAsyncEvent(event)
+    elif phase == 'b' or phase == 'e':
+      self._ProcessAsyncEvent(event)
+    # Note, I is historic. The instant event marker got changed, but we
+    # want to support loading old trace files so we have both I and i.
+    elif phase == 'I' or phase == 'i':
+      self._ProcessInstantEvent(event)
+    elif phase == 'P':
+      self._ProcessSampleEvent(event)
+    elif phase == 'C':
+      self._ProcessCounterEvent(event)
+    elif phase == 'M':
+      self._ProcessMetadataEvent(event)
+    elif phase == 'N' or phase == 'D' or phase == 'O':
+      self._ProcessObjectEvent(event)
+    elif phase == 's' or phase == 't' or phase == 'f':
+      self._ProcessFlowEvent(event)
+    elif phase == 'v':
+      self._ProcessMemoryDumpEvent(event)
+    else:
+      self._model.import_errors.append('Unrecognized event phase: ' +
+          phase + '(' + event['name'] + ')')
 
   def FinalizeImport(self):
     """Called by the Model after all other importers have imported their
@@ -295,8 +378,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
         if event['ph'] == 'F' or event['ph'] == 'e':
           # Create a slice from start to end.
           async_slice = tracing_async_slice.AsyncSlice(
-              events[0]['event']['cat'],
-              name,
+              self._Intern(events[0]['event']['cat']),
+              self._Intern(name),
               events[0]['event']['ts'] / 1000.0)
 
           async_slice.duration = ((event['ts'] / 1000.0)
@@ -318,8 +401,8 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
             if events[j - 1]['event']['ph'] == 'T':
               sub_name = name + ':' + events[j - 1]['event']['args']['step']
             sub_slice = tracing_async_slice.AsyncSlice(
-                events[0]['event']['cat'],
-                sub_name,
+                self._Intern(events[0]['event']['cat']),
+                self._Intern(sub_name),
                 events[j - 1]['event']['ts'] / 1000.0)
             sub_slice.parent_slice = async_slice
 
@@ -377,9 +460,9 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
         continue
 
       flow_event = tracing_flow_event.FlowEvent(
-          event['cat'],
+          self._Intern(event['cat']),
           event['id'],
-          event['name'],
+          self._Intern(event['name']),
           event['ts'] / 1000.0,
           event['args'])
       thread.AddFlowEvent(flow_event)
@@ -420,3 +503,31 @@ class TraceEventTimelineImporter(importer.TimelineImporter):
     for thread in self._model.GetAllThreads():
       if thread.name == 'CrGpuMain':
         self._model.gpu_process = thread.parent
+
+
+def _ImportProcessEvents(pid_and_events):
+  """Imports the process-local events of one process in a worker process.
+
+  Args:
+    pid_and_events: A tuple of a pid and the list of its events, or None if
+        the events are in _events_by_pid_to_import.
+
+  Returns:
+    A tuple of the new Process, detached from its model, and the list of
+    import errors.
+  """
+  # Imported here, since the model imports this module.
+  from telemetry.timeline import model as model_module
+
+  pid, events = pid_and_events
+  if events is None:
+    events = _events_by_pid_to_import[pid]
+  model = model_module.TimelineModel()
+  # The events are copies in this process, so they can be used as they are.
+  trace_event_importer = TraceEventTimelineImporter(
+      model, trace_data_module.TraceDataBuilder().AsData())
+  for event in events:
+    trace_event_importer._ProcessEvent(event)  # pylint: disable=W0212
+  process = model.GetOrCreateProcess(pid)
+  process.parent = None
+  return process, model.import_errors
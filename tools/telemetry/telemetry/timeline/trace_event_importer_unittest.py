@@ -2,6 +2,7 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import copy
 import unittest
 
 import telemetry.timeline.counter as tracing_counter
@@ -77,6 +78,19 @@ class TraceEventTimelineImporterTest(unittest.TestCase):
     self.assertEqual(0, len(slice_event.sub_slices))
 
 
+  def testNamesAndCategoriesAreShared(self):
+    # Decoded JSON has distinct string objects for equal strings.
+    raw = ('[{"name": "a", "args": {}, "pid": 1, "ts": 1, "cat": "foo", '
+           '"tid": 2, "ph": "X", "dur": 1}, '
+           '{"name": "a", "args": {}, "pid": 1, "ts": 3, "cat": "foo", '
+           '"tid": 2, "ph": "X", "dur": 1}]')
+    m = timeline_model.TimelineModel(trace_data_module.TraceData(raw))
+    first, second = m.GetAllProcesses()[0].threads[2].all_slices
+    self.assertEqual(first.name, second.name)
+    self.assertIs(first.name, second.name)
+    self.assertIs(first.category, second.category)
+    self.assertRaises(AttributeError, setattr, first, 'unknown_attribute', 1)
+
   def testArgumentDupeCreatesNonFailingImportError(self):
     events = [
       {'name': 'a', 'args': {'x': 1}, 'pid': 1, 'ts': 520, 'cat': 'foo',
@@ -1063,3 +1077,65 @@ class TraceEventTimelineImporterTest(unittest.TestCase):
       self.assertEquals(dump_id, event.dump_id)
       self.assertAlmostEqual(start / 1000.0, event.start)
       self.assertAlmostEqual(duration / 1000.0, event.duration)
+
+  def testParallelImportMatchesSerialImport(self):
+    events = [
+      {'name': 'process_name', 'args': {'name': 'Browser'}, 'pid': 1,
+       'ts': 0, 'tid': 1, 'ph': 'M', 'cat': '__metadata'},
+      {'name': 'thread_name', 'args': {'name': 'CrBrowserMain'}, 'pid': 1,
+       'ts': 0, 'tid': 10, 'ph': 'M', 'cat': '__metadata'},
+      {'name': 'thread_name', 'args': {'name': 'CrRendererMain'}, 'pid': 2,
+       'ts': 0, 'tid': 20, 'ph': 'M', 'cat': '__metadata'},
+      {'name': 'a', 'args': {}, 'pid': 1, 'ts': 100, 'cat': 'foo',
+       'tid': 10, 'ph': 'B'},
+      {'name': 'b', 'args': {'x': 1}, 'pid': 1, 'ts': 110, 'dur': 20,
+       'cat': 'foo', 'tid': 10, 'ph': 'X'},
+      {'name': 'a', 'args': {'y': 2}, 'pid': 1, 'ts': 150, 'cat': 'foo',
+       'tid': 10, 'ph': 'E'},
+      {'name': 'async', 'args': {}, 'pid': 1, 'ts': 120, 'cat': 'foo',
+       'tid': 10, 'ph': 'b', 'id': 7},
+      {'name': 'c', 'args': {}, 'pid': 2, 'ts': 130, 'cat': 'bar',
+       'tid': 20, 'ph': 'B'},
+      {'name': 'ctr', 'args': {'value': 5}, 'pid': 2, 'ts': 135,
+       'cat': 'bar', 'tid': 20, 'ph': 'C'},
+      {'name': 'flow', 'args': {}, 'pid': 2, 'ts': 135, 'cat': 'bar',
+       'tid': 20, 'ph': 's', 'id': 8},
+      {'name': 'c', 'args': {}, 'pid': 2, 'ts': 140, 'cat': 'bar',
+       'tid': 20, 'ph': 'E'},
+      {'name': 'd', 'args': {}, 'pid': 3, 'ts': 145, 'cat': 'baz',
+       'tid': 30, 'ph': 'E'},
+      {'name': 'async', 'args': {}, 'pid': 3, 'ts': 160, 'cat': 'foo',
+       'tid': 30, 'ph': 'e', 'id': 7},
+      {'name': 'flow', 'args': {}, 'pid': 3, 'ts': 165, 'cat': 'bar',
+       'tid': 30, 'ph': 'f', 'id': 8},
+      {'name': 'e', 'args': {}, 'pid': 3, 'ts': 170, 'cat': 'baz',
+       'tid': 30, 'ph': 'I'},
+    ]
+
+    def Describe(m):
+      slices = sorted(
+          (s.parent_thread.parent.pid, s.parent_thread.tid, s.name, s.start,
+           s.duration, s.parent_slice and s.parent_slice.name, s.args)
+          for s in m.IterAllSlices())
+      async_slices = [
+          (s.name, s.start, s.duration, s.start_thread.tid, s.end_thread.tid)
+          for s in m.IterAllAsyncSlicesOfName('async')]
+      flows = [(a.name, a.start, b.start) for a, b in m.flow_events]
+      processes = sorted(
+          (p.pid, p.name, p.parent is m,
+           sorted((t.tid, t.name) for t in p.threads.itervalues()),
+           sorted((c.full_name, c.timestamps, c.samples)
+                  for c in p.counters.itervalues()))
+          for p in m.GetAllProcesses())
+      return (slices, async_slices, flows, processes,
+              sorted(m.import_errors), m.browser_process.pid)
+
+    # The import adds the args of E events to those of their B events.
+    serial_model = timeline_model.TimelineModel(
+        trace_data_module.TraceData(copy.deepcopy(events)))
+    parallel_model = timeline_model.TimelineModel(
+        trace_data_module.TraceData(copy.deepcopy(events)), import_jobs=2)
+    self.assertEqual(Describe(serial_model), Describe(parallel_model))
+    self.assertEqual(3, len(parallel_model.GetAllProcesses()))
+    self.assertEqual(1, len(parallel_model.flow_events))
+    self.assertEqual(1, len(parallel_model.import_errors))
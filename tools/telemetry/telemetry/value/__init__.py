@@ -287,12 +287,12 @@ class Value(object):
       d['description'] = None
 
     page_id = value_dict.get('page_id', None)
-    if page_id:
+    if page_id is not None:
       d['page'] = page_dict[int(page_id)]
     else:
       d['page'] = None
 
-    d['important'] = False
+    d['important'] = value_dict.get('important', False)
 
     tir_label = value_dict.get('tir_label', None)
     if tir_label:
@@ -21,8 +21,13 @@ class LayoutMetric(timeline_based_metric.TimelineBasedMetric):
 
   def AddResults(self, _model, renderer_thread, interactions, results):
     assert interactions
-    self._AddResultsInternal(renderer_thread.parent.IterAllSlices(),
-                             interactions, results)
+    slice_index = renderer_thread.parent.GetSliceIndex(self.EVENT_NAME)
+    events = []
+    for interaction in interactions:
+      events.extend(slice_index.GetStartingIn(interaction.start,
+                                              interaction.end))
+    # Interactions may overlap, but each layout is reported once.
+    self._AddResultsInternal(_Unique(events), interactions, results)
 
   def _AddResultsInternal(self, events, interactions, results):
     layouts = []
@@ -40,3 +45,13 @@ class LayoutMetric(timeline_based_metric.TimelineBasedMetric):
       values=layouts,
       description=('List of durations of layouts that were caused by and '
                    'start during interactions')))
+
+
+def _Unique(events):
+  unique_events = []
+  seen = set()
+  for event in events:
+    if id(event) not in seen:
+      seen.add(id(event))
+      unique_events.append(event)
+  return unique_events
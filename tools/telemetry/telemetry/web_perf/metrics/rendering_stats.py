@@ -1,10 +1,6 @@
 # Copyright 2014 The Chromium Authors. All rights reserved.
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
-import itertools
-
-from operator import attrgetter
-
 from telemetry.web_perf.metrics import rendering_frame
 
 # These are LatencyInfo component names indicating the various components
@@ -53,10 +49,10 @@ def GetLatencyEvents(process, timeline_range):
   latency_events = []
   if not process:
     return latency_events
-  for event in itertools.chain(
-      process.IterAllAsyncSlicesStartsWithName('InputLatency'),
-      process.IterAllAsyncSlicesStartsWithName('Latency')):
-    if event.start >= timeline_range.min and event.end <= timeline_range.max:
+  for event in process.GetAsyncSliceIndex().GetContained(
+      timeline_range.min, timeline_range.max):
+    if (event.name.startswith('InputLatency') or
+        event.name.startswith('Latency')):
       for ss in event.sub_slices:
         if 'data' in ss.args:
           latency_events.append(ss)
@@ -223,14 +219,9 @@ class RenderingStats(object):
         if name == GESTURE_SCROLL_UPDATE_EVENT_NAME]
 
   def _GatherEvents(self, event_name, process, timeline_range):
-    events = []
-    for event in process.IterAllSlicesOfName(event_name):
-      if event.start >= timeline_range.min and event.end <= timeline_range.max:
-        if 'data' not in event.args:
-          continue
-        events.append(event)
-    events.sort(key=attrgetter('start'))
-    return events
+    # The index returns the events sorted by start time.
+    return [event for event in process.GetSliceIndex(event_name).GetContained(
+        timeline_range.min, timeline_range.max) if 'data' in event.args]
 
   def _AddFrameTimestamp(self, event):
     frame_count = event.args['data']['frame_count']
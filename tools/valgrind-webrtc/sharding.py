@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Helpers for running the tests of a gtest binary in parallel shards.
+
+The tests of the binary are listed and split into shards whose expected
+durations, taken from previous runs, are balanced. Each shard runs as a
+separate webrtc_tests.py process with a --gtest_filter of its tests. The
+reports of all shards are merged and deduplicated by the error hash the
+memory tools print with each suppression.
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import subprocess
+
+# Duration assumed for tests without history, relative to the known ones.
+_DEFAULT_DURATION_MS = 1000
+
+# Matches the result lines of gtest, e.g. '[       OK ] Foo.Bar (12 ms)'.
+_TEST_RESULT_RE = re.compile(r'^\[\s+(?:OK|FAILED)\s+\] (\S+) \((\d+) ms\)',
+                             re.MULTILINE)
+
+# Matches the suppressions printed by memcheck and Dr. Memory for each report.
+_SUPPRESSION_RE = re.compile(
+    r'^Suppression \(error hash=#([0-9A-Fa-f]+)#\):.*?^(\{.*?^\})',
+    re.MULTILINE | re.DOTALL)
+
+
+def ListTests(test_executable, gtest_filter=None):
+  """Lists the tests of a gtest binary.
+
+  Args:
+    test_executable: Path of the gtest binary.
+    gtest_filter: Optional --gtest_filter restricting the tests.
+  Returns:
+    A list of full test names, e.g. 'FooTest.Bar', in the order of the binary.
+  """
+  cmd = [test_executable, '--gtest_list_tests']
+  if gtest_filter:
+    cmd.append('--gtest_filter=%s' % gtest_filter)
+  logging.info('Listing tests: %s', ' '.join(cmd))
+  output = subprocess.check_output(cmd)
+  tests = []
+  test_case = None
+  for line in output.splitlines():
+    # Strip comments like '  # GetParam() = 1'.
+    name = line.split('#', 1)[0].strip()
+    if not name:
+      continue
+    if not line[0].isspace():
+      test_case = name
+    elif test_case:
+      tests.append(test_case + name)
+  return tests
+
+
+def BalanceShards(tests, shard_count, durations):
+  """Splits tests into shards of about equal expected duration.
+
+  Tests are assigned longest first to the shard with the lowest total, using
+  the durations of previous runs. Tests without history are assumed to take
+  the average known duration.
+
+  Args:
+    tests: List of test names.
+    shard_count: Number of shards.
+    durations: Dict mapping test names to their durations in ms.
+  Returns:
+    A list of shard_count lists of test names, each in the order of tests.
+  """
+  known = [durations[test] for test in tests if test in durations]
+  default = (sum(known) / len(known)) if known else _DEFAULT_DURATION_MS
+  order = dict((test, index) for index, test in enumerate(tests))
+  heap = [(0, shard) for shard in range(shard_count)]
+  shards = [[] for _ in range(shard_count)]
+  for test in sorted(tests, key=lambda t: (-durations.get(t, default),
+                                           order[t])):
+    total, shard = heapq.heappop(heap)
+    shards[shard].append(test)
+    heapq.heappush(heap, (total + durations.get(test, default), shard))
+  for shard in shards:
+    shard.sort(key=order.get)
+  return shards
+
+
+def ParseTestDurations(log):
+  """Returns a dict mapping test names to durations in ms from gtest output."""
+  return dict((name, int(duration_ms))
+              for name, duration_ms in _TEST_RESULT_RE.findall(log))
+
+
+def ParseSuppressions(log):
+  """Returns a list of (error hash, suppression) tuples from a tool log."""
+  return [(error_hash.upper(), suppression)
+          for error_hash, suppression in _SUPPRESSION_RE.findall(log)]
+
+
+def MergeSuppressions(shard_logs):
+  """Merges the reports of several shards, deduplicated by error hash.
+
+  Args:
+    shard_logs: List of the logs of all shards.
+  Returns:
+    A list of (error hash, suppression, list of shard indices) tuples, in the
+    order of their first occurrence.
+  """
+  merged = {}
+  order = []
+  for shard_index, log in enumerate(shard_logs):
+    for error_hash, suppression in ParseSuppressions(log):
+      if error_hash not in merged:
+        merged[error_hash] = (suppression, [])
+        order.append(error_hash)
+      shards = merged[error_hash][1]
+      if shard_index not in shards:
+        shards.append(shard_index)
+  return [(error_hash,) + merged[error_hash] for error_hash in order]
+
+
+def WriteSuppressions(file_name, merged):
+  """Writes merged reports as a suppression file usable by the tools."""
+  with open(file_name, 'w') as suppression_file:
+    for error_hash, suppression, shards in merged:
+      suppression_file.write('# error hash=#%s#, reported by shards %s\n%s\n' %
+                             (error_hash, ', '.join(map(str, shards)),
+                              suppression))
+
+
+def LoadDurations(file_name):
+  """Loads the test durations saved by SaveDurations, if any."""
+  if not os.path.exists(file_name):
+    return {}
+  with open(file_name) as durations_file:
+    return json.load(durations_file)
+
+
+def SaveDurations(file_name, durations):
+  """Saves the test durations for balancing the shards of the next run."""
+  with open(file_name, 'w') as durations_file:
+    json.dump(durations, durations_file, indent=2, sort_keys=True)
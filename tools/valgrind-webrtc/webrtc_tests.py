@@ -22,17 +22,28 @@ Since they're referenced from the chrome_tests.py script, we have similar files
 below the directory of this script. When executing, this script will setup both
 Chrome's suppression files and our own, so we can easily maintain WebRTC
 specific suppressions in our own files.
+
+Sharding:
+With --shards=N the tests of the binary are split into N shards which run
+concurrently, each in its own webrtc_tests.py process and log file. The shards
+are balanced using the test durations of previous runs, and the reports of all
+shards are merged and deduplicated by error hash. The durations, the logs and
+the merged suppressions are kept in --shard_cache_dir. With --baseline the
+merged suppressions are saved there, and --use_cached_suppressions applies the
+saved ones to later runs.
 """
 
 import logging
 import optparse
 import os
+import subprocess
 import sys
 
 import logging_utils
 import path_utils
 
 import chrome_tests
+import sharding
 
 
 class WebRTCTest(chrome_tests.ChromeTests):
@@ -50,6 +61,7 @@ class WebRTCTest(chrome_tests.ChromeTests):
       test_in_chrome_tests: The name of the test configuration in ChromeTests.
     """
     self._test_name = test_name
+    self._extra_suppressions = options.extra_suppressions or []
     chrome_tests.ChromeTests.__init__(self, options, args, test_in_chrome_tests)
 
   def _DefaultCommand(self, tool, exe=None, valgrind_test_args=None):
@@ -80,9 +92,85 @@ class WebRTCTest(chrome_tests.ChromeTests):
     for token in cmd:
       if '--suppressions' in token:
         add_suppressions.append(token.replace(script_dir, new_dir))
+    for suppression_file in self._extra_suppressions:
+      add_suppressions.append('--suppressions=%s' % suppression_file)
     return add_suppressions + cmd
 
 
+def RunShards(options, test_executable, option_tokens, test_args):
+  """Runs the tests of a binary in concurrent shards and merges the reports.
+
+  Args:
+    options: The parsed options.
+    test_executable: Path of the gtest binary.
+    option_tokens: The command-line options of this script, passed on to the
+      shards.
+    test_args: The arguments for the test binary.
+  Returns:
+    0 if all shards succeeded, else the first non-zero exit code.
+  """
+  cache_dir = options.shard_cache_dir or os.path.join(
+      os.path.dirname(os.path.abspath(test_executable)), 'valgrind_shards')
+  log_dir = os.path.join(cache_dir, 'logs')
+  if not os.path.isdir(log_dir):
+    os.makedirs(log_dir)
+  prefix = '%s.%s' % (os.path.basename(options.test), options.valgrind_tool)
+  durations_file = os.path.join(cache_dir, prefix + '.durations.json')
+  suppressions_file = os.path.join(cache_dir, prefix + '.supp')
+
+  durations = sharding.LoadDurations(durations_file)
+  tests = sharding.ListTests(test_executable, options.gtest_filter)
+  shards = [shard for shard in sharding.BalanceShards(tests, options.shards,
+                                                      durations) if shard]
+  shard_options = ['--shards=1']
+  if options.use_cached_suppressions and os.path.exists(suppressions_file):
+    shard_options.append('--extra_suppressions=%s' % suppressions_file)
+
+  processes = []
+  log_files = []
+  for shard_index, shard in enumerate(shards):
+    log_file = os.path.join(log_dir, '%s.shard%d.log' % (prefix, shard_index))
+    cmd = ([sys.executable, os.path.abspath(__file__)] + option_tokens +
+           shard_options + ['--gtest_filter=%s' % ':'.join(shard), '--'] +
+           test_args)
+    logging.info('Starting shard %d of %d with %d tests, logging to %s',
+                 shard_index, len(shards), len(shard), log_file)
+    with open(log_file, 'w') as log:
+      processes.append(subprocess.Popen(cmd, stdout=log,
+                                        stderr=subprocess.STDOUT))
+    log_files.append(log_file)
+
+  return_code = 0
+  for shard_index, process in enumerate(processes):
+    shard_return_code = process.wait()
+    if shard_return_code:
+      logging.error('Shard %d failed with exit code %d, see %s', shard_index,
+                    shard_return_code, log_files[shard_index])
+      return_code = return_code or shard_return_code
+
+  logs = []
+  for log_file in log_files:
+    with open(log_file) as log:
+      logs.append(log.read())
+  for log in logs:
+    durations.update(sharding.ParseTestDurations(log))
+  sharding.SaveDurations(durations_file, durations)
+
+  merged = sharding.MergeSuppressions(logs)
+  merged_file = os.path.join(log_dir, prefix + '.merged.supp')
+  sharding.WriteSuppressions(merged_file, merged)
+  for error_hash, suppression, shard_indices in merged:
+    print 'Suppression (error hash=#%s#), reported by shards %s:\n%s' % (
+        error_hash, ', '.join(map(str, shard_indices)), suppression)
+  logging.info('%d unique reports in %d shards, written to %s', len(merged),
+               len(shards), merged_file)
+  if options.baseline:
+    sharding.WriteSuppressions(suppressions_file, merged)
+    logging.info('Saved the suppressions for later runs to %s',
+                 suppressions_file)
+  return return_code
+
+
 def main(_):
   parser = optparse.OptionParser(
       'usage: %prog -b <dir> -t <test> -- <test args>')
@@ -123,6 +211,18 @@ def main(_):
                     help="run the tests with --test-launcher-total-shards")
   parser.add_option("--test-launcher-shard-index", type=int,
                     help="run the tests with --test-launcher-shard-index")
+  parser.add_option('--shards', type=int, default=1,
+                    help='Number of shards to run the tests in concurrently.')
+  parser.add_option('--shard_cache_dir',
+                    help=('Directory for the shard logs, test durations and '
+                          'saved suppressions. Default: valgrind_shards next '
+                          'to the test executable.'))
+  parser.add_option('--use_cached_suppressions', action='store_true',
+                    default=False,
+                    help=('Apply the suppressions saved by a sharded '
+                          '--baseline run.'))
+  parser.add_option('--extra_suppressions', action='append',
+                    help='Additional suppression file (can be repeated).')
   options, args = parser.parse_args()
 
   if options.verbose:
@@ -132,6 +232,9 @@ def main(_):
 
   if not options.test:
     parser.error('--test not specified')
+  if options.shards > 1 and options.keep_logs:
+    parser.error('--keep_logs cannot be used with --shards, since the shards '
+                 'would clobber each other\'s logs.')
 
   # Support build dir both with and without the target.
   if (options.target and options.build_dir and
@@ -142,6 +245,15 @@ def main(_):
   test_executable = options.test
   if options.build_dir and not test_executable.startswith(options.build_dir):
     test_executable = os.path.join(options.build_dir, test_executable)
+
+  if options.shards > 1:
+    # Pass the options on to the shards, without the '--' before the test
+    # arguments.
+    option_tokens = sys.argv[1:len(sys.argv) - len(args)]
+    if option_tokens and option_tokens[-1] == '--':
+      option_tokens.pop()
+    return RunShards(options, test_executable, option_tokens, args)
+
   args = [test_executable] + args
 
   test = WebRTCTest(options.test, options, args, 'cmdline')
@@ -11,6 +11,7 @@
 # Able to plot each flow separately. Other plot boxes can be added,
 # currently one for Throughput, one for Latency and one for Packet Loss.
 
+import array
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy
@@ -20,6 +21,17 @@ import sys
 # Change this to True to save the figure to a file. Look below for details.
 save_figure = False
 
+# Maximum number of points to plot per series. Longer series are downsampled,
+# keeping the minimum and maximum of each group of consecutive samples, so that
+# they look the same at screen resolution. Set to None to plot every sample.
+max_points_per_series = 4000
+
+# PLOT lines are: PLOT\t<figure>\t<tag>#<n>@<algorithm>\t<time>\t<value>,
+# where the tag ends with _<flow ids>_<variable name>.
+_PLOT_LINE = re.compile(r'_((\d+(?:,\d+)*)_(\D+))#\d@(\S+)'
+                        r'\t(\d+\.\d+)\t(-?\d+\.\d+)')
+_FLOW_IDS = re.compile(r'(\d+(,\d+)*)')
+
 class Variable(object):
   def __init__(self, variable):
     self._ID = variable[0]
@@ -48,25 +60,67 @@ class Variable(object):
     return len(self.samples)
 
 
-  def addSample(self, line):
-    groups = re.search(r'_(((\d)+((,(\d)+)*))_(\D+))#\d@(\S+)', line)
-
-    # Each variable will be plotted in a separated box.
-    var_name = groups.group(1)
-    alg_name = groups.group(8)
-
-    alg_name = alg_name.replace('_', ' ')
-
-    if alg_name not in self.samples.keys():
-      self.samples[alg_name] = {}
-
-    if var_name not in self.samples[alg_name].keys():
-      self.samples[alg_name][var_name] = []
-
-    sample = re.search(r'(\d+\.\d+)\t([-]?\d+\.\d+)', line)
+  def addSample(self, alg_name, var_name, x, y):
+    """Appends a sample to the series of a flow of an algorithm.
+
+    The samples are stored in arrays of doubles, which can be plotted without
+    conversion.
+    """
+    flows = self.samples.get(alg_name)
+    if flows is None:
+      flows = self.samples[alg_name] = {}
+
+    series = flows.get(var_name)
+    if series is None:
+      series = flows[var_name] = (array.array('d'), array.array('d'))
+
+    series[0].append(x)
+    series[1].append(y)
+
+
+def parseLine(line):
+  """Parses a PLOT line.
+
+  Returns:
+    A tuple with the algorithm name, the variable name prefixed with the flow
+    ids, and the time and value of the sample, or None if the line doesn't
+    contain a sample.
+  """
+  match = _PLOT_LINE.search(line)
+  if match is None:
+    return None
+  # Each variable will be plotted in a separated box.
+  var_name, _, _, alg_name, x, y = match.groups()
+  return alg_name.replace('_', ' '), var_name, float(x), float(y)
+
+
+def downsample(x, y, max_points):
+  """Reduces a series to about max_points points, preserving its extremes.
+
+  The samples are split into max_points / 2 groups of consecutive samples, of
+  which only the minimum and the maximum are kept, in their original order.
+  The first and the last samples are always kept.
+  """
+  n = len(y)
+  if not max_points or n <= max_points:
+    return x, y
+
+  groups = max(max_points / 2, 1)
+  group_size = -(-n // groups)
+  # Pad with the last sample, which is never selected instead of itself since
+  # argmin and argmax return the first occurrence.
+  padded = numpy.empty(groups * group_size)
+  padded[:n] = y
+  padded[n:] = y[-1]
+  padded = padded.reshape(groups, group_size)
+  offsets = numpy.arange(groups) * group_size
+
+  keep = numpy.concatenate(([0, n - 1],
+                            offsets + padded.argmin(axis=1),
+                            offsets + padded.argmax(axis=1)))
+  keep = numpy.unique(numpy.minimum(keep, n - 1))
+  return x[keep], y[keep]
 
-    s = (sample.group(1), sample.group(2))
-    self.samples[alg_name][var_name].append(s)
 
 def plotVar(v, ax, show_legend, show_x_label):
   if show_x_label:
@@ -77,10 +131,10 @@ def plotVar(v, ax, show_legend, show_x_label):
 
     for series in v.samples[alg].keys():
 
-      x = [sample[0] for sample in v.samples[alg][series]]
-      y = [sample[1] for sample in v.samples[alg][series]]
-      x = numpy.array(x)
-      y = numpy.array(y)
+      x, y = v.samples[alg][series]
+      x = numpy.frombuffer(x, dtype=numpy.float64)
+      y = numpy.frombuffer(y, dtype=numpy.float64)
+      x, y = downsample(x, y, max_points_per_series)
 
       line = plt.plot(x, y, label=alg, linewidth=4.0)
 
@@ -97,7 +151,7 @@ def plotVar(v, ax, show_legend, show_x_label):
                   'NADA3':'#C0A0FF',
                   'NADA4':'#9060B0',}
 
-      flow_id = re.search(r'(\d+(,\d+)*)', series)  # One or multiple ids.
+      flow_id = _FLOW_IDS.search(series)  # One or multiple ids.
       key = alg + flow_id.group(1)
 
       if key in colormap:
@@ -141,9 +195,13 @@ def main():
     if line.startswith("[ RUN      ]"):
       test_name = re.search(r'\.(\w+)', line).group(1)
     if line.startswith("PLOT"):
+      sample = None
       for v in var:
         if v.getID() in line:
-          v.addSample(line)
+          # Parse each line only once, even if it matches several variables.
+          sample = sample or parseLine(line)
+          if sample:
+            v.addSample(*sample)
 
   matplotlib.rcParams.update({'font.size': 48/len(variables)})
 
@@ -7,19 +7,46 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import itertools
 import optparse
 import os
 import sys
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 if __name__ == '__main__':
   # Make sure we always can import helper_functions.
   sys.path.append(os.path.dirname(__file__))
 
 import helper_functions
+try:
+  import yuv_io
+except ImportError:
+  yuv_io = None  # Requires NumPy, which only the numpy decoder depends on.
 
 # Chrome browsertests will throw away stderr; avoid that output gets lost.
 sys.stderr = sys.stdout
 
+# A UPC-A barcode has 95 modules: a 3 module start guard, six 7 module digits,
+# a 5 module middle guard, six 7 module digits and a 3 module end guard. This
+# makes 59 alternating bars and spaces, starting and ending with a bar.
+_UPCA_MODULES = 95
+_UPCA_RUNS = 59
+_UPCA_GUARD_RUNS = [0, 1, 2, 27, 28, 29, 30, 31, 56, 57, 58]
+_UPCA_LEFT_DIGIT_RUNS = slice(3, 27)
+_UPCA_RIGHT_DIGIT_RUNS = slice(32, 56)
+
+# The minimum difference between the darkest and the lightest luma value of a
+# scan line for it to be considered as containing a barcode.
+_MIN_BARCODE_CONTRAST = 32
+
+# The number of frame ranges to split the video into for each decoding process,
+# so that the processes stay busy when some ranges are faster to decode.
+_FRAME_RANGES_PER_JOB = 4
+
 
 def convert_yuv_to_png_files(yuv_file_name, yuv_frame_width, yuv_frame_height,
                              output_directory, ffmpeg_path):
@@ -61,7 +88,7 @@ def convert_yuv_to_png_files(yuv_file_name, yuv_frame_width, yuv_frame_height,
   return True
 
 
-def decode_frames(input_directory, zxing_path):
+def decode_frames(input_directory, zxing_path, jobs=1):
   """Decodes the barcodes overlaid in each frame.
 
   The function uses the Zxing command-line tool from the Zxing C++ distribution
@@ -77,11 +104,24 @@ def decode_frames(input_directory, zxing_path):
       read.
     zxing_path(string): The path to the zxing binary. If specified as None,
       the PATH will be searched for it.
+    jobs(int): The number of processes to decode ranges of frames in.
   Return:
     (bool): True if the decoding succeeded.
   """
   if not zxing_path:
     zxing_path = 'zxing.exe' if sys.platform == 'win32' else 'zxing'
+  if jobs > 1:
+    print 'Decoding barcodes from PNG files with %s in %d processes...' % (
+        zxing_path, jobs)
+    frame_ranges = helper_functions.split_into_ranges(
+        1, _count_frames_in(input_directory=input_directory) + 1,
+        jobs * _FRAME_RANGES_PER_JOB)
+    return all(helper_functions.map_in_process_pool(
+        _decode_frame_range,
+        [(input_directory, zxing_path, start, stop)
+         for start, stop in frame_ranges],
+        jobs))
+
   print 'Decoding barcodes from PNG files with %s...' % zxing_path
   return helper_functions.perform_action_on_all_files(
       directory=input_directory, file_pattern='frame_',
@@ -89,6 +129,24 @@ def decode_frames(input_directory, zxing_path):
       command_line_decoder=zxing_path)
 
 
+def _decode_frame_range(frame_range):
+  """Decodes the barcodes in a range of PNG frames with zxing.
+
+  Args:
+    frame_range(tuple): The input directory, the path to the zxing binary, and
+      the number of the first frame and the one after the last frame to decode.
+  Return:
+    (bool): True if all the frames were decoded.
+  """
+  input_directory, zxing_path, start, stop = frame_range
+  file_prefix = os.path.join(input_directory, 'frame_')
+  for frame_number in range(start, stop):
+    file_name = file_prefix + helper_functions.zero_pad(frame_number) + '.png'
+    if not _decode_barcode_in_file(file_name, zxing_path):
+      return False
+  return True
+
+
 def _decode_barcode_in_file(file_name, command_line_decoder):
   """Decodes the barcode in the upper left corner of a PNG file.
 
@@ -116,6 +174,146 @@ def _decode_barcode_in_file(file_name, command_line_decoder):
   return True
 
 
+def decode_frames_in_process(yuv_file_name, yuv_frame_width, yuv_frame_height,
+                             barcode_width, barcode_height, stats_file_name,
+                             jobs=1):
+  """Decodes the barcodes overlaid in each frame without external tools.
+
+  The YUV file is memory-mapped and the barcode in the upper left corner of
+  the luma plane of every frame is decoded directly from the mapped memory, so
+  no PNG frames or barcode .txt files are written. The results are written to
+  the stats file in the same format as _generate_stats_file produces.
+
+  Args:
+    yuv_file_name(string): The name of the YUV file.
+    yuv_frame_width(int): The width of one YUV frame.
+    yuv_frame_height(int): The height of one YUV frame.
+    barcode_width(int): The width of the barcode area in the upper left corner.
+    barcode_height(int): The height of the barcode area in the upper left
+      corner.
+    stats_file_name(string): The name of the stats file to write.
+    jobs(int): The number of processes to decode ranges of frames in.
+  Return:
+    (bool): True if the decoding succeeded.
+  """
+  if numpy is None:
+    print 'The in-process decoder requires NumPy. Have you installed it?'
+    return False
+
+  reader = yuv_io.I420Reader(yuv_file_name, yuv_frame_width, yuv_frame_height)
+  number_of_frames = len(reader)
+  reader.close()
+  frame_ranges = [(yuv_file_name, yuv_frame_width, yuv_frame_height,
+                   barcode_width, barcode_height, start, stop)
+                  for start, stop in helper_functions.split_into_ranges(
+                      0, number_of_frames, jobs * _FRAME_RANGES_PER_JOB)]
+  if jobs > 1:
+    print 'Decoding barcodes from %s in %d processes...' % (yuv_file_name,
+                                                            jobs)
+    barcodes = helper_functions.map_in_process_pool(
+        _decode_frame_range_in_process, frame_ranges, jobs)
+  else:
+    print 'Decoding barcodes from %s in-process...' % yuv_file_name
+    barcodes = [_decode_frame_range_in_process(frame_range)
+                for frame_range in frame_ranges]
+  _write_stats_file(stats_file_name, itertools.chain.from_iterable(barcodes))
+  return True
+
+
+def _decode_frame_range_in_process(frame_range):
+  """Decodes the barcodes in a range of frames of a memory-mapped YUV file.
+
+  Args:
+    frame_range(tuple): The arguments of decode_frames_in_process identifying
+      the YUV file and the barcode area, followed by the number of the first
+      frame and the one after the last frame to decode.
+  Return:
+    (list): The decoded barcode of every frame in the range, or None for the
+      frames for which no barcode could be decoded.
+  """
+  (yuv_file_name, yuv_frame_width, yuv_frame_height, barcode_width,
+   barcode_height, start, stop) = frame_range
+  reader = yuv_io.I420Reader(yuv_file_name, yuv_frame_width, yuv_frame_height)
+  luma_planes = reader.planes(start, stop)[0]
+  barcodes = [decode_upca_barcode(luma[:barcode_height, :barcode_width])
+              for luma in luma_planes]
+  reader.close()
+  return barcodes
+
+
+def decode_upca_barcode(image):
+  """Decodes a UPC-A barcode from a grayscale image.
+
+  Every row of the image is expected to cross all the bars of the barcode. The
+  rows are first averaged into one scan line, which cancels out most of the
+  coding noise. If that line cannot be decoded, the rows are tried one by one.
+
+  Args:
+    image(numpy.ndarray): A 2D array of luma values.
+  Return:
+    (string): The decoded barcode (12-digit), or None if it cannot be decoded.
+  """
+  for scan_line in itertools.chain([image.mean(axis=0)], image):
+    barcode = _decode_upca_scan_line(scan_line)
+    if barcode is not None:
+      return barcode
+  return None
+
+
+def _decode_upca_scan_line(scan_line):
+  """Decodes a UPC-A barcode from one line of luma values.
+
+  Args:
+    scan_line(numpy.ndarray): A 1D array of luma values.
+  Return:
+    (string): The decoded barcode (12-digit) if it passes the check digit
+      test, None otherwise.
+  """
+  darkest = float(scan_line.min())
+  lightest = float(scan_line.max())
+  if lightest - darkest < _MIN_BARCODE_CONTRAST:
+    return None
+
+  # Run-length encode the line into alternating bars and spaces.
+  is_bar = scan_line < (darkest + lightest) / 2
+  run_starts = numpy.concatenate(
+      ([0], numpy.flatnonzero(is_bar[1:] != is_bar[:-1]) + 1))
+  run_lengths = numpy.diff(numpy.append(run_starts, len(is_bar)))
+  bar_runs = numpy.flatnonzero(is_bar[run_starts])
+
+  # Try every bar as the first bar of the start guard.
+  for first_run in bar_runs[bar_runs <= len(run_lengths) - _UPCA_RUNS]:
+    barcode = _decode_upca_runs(run_lengths[first_run:first_run + _UPCA_RUNS])
+    if barcode is not None and _check_barcode(barcode):
+      return barcode
+  return None
+
+
+def _decode_upca_runs(run_lengths):
+  """Decodes the digits of a UPC-A barcode from its bar and space widths.
+
+  Args:
+    run_lengths(numpy.ndarray): The widths of the 59 bars and spaces forming
+      the barcode, starting with the first bar of the start guard.
+  Return:
+    (string): The 12 decoded digits, or None if the guards don't match.
+  """
+  module_width = run_lengths.sum() / float(_UPCA_MODULES)
+  guards = run_lengths[_UPCA_GUARD_RUNS] / module_width
+  if numpy.any(numpy.abs(guards - 1) > 0.5):
+    return None
+
+  digit_runs = numpy.concatenate((run_lengths[_UPCA_LEFT_DIGIT_RUNS],
+                                  run_lengths[_UPCA_RIGHT_DIGIT_RUNS]))
+  digit_runs = digit_runs.reshape(12, 4).astype(float)
+  # Every digit is 7 modules wide; normalize to cancel out scaling errors.
+  digit_widths = digit_runs * (7 / digit_runs.sum(axis=1))[:, numpy.newaxis]
+  patterns = numpy.array(helper_functions.UPCA_DIGIT_WIDTHS)
+  distances = numpy.abs(digit_widths[:, numpy.newaxis, :] -
+                        patterns[numpy.newaxis, :, :]).sum(axis=2)
+  return ''.join(str(digit) for digit in distances.argmin(axis=1))
+
+
 def _generate_stats_file(stats_file_name, input_directory='.'):
   """Generate statistics file.
 
@@ -124,34 +322,70 @@ def _generate_stats_file(stats_file_name, input_directory='.'):
   (effectively the frame number) and barcode is the decoded barcode. The frames
   and the helper .txt files are removed after they have been used.
   """
-  file_prefix = os.path.join(input_directory, 'frame_')
-  stats_file = open(stats_file_name, 'w')
+  _write_stats_file(stats_file_name,
+                    _read_barcodes_from_directory(input_directory))
 
-  print 'Generating stats file: %s' % stats_file_name
+
+def _read_barcodes_from_directory(input_directory):
+  """Reads the decoded barcodes of all the PNG frames in a directory.
+
+  The frames and the helper .txt files are removed after they have been read.
+
+  Args:
+    input_directory(string): The directory containing the frames.
+  Return:
+    (generator): The decoded barcode of every frame in order, or None for the
+      frames for which no barcode could be decoded.
+  """
+  file_prefix = os.path.join(input_directory, 'frame_')
   for i in range(1, _count_frames_in(input_directory=input_directory) + 1):
     frame_number = helper_functions.zero_pad(i)
     barcode_file_name = file_prefix + frame_number + '.txt'
     png_frame = file_prefix + frame_number + '.png'
-    entry_frame_number = helper_functions.zero_pad(i-1)
-    entry = 'frame_' + entry_frame_number + ' '
 
+    barcode = None
     if os.path.isfile(barcode_file_name):
       barcode = _read_barcode_from_text_file(barcode_file_name)
       os.remove(barcode_file_name)
+    yield barcode
+    os.remove(png_frame)
 
-      if _check_barcode(barcode):
-        entry += (helper_functions.zero_pad(int(barcode[0:11])) + '\n')
-      else:
-        entry += 'Barcode error\n'  # Barcode is wrongly detected.
-    else:  # Barcode file doesn't exist.
-      entry += 'Barcode error\n'
 
-    stats_file.write(entry)
-    os.remove(png_frame)
+def _write_stats_file(stats_file_name, barcodes):
+  """Writes the stats file for a sequence of decoded barcodes.
+
+  Args:
+    stats_file_name(string): The name of the stats file to write.
+    barcodes(iterable): The decoded barcode of every frame in order, or None
+      for the frames for which no barcode could be decoded.
+  """
+  stats_file = open(stats_file_name, 'w')
+
+  print 'Generating stats file: %s' % stats_file_name
+  for frame_number, barcode in enumerate(barcodes):
+    stats_file.write(_format_stats_entry(frame_number, barcode))
 
   stats_file.close()
 
 
+def _format_stats_entry(frame_number, barcode):
+  """Formats the stats file line of one frame.
+
+  Args:
+    frame_number(int): The number of the frame, starting from 0.
+    barcode(string): The decoded barcode, or None if no barcode was decoded.
+  Return:
+    (string): The line in the format frame_xxxx yyyy, where yyyy is the frame
+      number in the barcode or 'Barcode error' if it was wrongly detected.
+  """
+  entry = 'frame_' + helper_functions.zero_pad(frame_number) + ' '
+  if barcode is not None and _check_barcode(barcode):
+    entry += (helper_functions.zero_pad(int(barcode[0:11])) + '\n')
+  else:
+    entry += 'Barcode error\n'
+  return entry
+
+
 def _read_barcode_from_text_file(barcode_file_name):
   """Reads the decoded barcode for a .txt file.
 
@@ -238,6 +472,23 @@ def _parse_args():
                     help=('The path to where the ffmpeg executable is located. '
                           'If omitted, it will be assumed to be present in the '
                           'PATH with the name ffmpeg[.exe].'))
+  parser.add_option('--decoder', type='choice', choices=['zxing', 'numpy'],
+                    default='zxing',
+                    help=('The barcode decoder to use. zxing converts every '
+                          'frame to PNG with ffmpeg and decodes it with zxing. '
+                          'numpy decodes the memory-mapped YUV file in-process '
+                          'without any temporary files. Default: %default'))
+  parser.add_option('--barcode_width', type='int',
+                    help=('Width of the barcode area in the upper left corner '
+                          'of the frames, used by the numpy decoder. '
+                          'Default: the frame width'))
+  parser.add_option('--barcode_height', type='int', default=32,
+                    help=('Height of the barcode area in the upper left corner '
+                          'of the frames, used by the numpy decoder. '
+                          'Default: %default'))
+  parser.add_option('--jobs', type='int', default=1,
+                    help=('The number of processes to decode the barcodes in. '
+                          'Default: %default'))
   parser.add_option('--yuv_frame_width', type='int', default=640,
                     help='Width of the YUV file\'s frames. Default: %default')
   parser.add_option('--yuv_frame_height', type='int', default=480,
@@ -253,6 +504,8 @@ def _parse_args():
                           'zxing.exe, you should keep the default value to '
                           'avoid problems. Default: %default'))
   options, _ = parser.parse_args()
+  if options.jobs < 1:
+    parser.error('--jobs must be at least 1!')
   return options
 
 
@@ -264,9 +517,23 @@ def _main():
   --yuv_file=<path_and_name_of_overlaid_yuv_video>
   --yuv_frame_width=640 --yuv_frame_height=480
   --stats_file=<path_and_name_to_stats_file>
+
+  Add --decoder=numpy to decode the barcodes in-process, without ffmpeg and
+  zxing.
   """
   options = _parse_args()
 
+  if options.decoder == 'numpy':
+    barcode_width = options.barcode_width or options.yuv_frame_width
+    if not decode_frames_in_process(options.yuv_file, options.yuv_frame_width,
+                                    options.yuv_frame_height, barcode_width,
+                                    options.barcode_height,
+                                    options.stats_file, jobs=options.jobs):
+      print 'An error occurred decoding barcodes from the YUV file.'
+      return -2
+    print 'Completed barcode decoding.'
+    return 0
+
   # Convert the overlaid YUV video into a set of PNG frames.
   if not convert_yuv_to_png_files(options.yuv_file, options.yuv_frame_width,
                                   options.yuv_frame_height,
@@ -277,7 +544,7 @@ def _main():
 
   # Decode the barcodes from the PNG frames.
   if not decode_frames(input_directory=options.png_working_dir,
-                       zxing_path=options.zxing_path):
+                       zxing_path=options.zxing_path, jobs=options.jobs):
     print 'An error occurred decoding barcodes from PNG frames.'
     return -2
 
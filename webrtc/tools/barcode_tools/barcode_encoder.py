@@ -11,11 +11,25 @@ import optparse
 import os
 import sys
 
+import numpy
+
 import helper_functions
+import yuv_io
 
 _DEFAULT_BARCODE_WIDTH = 352
 _DEFAULT_BARCODES_FILE = 'barcodes.yuv'
 
+# The luma and chroma values of the rendered barcodes. These are the values
+# ffmpeg produces when converting the black and white zxing barcodes to YUV.
+_BAR_LUMA = 16
+_SPACE_LUMA = 235
+_BARCODE_CHROMA = 128
+
+# The width in modules of the quiet zone on each side of a rendered barcode,
+# as zxing uses.
+_UPCA_QUIET_ZONE_MODULES = 9
+_UPCA_MODULES = 95
+
 
 def generate_upca_barcodes(number_of_barcodes, barcode_width, barcode_height,
                            output_directory='.',
@@ -130,7 +144,15 @@ def combine_yuv_frames_into_one_file(output_file_name, input_directory='.'):
   Return:
     (bool): True if the frame stitching went OK.
   """
-  output_file = open(output_file_name, "wb")
+  first_frame = os.path.join(input_directory,
+                             'barcode_' + helper_functions.zero_pad(0) + '.yuv')
+  if not os.path.isfile(first_frame):
+    open(output_file_name, 'wb').close()
+    return True
+
+  # All the frames have the same size, which is unknown to this function.
+  output_file = yuv_io.FrameWriter(output_file_name,
+                                   os.path.getsize(first_frame))
   success = helper_functions.perform_action_on_all_files(
       input_directory, 'barcode_', 'yuv', 0, _add_to_file_and_delete,
       output_file=output_file)
@@ -141,16 +163,13 @@ def _add_to_file_and_delete(output_file, file_name):
   """Adds the contents of a file to a previously opened file.
 
   Args:
-    output_file(file): The ouput file, previously opened.
+    output_file(yuv_io.FrameWriter): The ouput file, previously opened.
     file_name(string): The file name of the file to add to the output file.
 
   Return:
     (bool): True if successful, False otherwise.
   """
-  input_file = open(file_name, "rb")
-  input_file_contents = input_file.read()
-  output_file.write(input_file_contents)
-  input_file.close()
+  output_file.write_frames(numpy.fromfile(file_name, dtype=numpy.uint8))
   try:
     os.remove(file_name)
   except OSError as e:
@@ -159,46 +178,31 @@ def _add_to_file_and_delete(output_file, file_name):
   return True
 
 
-def _overlay_barcode_and_base_frames(barcodes_file, base_file, output_file,
-                                     barcodes_component_sizes,
-                                     base_component_sizes):
-  """Overlays the next YUV frame from a file with a barcode.
+def _overlay_barcode_and_base_frames(barcodes, base, output, start, stop):
+  """Overlays a range of YUV frames from a file with barcodes.
+
+  Every plane of a barcode frame replaces the upper left corner of the same
+  plane of the base frame with the same number. Base frames for which there
+  are no more barcode frames are copied unchanged.
 
   Args:
-    barcodes_file(FileObject): The YUV file containing the barcodes (opened).
-    base_file(FileObject): The base YUV file (opened).
-    output_file(FileObject): The output overlaid file (opened).
-    barcodes_component_sizes(list of tuples): The width and height of each Y, U
-      and V plane of the barcodes YUV file.
-    base_component_sizes(list of tuples): The width and height of each Y, U and
-      V plane of the base YUV file.
-  Return:
-    (bool): True if there are more planes (i.e. frames) in the base file, false
-      otherwise.
+    barcodes(yuv_io.I420Reader): The YUV file containing the barcodes.
+    base(yuv_io.I420Reader): The base YUV file.
+    output(yuv_io.I420Writer): The output overlaid file.
+    start(int): The number of the first frame to overlay.
+    stop(int): The number of the frame after the last frame to overlay, at
+      most output.frames_per_batch frames after start.
   """
+  output_frames = output.next_frames(stop - start)
+  output_frames[:] = base.frames(start, stop)
+  barcode_planes = barcodes.planes(start, stop)
   # We will loop three times - once for the Y, U and V planes
-  for ((barcode_comp_width, barcode_comp_height),
-      (base_comp_width, base_comp_height)) in zip(barcodes_component_sizes,
-                                                  base_component_sizes):
-    for base_row in range(base_comp_height):
-      barcode_plane_traversed = False
-      if (base_row < barcode_comp_height) and not barcode_plane_traversed:
-        barcode_plane = barcodes_file.read(barcode_comp_width)
-        if barcode_plane == "":
-          barcode_plane_traversed = True
-      else:
-        barcode_plane_traversed = True
-      base_plane = base_file.read(base_comp_width)
-
-      if base_plane == "":
-        return False
-
-      if not barcode_plane_traversed:
-        # Substitute part of the base component with the top component
-        output_file.write(barcode_plane)
-        base_plane = base_plane[barcode_comp_width:]
-      output_file.write(base_plane)
-  return True
+  for output_plane, barcode_plane in zip(
+      yuv_io.plane_views(output_frames, output.width, output.height),
+      barcode_planes):
+    frames, barcode_height, barcode_width = barcode_plane.shape
+    # Substitute part of the base component with the top component
+    output_plane[:frames, :barcode_height, :barcode_width] = barcode_plane
 
 
 def overlay_yuv_files(barcode_width, barcode_height, base_width, base_height,
@@ -216,28 +220,125 @@ def overlay_yuv_files(barcode_width, barcode_height, base_width, base_height,
     output_file_name(string): The name of the output file where the overlaid
       video will be written.
   """
-  # Component sizes = [Y_sizes, U_sizes, V_sizes]
-  barcodes_component_sizes = [(barcode_width, barcode_height),
-                              (barcode_width/2, barcode_height/2),
-                              (barcode_width/2, barcode_height/2)]
-  base_component_sizes = [(base_width, base_height),
-                          (base_width/2, base_height/2),
-                          (base_width/2, base_height/2)]
-
-  barcodes_file = open(barcodes_file_name, 'rb')
-  base_file = open(base_file_name, 'rb')
-  output_file = open(output_file_name, 'wb')
-
-  data_left = True
-  while data_left:
-    data_left = _overlay_barcode_and_base_frames(barcodes_file, base_file,
-                                                 output_file,
-                                                 barcodes_component_sizes,
-                                                 base_component_sizes)
-
-  barcodes_file.close()
-  base_file.close()
-  output_file.close()
+  barcodes = yuv_io.I420Reader(barcodes_file_name, barcode_width,
+                               barcode_height)
+  base = yuv_io.I420Reader(base_file_name, base_width, base_height)
+  output = yuv_io.I420Writer(output_file_name, base_width, base_height)
+
+  for start in range(0, len(base), output.frames_per_batch):
+    stop = min(start + output.frames_per_batch, len(base))
+    _overlay_barcode_and_base_frames(barcodes, base, output, start, stop)
+
+  barcodes.close()
+  base.close()
+  output.close()
+
+
+def overlay_barcodes_in_process(barcode_width, barcode_height, base_width,
+                                base_height, base_file_name, output_file_name):
+  """Overlays a base YUV file with UPC-A barcodes without external tools.
+
+  The barcode of every frame, which encodes the frame number, is rendered
+  directly into the upper left corner of the luma plane of the output frame,
+  so the whole overlay is done in one pass over the base file, without
+  generating intermediate PNG or YUV barcode files. The barcodes look like the
+  ones zxing generates and ffmpeg converts to YUV.
+
+  Args:
+    barcode_width(int): The width of the barcodes. It should be at least 113
+      pixels, to fit the 95 modules of the barcode and its quiet zones.
+    barcode_height(int): The height of the barcodes.
+    base_width(int): The width of a frame of the base file.
+    base_height(int): The height of a frame of the base file.
+    base_file_name(string): The name of the base YUV file.
+    output_file_name(string): The name of the output file where the overlaid
+      video will be written.
+  Return:
+    (bool): True if the overlay was successful.
+  """
+  module_width = barcode_width / (_UPCA_MODULES + 2 * _UPCA_QUIET_ZONE_MODULES)
+  if module_width < 1:
+    print >> sys.stderr, ('The barcode width must be at least %d pixels.' %
+                          (_UPCA_MODULES + 2 * _UPCA_QUIET_ZONE_MODULES))
+    return False
+
+  base = yuv_io.I420Reader(base_file_name, base_width, base_height)
+  output = yuv_io.I420Writer(output_file_name, base_width, base_height)
+  barcode_plane_sizes = yuv_io.i420_plane_sizes(barcode_width, barcode_height)
+
+  for start in range(0, len(base), output.frames_per_batch):
+    stop = min(start + output.frames_per_batch, len(base))
+    output_frames = output.next_frames(stop - start)
+    output_frames[:] = base.frames(start, stop)
+    y_plane, u_plane, v_plane = yuv_io.plane_views(output_frames, base_width,
+                                                   base_height)
+    # Every row of a barcode is the same, so render one row per frame.
+    y_plane[:, :barcode_height, :barcode_width] = _render_upca_barcode_rows(
+        range(start, stop), barcode_width, module_width)[:, numpy.newaxis, :]
+    chroma_width, chroma_height = barcode_plane_sizes[1]
+    u_plane[:, :chroma_height, :chroma_width] = _BARCODE_CHROMA
+    v_plane[:, :chroma_height, :chroma_width] = _BARCODE_CHROMA
+
+  base.close()
+  output.close()
+  return True
+
+
+def _render_upca_barcode_rows(frame_numbers, barcode_width, module_width):
+  """Renders one row of the UPC-A barcodes of several frames.
+
+  Args:
+    frame_numbers(list): The frame numbers to encode in the barcodes.
+    barcode_width(int): The width of the barcodes in pixels.
+    module_width(int): The width of one module (narrowest bar) in pixels.
+  Return:
+    (numpy.ndarray): An array of shape (frames, barcode_width) with the luma
+      values of the barcodes, centered between the quiet zones.
+  """
+  modules = _upca_modules(numpy.asarray(frame_numbers))
+  bars = numpy.repeat(modules, module_width, axis=1)
+  rows = numpy.empty((len(frame_numbers), barcode_width), dtype=numpy.uint8)
+  rows[:] = _SPACE_LUMA
+  left_padding = (barcode_width - bars.shape[1]) / 2
+  rows[:, left_padding:left_padding + bars.shape[1]] = numpy.where(
+      bars, _BAR_LUMA, _SPACE_LUMA)
+  return rows
+
+
+def _upca_modules(numbers):
+  """Encodes numbers as UPC-A barcodes.
+
+  The 11 content digits of every barcode are the zero padded number, followed
+  by the check digit.
+
+  Args:
+    numbers(numpy.ndarray): The numbers to encode.
+  Return:
+    (numpy.ndarray): A boolean array of shape (numbers, 95), which is True for
+      the modules of the barcodes which are bars.
+  """
+  digits = (numbers[:, numpy.newaxis] /
+            10 ** numpy.arange(10, -1, -1)) % 10
+  # Three times the sum of the odd digits (1st, 3rd, ...) plus the sum of the
+  # even digits, plus the check digit, is a multiple of 10.
+  checksum = 3 * digits[:, 0::2].sum(axis=1) + digits[:, 1::2].sum(axis=1)
+  check_digits = (10 - checksum % 10) % 10
+  digits = numpy.hstack((digits, check_digits[:, numpy.newaxis]))
+
+  # The modules of every digit in the left half, which start with a space.
+  # The digits in the right half are the same with bars and spaces swapped.
+  left_digit_modules = numpy.array(
+      [numpy.repeat([False, True, False, True], widths)
+       for widths in helper_functions.UPCA_DIGIT_WIDTHS])
+  guard = numpy.tile([True, False, True], (len(numbers), 1))
+  middle_guard = numpy.tile([False, True, False, True, False],
+                            (len(numbers), 1))
+  return numpy.hstack((
+      guard,
+      left_digit_modules[digits[:, :6]].reshape(len(numbers), -1),
+      middle_guard,
+      ~left_digit_modules[digits[:, 6:]].reshape(len(numbers), -1),
+      guard))
 
 
 def calculate_frames_number_from_yuv(yuv_width, yuv_height, file_name):
@@ -250,12 +351,10 @@ def calculate_frames_number_from_yuv(yuv_width, yuv_height, file_name):
   Return:
     (int): The number of frames in the YUV file.
   """
-  file_size = os.path.getsize(file_name)
-
-  y_plane_size = yuv_width * yuv_height
-  u_plane_size = (yuv_width/2) * (yuv_height/2)  # Equals to V plane size too
-  frame_size = y_plane_size + (2 * u_plane_size)
-  return int(file_size/frame_size)  # Should be int anyway
+  reader = yuv_io.I420Reader(file_name, yuv_width, yuv_height)
+  number_of_frames = len(reader)
+  reader.close()
+  return number_of_frames
 
 
 def _form_jars_string(path_to_zxing):
@@ -278,6 +377,13 @@ def _parse_args():
   usage = "usage: %prog [options]"
   parser = optparse.OptionParser(usage=usage)
 
+  parser.add_option('--encoder', type='choice', choices=['zxing', 'numpy'],
+                    default='zxing',
+                    help=('The barcode encoder to use. zxing generates the '
+                          'barcodes as PNG files with zxing and converts them '
+                          'to YUV with ffmpeg. numpy renders the barcodes '
+                          'directly into the output file in one pass, without '
+                          'any temporary files. Default: %default'))
   parser.add_option('--barcode_width', type='int',
                     default=_DEFAULT_BARCODE_WIDTH,
                     help=('Width of the barcodes to be overlaid on top of the'
@@ -328,12 +434,23 @@ def _main():
   --base_frame_width=352 --base_frame_height=288
   --base_yuv=<path_and_name_of_base_file>
   --output_yuv=<path and name_of_output_file>
+
+  Add --encoder=numpy to render the barcodes without zxing and ffmpeg.
   """
   options = _parse_args()
   # The barcodes with will be different than the base frame width only if
   # explicitly specified at the command line.
   if options.barcode_width == _DEFAULT_BARCODE_WIDTH:
     options.barcode_width = options.base_frame_width
+
+  if options.encoder == 'numpy':
+    if not overlay_barcodes_in_process(
+        options.barcode_width, options.barcode_height,
+        options.base_frame_width, options.base_frame_height, options.base_yuv,
+        options.output_yuv):
+      return -1
+    return 0
+
   # If the user provides a value for the barcodes YUV video file, we will keep
   # it. Otherwise we create a temp file which is removed after it has been used.
   keep_barcodes_yuv_file = False
@@ -7,12 +7,29 @@
 # in the file PATENTS.  All contributing project authors may
 # be found in the AUTHORS file in the root of the source tree.
 
+import multiprocessing
 import os
 import subprocess
 import sys
 
 _DEFAULT_PADDING = 4
 
+# The widths, in modules, of the four alternating spaces and bars encoding each
+# UPC-A digit. Digits in the left half start with a space and digits in the
+# right half start with a bar, but the widths are the same for both halves.
+UPCA_DIGIT_WIDTHS = [
+    (3, 2, 1, 1),  # 0
+    (2, 2, 2, 1),  # 1
+    (2, 1, 2, 2),  # 2
+    (1, 4, 1, 1),  # 3
+    (1, 1, 3, 2),  # 4
+    (1, 2, 3, 1),  # 5
+    (1, 1, 1, 4),  # 6
+    (1, 3, 1, 2),  # 7
+    (1, 2, 1, 3),  # 8
+    (3, 1, 1, 2),  # 9
+]
+
 
 class HelperError(Exception):
   """Exception raised for errors in the helper."""
@@ -94,3 +111,42 @@ def perform_action_on_all_files(directory, file_pattern, file_extension,
     else:
       file_exists = False
   return not errors
+
+
+def split_into_ranges(start, stop, number_of_ranges):
+  """Splits a range of numbers into consecutive ranges of (almost) equal size.
+
+  Args:
+    start(int): The first number of the range.
+    stop(int): The number after the last number of the range.
+    number_of_ranges(int): The maximum number of ranges to split into.
+
+  Return:
+    (list): A list of (start, stop) tuples covering the whole range in order.
+      No empty ranges are returned.
+  """
+  count = max(stop - start, 0)
+  number_of_ranges = max(min(number_of_ranges, count), 1)
+  boundaries = [start + count * i / number_of_ranges
+                for i in range(number_of_ranges + 1)]
+  return [(boundaries[i], boundaries[i + 1]) for i in range(number_of_ranges)
+          if boundaries[i] < boundaries[i + 1]]
+
+
+def map_in_process_pool(action, arguments, jobs):
+  """Performs an action on each argument in a pool of worker processes.
+
+  Args:
+    action(function): A module level function taking one argument.
+    arguments(list): The arguments to perform the action on.
+    jobs(int): The number of worker processes.
+
+  Return:
+    (list): The return values of the action, in the order of the arguments.
+  """
+  pool = multiprocessing.Pool(jobs)
+  try:
+    return pool.map(action, arguments)
+  finally:
+    pool.close()
+    pool.join()
@@ -11,37 +11,29 @@ import optparse
 import os
 import sys
 
+import yuv_io
 
-def _crop_one_frame(yuv_file, output_file, component_sizes):
-  """Crops one frame.
 
-  This function crops one frame going through all the YUV planes and cropping
-  respective amount of rows.
+def _crop_frames(reader, writer, start, stop):
+  """Crops a range of frames.
+
+  This function crops the frames going through all the YUV planes and cropping
+  respective amount of rows. The rows cropped from each plane are the ones the
+  plane of the writer is shorter by, so half as many rows are cropped from the
+  U and V planes as from the Y plane.
 
   Args:
-    yuv_file(file): The opened (for binary reading) YUV file.
-    output_file(file): The opened (for binary writing) file.
-    component_sizes(list of 3 3-ples): The list contains the sizes for all the
-      planes (Y, U, V) of the YUV file plus the crop_height scaled for every
-      plane. The sizes equal width, height and crop_height for the Y plane,
-      and are equal to width/2, height/2 and crop_height/2 for the U and V
-      planes.
-  Return:
-    (bool): True if there are more frames to crop, False otherwise.
+    reader(yuv_io.I420Reader): The YUV file.
+    writer(yuv_io.I420Writer): The output file.
+    start(int): The number of the first frame to crop.
+    stop(int): The number of the frame after the last frame to crop, at most
+      writer.frames_per_batch frames after start.
   """
-  for comp_width, comp_height, comp_crop_height in component_sizes:
-    for row in range(comp_height):
-      # Read the plane data for this row.
-      yuv_plane = yuv_file.read(comp_width)
-
-      # If the plane is empty, we have reached the end of the file.
-      if yuv_plane == "":
-        return False
-
-      # Only write the plane data for the rows bigger than crop_height.
-      if row >= comp_crop_height:
-        output_file.write(yuv_plane)
-  return True
+  for yuv_plane, output_plane in zip(reader.planes(start, stop),
+                                     writer.next_planes(stop - start)):
+    # Only keep the plane data for the rows bigger than the crop height.
+    comp_crop_height = yuv_plane.shape[1] - output_plane.shape[1]
+    output_plane[:] = yuv_plane[:, comp_crop_height:]
 
 
 def crop_frames(yuv_file_name, output_file_name, width, height, crop_height):
@@ -59,20 +51,15 @@ def crop_frames(yuv_file_name, output_file_name, width, height, crop_height):
     crop_height(int): The height (the number of pixel rows) to be cropped from
       the frames.
   """
-  # Component sizes = [Y_sizes, U_sizes, V_sizes].
-  component_sizes = [(width, height, crop_height),
-                     (width/2, height/2, crop_height/2),
-                     (width/2, height/2, crop_height/2)]
-
-  yuv_file = open(yuv_file_name, 'rb')
-  output_file = open(output_file_name, 'wb')
+  reader = yuv_io.I420Reader(yuv_file_name, width, height)
+  writer = yuv_io.I420Writer(output_file_name, width, height - crop_height)
 
-  data_left = True
-  while data_left:
-    data_left = _crop_one_frame(yuv_file, output_file, component_sizes)
+  for start in range(0, len(reader), writer.frames_per_batch):
+    stop = min(start + writer.frames_per_batch, len(reader))
+    _crop_frames(reader, writer, start, stop)
 
-  yuv_file.close()
-  output_file.close()
+  reader.close()
+  writer.close()
 
 
 def _parse_args():
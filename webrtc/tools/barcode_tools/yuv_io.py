@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Reading and writing of I420 YUV files shared by the barcode tools.
+
+Frames are represented as NumPy arrays of shape (frames, frame_size), where
+frame_size is the size in bytes of one I420 frame. plane_views() splits such an
+array into Y, U and V arrays of shape (frames, plane_height, plane_width)
+without copying, so whole planes or rectangles of many frames can be read and
+written with a single slice assignment.
+"""
+
+import os
+
+import numpy
+
+# The size of the batches written by FrameWriter, in bytes.
+_BATCH_SIZE = 16 * 1024 * 1024
+
+
+def i420_plane_sizes(width, height):
+  """Calculates the sizes of the planes of an I420 frame.
+
+  Args:
+    width(int): The width of the frame.
+    height(int): The height of the frame.
+  Return:
+    (list of tuples): The width and height of the Y, U and V planes. The
+      chroma planes are width/2 by height/2, as the barcode tools have always
+      read and written them.
+  """
+  half_width = width / 2
+  half_height = height / 2
+  return [(width, height), (half_width, half_height),
+          (half_width, half_height)]
+
+
+def i420_frame_size(width, height):
+  """Calculates the size in bytes of an I420 frame.
+
+  Args:
+    width(int): The width of the frame.
+    height(int): The height of the frame.
+  Return:
+    (int): The size of the frame.
+  """
+  return sum(plane_width * plane_height for plane_width, plane_height
+             in i420_plane_sizes(width, height))
+
+
+def plane_views(frames, width, height):
+  """Splits I420 frames into views of their Y, U and V planes.
+
+  Args:
+    frames(numpy.ndarray): An array of shape (frames, frame_size).
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+  Return:
+    (list of numpy.ndarray): The Y, U and V planes of all the frames, as views
+      of shape (frames, plane_height, plane_width) sharing memory with frames.
+  """
+  planes = []
+  offset = 0
+  for plane_width, plane_height in i420_plane_sizes(width, height):
+    plane_size = plane_width * plane_height
+    plane = frames[:, offset:offset + plane_size]
+    planes.append(plane.reshape(len(frames), plane_height, plane_width))
+    offset += plane_size
+  return planes
+
+
+class I420Reader(object):
+  """Random-access reader of a memory-mapped I420 file.
+
+  Frames are only read from disk when the views returned by the reader are
+  accessed. A trailing incomplete frame is ignored.
+  """
+
+  def __init__(self, file_name, width, height):
+    self.width = width
+    self.height = height
+    self.frame_size = i420_frame_size(width, height)
+    self.number_of_frames = os.path.getsize(file_name) / self.frame_size
+    if self.number_of_frames:
+      self._frames = numpy.memmap(file_name, dtype=numpy.uint8, mode='r',
+                                  shape=(self.number_of_frames,
+                                         self.frame_size))
+    else:
+      # Empty files cannot be memory-mapped.
+      self._frames = numpy.zeros((0, self.frame_size), dtype=numpy.uint8)
+
+  def __len__(self):
+    return self.number_of_frames
+
+  def frames(self, start=0, stop=None):
+    """Returns a read-only view of a range of frames.
+
+    Args:
+      start(int): The number of the first frame, starting from 0.
+      stop(int): The number of the frame after the last one. Defaults to the
+        end of the file.
+    Return:
+      (numpy.ndarray): An array of shape (frames, frame_size).
+    """
+    return self._frames[start:stop]
+
+  def planes(self, start=0, stop=None):
+    """Returns read-only views of the Y, U and V planes of a range of frames.
+
+    Args:
+      start(int): The number of the first frame, starting from 0.
+      stop(int): The number of the frame after the last one. Defaults to the
+        end of the file.
+    Return:
+      (list of numpy.ndarray): The Y, U and V planes, of shape
+        (frames, plane_height, plane_width).
+    """
+    return plane_views(self.frames(start, stop), self.width, self.height)
+
+  def close(self):
+    """Releases the memory mapping; views returned before stay valid."""
+    self._frames = None
+
+
+class FrameWriter(object):
+  """Buffered writer appending frames of a fixed size to a file.
+
+  Frames are collected in a preallocated buffer which is written to the file
+  in one call when it is full, when flush() is called or when the writer is
+  closed.
+  """
+
+  def __init__(self, file_name, frame_size, frames_per_batch=None):
+    self.frame_size = frame_size
+    if not frames_per_batch:
+      frames_per_batch = max(_BATCH_SIZE / frame_size, 1)
+    self.frames_per_batch = frames_per_batch
+    self._buffer = numpy.empty((frames_per_batch, frame_size),
+                               dtype=numpy.uint8)
+    self._buffered_frames = 0
+    self._file = open(file_name, 'wb')
+
+  def next_frames(self, count):
+    """Reserves space for the next frames in the buffer.
+
+    Args:
+      count(int): The number of frames, at most frames_per_batch.
+    Return:
+      (numpy.ndarray): A writable array of shape (count, frame_size). Its
+        contents are undefined and have to be filled in by the caller before
+        the next call to the writer.
+    """
+    assert count <= self.frames_per_batch
+    if self._buffered_frames + count > self.frames_per_batch:
+      self.flush()
+    start = self._buffered_frames
+    self._buffered_frames += count
+    return self._buffer[start:self._buffered_frames]
+
+  def write_frames(self, frames):
+    """Appends frames to the file.
+
+    Args:
+      frames(numpy.ndarray): An array of uint8, whose size is a multiple of
+        frame_size.
+    """
+    frames = frames.reshape(-1, self.frame_size)
+    if len(frames) >= self.frames_per_batch:
+      # Too large to be worth buffering.
+      self.flush()
+      frames.tofile(self._file)
+    else:
+      self.next_frames(len(frames))[:] = frames
+
+  def flush(self):
+    """Writes the buffered frames to the file."""
+    self._buffer[:self._buffered_frames].tofile(self._file)
+    self._buffered_frames = 0
+    self._file.flush()
+
+  def close(self):
+    """Writes the buffered frames and closes the file."""
+    self.flush()
+    self._file.close()
+
+
+class I420Writer(FrameWriter):
+  """Buffered writer appending I420 frames to a file."""
+
+  def __init__(self, file_name, width, height, frames_per_batch=None):
+    FrameWriter.__init__(self, file_name, i420_frame_size(width, height),
+                         frames_per_batch=frames_per_batch)
+    self.width = width
+    self.height = height
+
+  def next_planes(self, count):
+    """Reserves space for the next frames and returns views of their planes.
+
+    Args:
+      count(int): The number of frames, at most frames_per_batch.
+    Return:
+      (list of numpy.ndarray): Writable Y, U and V planes of shape
+        (count, plane_height, plane_width), see next_frames().
+    """
+    return plane_views(self.next_frames(count), self.width, self.height)
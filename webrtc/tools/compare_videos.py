@@ -34,8 +34,17 @@ def _ParseArgs():
   parser.add_option('--test_video', type='string',
                     help=('Test video to be compared with the reference '
                           'video (YUV).'))
+  parser.add_option('--analyzer', type='choice', choices=['native', 'numpy'],
+                    default='native',
+                    help=('The frame analyzer to use. native runs the '
+                          '--frame_analyzer executable. numpy runs the in-tree '
+                          'frame_analyzer/frame_analyzer.py script, which needs '
+                          'no native build. Default: %default'))
   parser.add_option('--frame_analyzer', type='string',
-                    help='Path to the frame analyzer executable.')
+                    help=('Path to the frame analyzer executable, or script '
+                          'if --analyzer=numpy. By default, the numpy analyzer '
+                          'is assumed to be in frame_analyzer/ relative to this '
+                          'directory.'))
   parser.add_option('--barcode_decoder', type='string',
                     help=('Path to the barcode decoder script. By default, we '
                           'will assume we can find it in barcode_tools/'
@@ -48,6 +57,15 @@ def _ParseArgs():
                     help=('The path to where the zxing executable is located. '
                           'If omitted, it will be assumed to be present in the '
                           'PATH with the name zxing[.exe].'))
+  parser.add_option('--decoder', type='choice', choices=['zxing', 'numpy'],
+                    default='zxing',
+                    help=('The barcode decoder to use, see barcode_decoder.py. '
+                          'Default: %default'))
+  parser.add_option('--jobs', type='int', default=1,
+                    help=('The number of processes to decode ranges of frames '
+                          'of the test video in, and to compare frames in with '
+                          'the numpy analyzer. The results are the same as '
+                          'when running serially. Default: %default'))
   parser.add_option('--stats_file', type='string', default='stats.txt',
                     help=('Path to the temporary stats file to be created and '
                           'used. Default: %default'))
@@ -67,6 +85,12 @@ def _ParseArgs():
   if not os.path.exists(options.test_video):
     parser.error('Cannot find the test video at %s' % options.test_video)
 
+  if options.jobs < 1:
+    parser.error('--jobs must be at least 1!')
+
+  if options.analyzer == 'numpy' and not options.frame_analyzer:
+    options.frame_analyzer = os.path.join(SCRIPT_DIR, 'frame_analyzer',
+                                          'frame_analyzer.py')
   if not options.frame_analyzer:
     parser.error('You must provide the path to the frame analyzer executable!')
   if not os.path.exists(options.frame_analyzer):
@@ -84,6 +108,9 @@ def main():
   --test_video=<path_and_name_of_test_video>
   --frame_analyzer=<path_and_name_of_the_frame_analyzer_executable>
 
+  Pass --analyzer=numpy instead of --frame_analyzer to compare the videos with
+  the in-tree NumPy frame analyzer, which needs no native build.
+
   Notice that the prerequisites for barcode_decoder.py also applies to this
   script. The means the following executables have to be available in the PATH:
   * zxing
@@ -111,6 +138,8 @@ def main():
     '--yuv_frame_height=%d' % options.yuv_frame_height,
     '--stats_file=%s' % options.stats_file,
     '--png_working_dir=%s' % png_working_directory,
+    '--decoder=%s' % options.decoder,
+    '--jobs=%d' % options.jobs,
   ]
   if options.zxing_path:
     cmd.append('--zxing_path=%s' % options.zxing_path)
@@ -135,6 +164,8 @@ def main():
     '--width=%d' % options.yuv_frame_width,
     '--height=%d' % options.yuv_frame_height,
   ]
+  if options.analyzer == 'numpy':
+    cmd = [sys.executable] + cmd + ['--jobs=%d' % options.jobs]
   frame_analyzer = subprocess.Popen(cmd, stdin=null_filehandle,
                                     stdout=sys.stdout, stderr=sys.stderr)
   frame_analyzer.wait()
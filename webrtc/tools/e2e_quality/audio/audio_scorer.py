@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""Scores a recorded s16le PCM file against its reference.
+
+The delay of the recording is found by FFT cross-correlation of the start of
+both files. The aligned files are then compared in windows, and for each
+window the SNR of the recording, the levels of both files and whether the
+window is a dropout are computed. The files are memory-mapped and processed in
+chunks of windows, so long recordings are scored in bounded memory.
+"""
+
+import math
+import optparse
+import os
+import sys
+
+import numpy
+
+# Full scale of s16le samples.
+_FULL_SCALE = 32768.0
+
+# Levels reported for digital silence.
+_MIN_LEVEL_DBFS = -120.0
+
+# Reference windows above this level are active speech, which is scored.
+_ACTIVE_LEVEL_DBFS = -50.0
+
+# Active windows whose recording is below this level are dropouts.
+_DROPOUT_LEVEL_DBFS = -60.0
+
+# The number of windows scored at once.
+_WINDOWS_PER_CHUNK = 1024
+
+
+def read_pcm(file_name, channels):
+  """Memory-maps an s16le PCM file.
+
+  Args:
+    file_name(string): The name of the file.
+    channels(int): The number of interleaved channels.
+  Return:
+    (numpy.ndarray): An array of shape (samples, channels). A trailing
+      incomplete sample is ignored.
+  """
+  if not os.path.getsize(file_name):
+    # Empty files cannot be memory-mapped.
+    return numpy.zeros((0, channels), dtype='<i2')
+  samples = numpy.memmap(file_name, dtype='<i2', mode='r')
+  samples = samples[:len(samples) / channels * channels]
+  return samples.reshape(-1, channels)
+
+
+def _mono(samples):
+  """Converts a range of samples to a mono float64 array."""
+  return samples.mean(axis=1, dtype=numpy.float64)
+
+
+def find_delay(reference, output, max_delay, analysis_length):
+  """Finds the delay of the output with respect to the reference.
+
+  The delay is the position of the maximum of the normalized cross-correlation
+  between the first analysis_length samples of the reference and the output.
+
+  Args:
+    reference(numpy.ndarray): The reference samples, see read_pcm().
+    output(numpy.ndarray): The output samples, see read_pcm().
+    max_delay(int): The largest delay to search for, in samples.
+    analysis_length(int): The number of reference samples to correlate.
+  Return:
+    (int): The delay in samples, between 0 and max_delay.
+  """
+  ref = _mono(reference[:analysis_length])
+  out = _mono(output[:len(ref) + max_delay])
+  if not len(ref) or len(out) < len(ref):
+    return 0
+  fft_size = 1 << int(math.ceil(math.log(len(out) + len(ref), 2)))
+  correlation = numpy.fft.irfft(
+      numpy.conj(numpy.fft.rfft(ref, fft_size)) * numpy.fft.rfft(out, fft_size),
+      fft_size)[:len(out) - len(ref) + 1]
+  # Normalize by the energy of the output under the reference at each delay,
+  # so loud passages do not attract the maximum.
+  energy = numpy.concatenate(([0.0], numpy.cumsum(out ** 2)))
+  window_energy = energy[len(ref):] - energy[:-len(ref)]
+  norm = numpy.sqrt(numpy.maximum(window_energy, 1e-9) * (ref ** 2).sum())
+  return int(numpy.argmax(correlation / numpy.maximum(norm, 1e-9)))
+
+
+def _level_dbfs(energy):
+  """Converts mean squared sample values to levels in dBFS."""
+  with numpy.errstate(divide='ignore'):
+    level = 10 * numpy.log10(energy / _FULL_SCALE ** 2)
+  return numpy.maximum(level, _MIN_LEVEL_DBFS)
+
+
+def score_windows(reference, output, delay, window_size):
+  """Scores the aligned reference and output in windows.
+
+  Args:
+    reference(numpy.ndarray): The reference samples, see read_pcm().
+    output(numpy.ndarray): The output samples, see read_pcm().
+    delay(int): The delay of the output, see find_delay().
+    window_size(int): The number of samples per window.
+  Return:
+    (generator of dicts): Per chunk of windows, numpy arrays with the start
+      time in samples ('start'), the SNR in dB ('snr_db'), the reference and
+      output levels in dBFS ('reference_dbfs', 'output_dbfs'), and whether
+      the window is active ('active') and a dropout ('dropout').
+  """
+  windows = min(len(reference), len(output) - delay) / window_size
+  for first in xrange(0, max(windows, 0), _WINDOWS_PER_CHUNK):
+    last = min(first + _WINDOWS_PER_CHUNK, windows)
+    start, stop = first * window_size, last * window_size
+    ref = _mono(reference[start:stop]).reshape(-1, window_size)
+    out = _mono(output[start + delay:stop + delay]).reshape(-1, window_size)
+    reference_energy = (ref ** 2).mean(axis=1)
+    output_energy = (out ** 2).mean(axis=1)
+    noise_energy = ((out - ref) ** 2).mean(axis=1)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+      snr_db = 10 * numpy.log10(reference_energy / noise_energy)
+    reference_dbfs = _level_dbfs(reference_energy)
+    output_dbfs = _level_dbfs(output_energy)
+    active = reference_dbfs > _ACTIVE_LEVEL_DBFS
+    yield {
+        'start': numpy.arange(first, last) * window_size,
+        'snr_db': snr_db,
+        'reference_dbfs': reference_dbfs,
+        'output_dbfs': output_dbfs,
+        'active': active,
+        'dropout': active & (output_dbfs < _DROPOUT_LEVEL_DBFS),
+    }
+
+
+def score_files(reference_file_name, output_file_name, rate, channels,
+                window_ms=20, max_delay_ms=10000, analysis_ms=10000,
+                window_stats_file=None):
+  """Aligns and scores a recording against its reference.
+
+  Args:
+    reference_file_name(string): The s16le reference file.
+    output_file_name(string): The s16le recorded file.
+    rate(int): The sample rate in Hz.
+    channels(int): The number of channels.
+    window_ms(int): The length of the scored windows.
+    max_delay_ms(int): The largest delay of the recording to search for.
+    analysis_ms(int): The length of the reference used to find the delay.
+    window_stats_file(file): If set, one line per window with the start time
+      in seconds, the SNR, the reference and output levels and the dropout
+      flag is written to it.
+  Return:
+    (dict): The delay in ms, the number of windows and of active windows, the
+      mean and minimum SNR in dB and the mean reference and output levels in
+      dBFS over the active windows, and the number of dropout windows.
+  """
+  reference = read_pcm(reference_file_name, channels)
+  output = read_pcm(output_file_name, channels)
+  delay = find_delay(reference, output, rate * max_delay_ms / 1000,
+                     rate * analysis_ms / 1000)
+  window_size = rate * window_ms / 1000
+
+  windows = active_windows = dropouts = snr_windows = 0
+  snr_sum = reference_level_sum = output_level_sum = 0.0
+  min_snr = float('inf')
+  for chunk in score_windows(reference, output, delay, window_size):
+    active = chunk['active']
+    windows += len(active)
+    active_windows += active.sum()
+    dropouts += chunk['dropout'].sum()
+    # Windows where the output equals the reference have an infinite SNR.
+    snr = chunk['snr_db'][active & numpy.isfinite(chunk['snr_db'])]
+    snr_sum += snr.sum()
+    snr_windows += len(snr)
+    if len(snr):
+      min_snr = min(min_snr, snr.min())
+    reference_level_sum += chunk['reference_dbfs'][active].sum()
+    output_level_sum += chunk['output_dbfs'][active].sum()
+    if window_stats_file:
+      numpy.savetxt(window_stats_file, numpy.column_stack((
+          chunk['start'] / float(rate), chunk['snr_db'],
+          chunk['reference_dbfs'], chunk['output_dbfs'], chunk['dropout'])),
+                    fmt=['%.3f', '%.2f', '%.2f', '%.2f', '%d'])
+
+  scored_windows = max(active_windows, 1)
+  return {
+      'delay_ms': delay * 1000.0 / rate,
+      'windows': windows,
+      'active_windows': int(active_windows),
+      'mean_snr_db': snr_sum / max(snr_windows, 1),
+      'min_snr_db': min_snr if snr_windows else 0.0,
+      'reference_level_dbfs': reference_level_sum / scored_windows,
+      'output_level_dbfs': output_level_sum / scored_windows,
+      'dropouts': int(dropouts),
+  }
+
+
+def main(argv):
+  parser = optparse.OptionParser()
+  usage = 'Usage: %prog [options] reference.pcm output.pcm'
+  parser.set_usage(usage)
+  parser.add_option('--rate', type='int', default=16000,
+                    help='sample rate in Hz')
+  parser.add_option('--channels', type='int', default=1,
+                    help='number of channels')
+  parser.add_option('--window_ms', type='int', default=20,
+                    help='length of the scored windows in ms')
+  parser.add_option('--max_delay_ms', type='int', default=10000,
+                    help='largest delay of the output to search for')
+  parser.add_option('--window_stats',
+                    help='file to write the per-window stats to')
+  options, args = parser.parse_args(argv[1:])
+  if len(args) != 2:
+    parser.error('Expected a reference and an output file.')
+
+  window_stats_file = open(options.window_stats, 'w') if (
+      options.window_stats) else None
+  try:
+    score = score_files(args[0], args[1], options.rate, options.channels,
+                        window_ms=options.window_ms,
+                        max_delay_ms=options.max_delay_ms,
+                        window_stats_file=window_stats_file)
+  finally:
+    if window_stats_file:
+      window_stats_file.close()
+  for key in sorted(score):
+    print '%s: %s' % (key, score[key])
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main(sys.argv))
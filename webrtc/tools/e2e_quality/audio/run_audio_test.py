@@ -14,7 +14,8 @@ Expects the presence of PulseAudio virtual devices (null sinks). These are
 configured as default devices for a VoiceEngine audio call. A PulseAudio
 utility (pacat) is used to play to and record from the virtual devices.
 
-The input reference file is then compared to the output file.
+The output file is then aligned to and scored against the input reference
+file by audio_scorer.py, and optionally compared by an external tool.
 """
 
 import optparse
@@ -25,6 +26,7 @@ import subprocess
 import sys
 import time
 
+import audio_scorer
 import perf.perf_utils
 
 def main(argv):
@@ -44,6 +46,14 @@ def main(argv):
       default=os.path.abspath(os.path.dirname(sys.argv[0]) +
           '/../../../out/Debug/audio_e2e_harness'),
       help='path to audio harness executable')
+  parser.add_option('--window_ms', type='int', default=20,
+                    help='length of the windows scored by audio_scorer.py')
+  parser.add_option('--max_delay_ms', type='int', default=10000,
+                    help='largest delay of the output to search for')
+  parser.add_option('--window_stats',
+                    help='file to write the per-window scores to')
+  parser.add_option('--chart_json',
+                    help='file to write the scores to in Chart JSON format')
   parser.add_option('--compare',
                     help='command-line arguments for comparison tool')
   parser.add_option('--regexp',
@@ -77,24 +87,25 @@ def main(argv):
   print ' '.join(command)
   voe_proc = subprocess.Popen(command)
 
-  # If recording starts before there is data available, pacat sometimes
-  # inexplicably adds a large delay to the start of the file. We wait here in
-  # an attempt to prevent that, because VoE often takes some time to startup a
-  # call.
-  time.sleep(5)
-
+  # The recording is started first. Its delay with respect to the input,
+  # including any delay added by pacat, is found and removed when scoring.
   format_args = ['--format=s16le', '--rate=' + options.rate,
       '--channels=' + options.channels, '--raw']
-  command = (['pacat', '-p', '-d', options.play_sink] + format_args +
-      [options.input])
-  print ' '.join(command)
-  play_proc = subprocess.Popen(command)
-
   command = (['pacat', '-r', '-d', options.rec_sink + '.monitor'] +
       format_args + [options.output])
   print ' '.join(command)
   record_proc = subprocess.Popen(command)
 
+  # VoE often takes some time to start up a call. Audio played before the call
+  # is up never reaches the output, and would be scored as dropouts, so the
+  # playback waits for it.
+  time.sleep(5)
+
+  command = (['pacat', '-p', '-d', options.play_sink] + format_args +
+      [options.input])
+  print ' '.join(command)
+  play_proc = subprocess.Popen(command)
+
   retcode = play_proc.wait()
   # If these ended early, an exception will be thrown here.
   record_proc.kill()
@@ -109,6 +120,30 @@ def main(argv):
   if retcode != 0:
     return retcode
 
+  window_stats_file = open(options.window_stats, 'w') if (
+      options.window_stats) else None
+  try:
+    score = audio_scorer.score_files(options.input, options.output,
+                                     int(options.rate), int(options.channels),
+                                     window_ms=options.window_ms,
+                                     max_delay_ms=options.max_delay_ms,
+                                     window_stats_file=window_stats_file)
+  finally:
+    if window_stats_file:
+      window_stats_file.close()
+  with perf.perf_utils.PerfResultsRecorder(
+      'audio_e2e', options.chart_json) as results:
+    results.AddResult('audio_e2e_delay', 'delay', score['delay_ms'], 'ms')
+    results.AddResult('audio_e2e_snr', 'mean_snr', score['mean_snr_db'], 'dB')
+    results.AddResult('audio_e2e_snr', 'min_snr', score['min_snr_db'], 'dB')
+    results.AddResult('audio_e2e_level', 'output_level',
+                      score['output_level_dbfs'], 'dBFS')
+    results.AddResult('audio_e2e_level', 'level_difference',
+                      score['output_level_dbfs'] -
+                      score['reference_level_dbfs'], 'dB')
+    results.AddResult('audio_e2e_dropouts', 'dropouts', score['dropouts'],
+                      'windows')
+
   if options.compare and options.regexp:
     command = shlex.split(options.compare) + [options.input, options.output]
     print ' '.join(command)
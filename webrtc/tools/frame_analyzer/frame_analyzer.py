@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 The WebRTC project authors. All Rights Reserved.
+#
+# Use of this source code is governed by a BSD-style license
+# that can be found in the LICENSE file in the root of the source
+# tree. An additional intellectual property rights grant can be found
+# in the file PATENTS.  All contributing project authors may
+# be found in the AUTHORS file in the root of the source tree.
+
+"""A NumPy implementation of the frame_analyzer tool.
+
+Computes the PSNR and SSIM of the frames of a test video against the frames of
+the reference video they were decoded from, as listed in a stats file produced
+by barcode_decoder.py. The results are the ones libyuv computes for the native
+frame_analyzer and are printed in the same format:
+RESULT <metric>:<label>= <values>
+
+Both YUV files are memory-mapped and the frames are compared in batches, which
+can be spread over several processes with --jobs.
+"""
+
+import optparse
+import os
+import sys
+
+import numpy
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, os.pardir, 'barcode_tools'))
+
+import helper_functions
+import yuv_io
+
+# The maximum PSNR, which is used for equal frames. libyuv limits the PSNR to
+# 128, but that skews the results significantly, so we restrict it to 48.
+_MAX_PSNR = 48.0
+
+# The constants of the SSIM formula, scaled by the number of pixels in an 8x8
+# window as libyuv does: 64^2 * (0.01 * 255)^2 and 64^2 * (0.03 * 255)^2.
+_SSIM_C1 = 26634
+_SSIM_C2 = 239708
+_SSIM_WINDOW_PIXELS = 64
+
+# The size of the reference and test frames compared in one batch, in bytes.
+# SSIM needs several 32-bit copies of the frames while being computed.
+_BATCH_SIZE = 8 * 1024 * 1024
+
+
+def parse_stats_file(stats_file_name):
+  """Reads the frames to compare from a stats file.
+
+  The stats file lines are in the format frame_xxxx yyyy, where xxxx is the
+  frame number in the test video and yyyy the decoded frame number in the
+  reference video. Frames with barcode errors and repeated frames are skipped.
+
+  Args:
+    stats_file_name(string): The name of the stats file.
+  Return:
+    (list of tuples): The test and reference frame numbers of every frame to
+      compare.
+  """
+  frame_pairs = []
+  previous_frame_number = -1
+  for line in _read_stats_lines(stats_file_name):
+    test_frame_number = _extract_frame_sequence_number(line)
+    decoded_frame_number = _extract_decoded_frame_number(line)
+    # If there was problem decoding the barcode in this frame or the frame has
+    # been duplicated, continue.
+    if ('Barcode error' in line or
+        decoded_frame_number == previous_frame_number):
+      continue
+    frame_pairs.append((test_frame_number, decoded_frame_number))
+    previous_frame_number = decoded_frame_number
+  return frame_pairs
+
+
+def calculate_max_repeated_and_skipped_frames(stats_file_name):
+  """Calculates the longest runs of repeated and skipped frames.
+
+  Args:
+    stats_file_name(string): The name of the stats file.
+  Return:
+    (tuple): The maximum number of repeated frames and of skipped frames.
+  """
+  repeated_frames = 1
+  max_repeated_frames = 1
+  max_skipped_frames = 1
+  previous_frame_number = -1
+  for line in _read_stats_lines(stats_file_name):
+    decoded_frame_number = _extract_decoded_frame_number(line)
+    if decoded_frame_number == -1:
+      continue
+
+    # Calculate how many frames a cluster of repeated frames contains.
+    if decoded_frame_number == previous_frame_number:
+      repeated_frames += 1
+      max_repeated_frames = max(max_repeated_frames, repeated_frames)
+    else:
+      repeated_frames = 1
+
+    # Calculate how many frames have been skipped.
+    if decoded_frame_number != 0 and previous_frame_number != -1:
+      skipped_frames = decoded_frame_number - previous_frame_number - 1
+      max_skipped_frames = max(max_skipped_frames, skipped_frames)
+    previous_frame_number = decoded_frame_number
+  return max_repeated_frames, max_skipped_frames
+
+
+def analyze_frames(reference_file_name, test_file_name, width, height,
+                   frame_pairs, jobs=1):
+  """Calculates the PSNR and SSIM of test frames against reference frames.
+
+  Args:
+    reference_file_name(string): The name of the reference YUV file.
+    test_file_name(string): The name of the test YUV file.
+    width(int): The width of the frames of both files.
+    height(int): The height of the frames of both files.
+    frame_pairs(list of tuples): The test and reference frame numbers of every
+      frame to compare, see parse_stats_file().
+    jobs(int): The number of processes to compare batches of frames in.
+  Return:
+    (tuple): Two lists with the PSNR and SSIM of every compared frame.
+  """
+  frames_per_batch = max(
+      _BATCH_SIZE / (2 * yuv_io.i420_frame_size(width, height)), 1)
+  batches = [(reference_file_name, test_file_name, width, height,
+              frame_pairs[start:start + frames_per_batch])
+             for start in range(0, len(frame_pairs), frames_per_batch)]
+  if jobs > 1:
+    results = helper_functions.map_in_process_pool(_analyze_batch, batches,
+                                                   jobs)
+  else:
+    results = [_analyze_batch(batch) for batch in batches]
+
+  psnr_values = []
+  ssim_values = []
+  for batch_psnr_values, batch_ssim_values in results:
+    psnr_values.extend(batch_psnr_values)
+    ssim_values.extend(batch_ssim_values)
+  return psnr_values, ssim_values
+
+
+def _analyze_batch(batch):
+  """Calculates the PSNR and SSIM of a batch of frames.
+
+  Args:
+    batch(tuple): The arguments of analyze_frames() identifying the YUV files,
+      and the frame pairs to compare.
+  Return:
+    (tuple): Two lists with the PSNR and SSIM of every frame of the batch.
+  """
+  reference_file_name, test_file_name, width, height, frame_pairs = batch
+  reference = yuv_io.I420Reader(reference_file_name, width, height)
+  test = yuv_io.I420Reader(test_file_name, width, height)
+
+  frame_pairs = [(test_frame_number, reference_frame_number)
+                 for test_frame_number, reference_frame_number in frame_pairs
+                 if _check_frame_number(test, test_frame_number,
+                                        test_file_name) and
+                 _check_frame_number(reference, reference_frame_number,
+                                     reference_file_name)]
+  if not frame_pairs:
+    return [], []
+  test_frame_numbers, reference_frame_numbers = zip(*frame_pairs)
+  # Indexing with lists copies only the frames to compare out of the files.
+  reference_frames = reference.frames()[list(reference_frame_numbers)]
+  test_frames = test.frames()[list(test_frame_numbers)]
+  reference.close()
+  test.close()
+
+  psnr_values = calculate_psnr(reference_frames, test_frames)
+  ssim_values = calculate_ssim(reference_frames, test_frames, width, height)
+  return psnr_values.tolist(), ssim_values.tolist()
+
+
+def _check_frame_number(reader, frame_number, file_name):
+  """Checks that a frame exists in a YUV file, printing an error if not."""
+  if 0 <= frame_number < len(reader):
+    return True
+  print 'Error while reading frame no %d from file %s' % (frame_number,
+                                                          file_name)
+  return False
+
+
+def calculate_psnr(reference_frames, test_frames):
+  """Calculates the PSNR of I420 frames over all the three planes.
+
+  Args:
+    reference_frames(numpy.ndarray): The reference frames, of shape
+      (frames, frame_size).
+    test_frames(numpy.ndarray): The test frames, of the same shape.
+  Return:
+    (numpy.ndarray): The PSNR of every frame, at most _MAX_PSNR.
+  """
+  differences = (reference_frames.astype(numpy.int32) -
+                 test_frames.astype(numpy.int32))
+  sse = (differences * differences).sum(axis=1, dtype=numpy.int64)
+  samples = reference_frames.shape[1]
+  with numpy.errstate(divide='ignore'):
+    psnr = 10.0 * numpy.log10(255.0 * 255.0 * samples / sse)
+  return numpy.minimum(psnr, _MAX_PSNR)
+
+
+def calculate_ssim(reference_frames, test_frames, width, height):
+  """Calculates the SSIM of I420 frames the way libyuv does.
+
+  The SSIM of the Y plane is weighted 0.8 and the SSIM of the U and V planes
+  0.1 each.
+
+  Args:
+    reference_frames(numpy.ndarray): The reference frames, of shape
+      (frames, frame_size).
+    test_frames(numpy.ndarray): The test frames, of the same shape.
+    width(int): The width of the frames.
+    height(int): The height of the frames.
+  Return:
+    (numpy.ndarray): The SSIM of every frame.
+  """
+  y_ssim, u_ssim, v_ssim = [
+      _calculate_plane_ssim(reference_plane, test_plane)
+      for reference_plane, test_plane in zip(
+          yuv_io.plane_views(reference_frames, width, height),
+          yuv_io.plane_views(test_frames, width, height))]
+  return y_ssim * 0.8 + 0.1 * (u_ssim + v_ssim)
+
+
+def _calculate_plane_ssim(reference_plane, test_plane):
+  """Calculates the SSIM of a plane of several frames.
+
+  The SSIM is averaged over 8x8 windows starting on every 4x4 pixel grid
+  location, so that the windows overlap block boundaries to penalize blocking
+  artifacts. The sums over the windows are calculated from sums over 4x4
+  blocks, as every window covers exactly 2x2 blocks.
+
+  Args:
+    reference_plane(numpy.ndarray): The reference planes, of shape
+      (frames, plane_height, plane_width).
+    test_plane(numpy.ndarray): The test planes, of the same shape.
+  Return:
+    (numpy.ndarray): The SSIM of the plane of every frame.
+  """
+  frames, plane_height, plane_width = reference_plane.shape
+  window_rows = len(range(0, plane_height - 8, 4))
+  window_columns = len(range(0, plane_width - 8, 4))
+  if not window_rows or not window_columns:
+    return numpy.zeros(frames) * numpy.nan
+
+  def window_sums(values):
+    blocks = values.reshape(frames, window_rows + 1, 4,
+                            window_columns + 1, 4).sum(axis=4).sum(axis=2)
+    return (blocks[:, :-1, :-1] + blocks[:, 1:, :-1] +
+            blocks[:, :-1, 1:] + blocks[:, 1:, 1:]).astype(numpy.int64)
+
+  a = reference_plane[:, :(window_rows + 1) * 4, :(window_columns + 1) * 4]
+  b = test_plane[:, :(window_rows + 1) * 4, :(window_columns + 1) * 4]
+  a = a.astype(numpy.int32)
+  b = b.astype(numpy.int32)
+  sum_a = window_sums(a)
+  sum_b = window_sums(b)
+  sum_sq_a = window_sums(a * a)
+  sum_sq_b = window_sums(b * b)
+  sum_axb = window_sums(a * b)
+
+  count = _SSIM_WINDOW_PIXELS
+  sum_a_x_sum_b = sum_a * sum_b
+  ssim_n = ((2 * sum_a_x_sum_b + _SSIM_C1) *
+            (2 * count * sum_axb - 2 * sum_a_x_sum_b + _SSIM_C2))
+  sum_a_sq = sum_a * sum_a
+  sum_b_sq = sum_b * sum_b
+  ssim_d = ((sum_a_sq + sum_b_sq + _SSIM_C1) *
+            (count * sum_sq_a - sum_a_sq + count * sum_sq_b - sum_b_sq +
+             _SSIM_C2))
+  with numpy.errstate(divide='ignore', invalid='ignore'):
+    ssim = numpy.where(ssim_d == 0, sys.float_info.max,
+                       ssim_n / ssim_d.astype(numpy.float64))
+  return ssim.reshape(frames, -1).mean(axis=1)
+
+
+def _read_stats_lines(stats_file_name):
+  """Reads the newline terminated lines of a stats file."""
+  stats_file = open(stats_file_name, 'r')
+  lines = [line[:-1] for line in stats_file if line.endswith('\n')]
+  stats_file.close()
+  return lines
+
+
+def _extract_frame_sequence_number(line):
+  """Extracts the test frame number from a frame_xxxx yyyy stats line."""
+  if ' ' not in line or '_' not in line.split(' ', 1)[0]:
+    return -1
+  return _parse_leading_int(line.split(' ', 1)[0].split('_', 1)[1])
+
+
+def _extract_decoded_frame_number(line):
+  """Extracts the decoded frame number from a frame_xxxx yyyy stats line."""
+  if ' ' not in line:
+    return -1
+  return _parse_leading_int(line.split(' ', 1)[1])
+
+
+def _parse_leading_int(text):
+  """Parses the integer at the start of a string like C's strtol does.
+
+  Return:
+    (int): The parsed integer, or 0 if the string doesn't start with one.
+  """
+  text = text.lstrip()
+  sign_length = 1 if text[:1] in ('+', '-') else 0
+  digits = text[sign_length:]
+  digits = digits[:len(digits) - len(digits.lstrip('0123456789'))]
+  if not digits:
+    return 0
+  return int(text[:sign_length] + digits)
+
+
+def _print_results(label, psnr_values, ssim_values, max_repeated_frames,
+                   max_skipped_frames):
+  """Prints the results in the Chromium perf format."""
+  print 'RESULT Unique_frames_count: %s= %u' % (label, len(psnr_values))
+  if psnr_values:
+    print 'RESULT PSNR: %s= [%s] dB' % (
+        label, ','.join('%f' % value for value in psnr_values))
+    print 'RESULT SSIM: %s= [%s] score' % (
+        label, ','.join('%f' % value for value in ssim_values))
+  print 'RESULT Max_repeated: %s= %d' % (label, max_repeated_frames)
+  print 'RESULT Max_skipped: %s= %d' % (label, max_skipped_frames)
+
+
+def _parse_args():
+  """Registers the command-line options."""
+  usage = 'usage: %prog [options]'
+  parser = optparse.OptionParser(usage=usage)
+
+  parser.add_option('--width', type='int', default=-1,
+                    help=('The width of the reference and test files. '
+                          'Default: %default'))
+  parser.add_option('--height', type='int', default=-1,
+                    help=('The height of the reference and test files. '
+                          'Default: %default'))
+  parser.add_option('--label', type='string', default='MY_TEST',
+                    help='The label to use for the perf output. '
+                         'Default: %default')
+  parser.add_option('--stats_file', type='string', default='stats.txt',
+                    help=('The full name of the file containing the stats '
+                          'after decoding of the received YUV video. '
+                          'Default: %default'))
+  parser.add_option('--reference_file', type='string', default='ref.yuv',
+                    help=('The reference YUV file to compare against. '
+                          'Default: %default'))
+  parser.add_option('--test_file', type='string', default='test.yuv',
+                    help=('The test YUV file to run the analysis for. '
+                          'Default: %default'))
+  parser.add_option('--jobs', type='int', default=1,
+                    help=('The number of processes to compare the frames in. '
+                          'Default: %default'))
+  options, _ = parser.parse_args()
+  if options.jobs < 1:
+    parser.error('--jobs must be at least 1!')
+  return options
+
+
+def _main():
+  """The main function.
+
+  A simple invocation is:
+  ./webrtc/tools/frame_analyzer/frame_analyzer.py --stats_file=stats.txt
+  --reference_file=ref.yuv --test_file=test.yuv --width=320 --height=240
+  """
+  options = _parse_args()
+  print 'You have entered:'
+  print ('height=%d, label=%s, reference_file=%s, stats_file=%s, '
+         'test_file=%s, width=%d, ' % (
+             options.height, options.label, options.reference_file,
+             options.stats_file, options.test_file, options.width))
+
+  if options.width <= 0 or options.height <= 0:
+    print >> sys.stderr, 'Error: width or height cannot be <= 0!'
+    return -1
+  if 'y4m' in options.reference_file:
+    print >> sys.stderr, 'Error: Y4M reference files are not supported.'
+    return -1
+  if not os.path.isfile(options.stats_file):
+    print >> sys.stderr, ('Couldn\'t open stats file for reading: %s' %
+                          options.stats_file)
+    return -1
+
+  frame_pairs = parse_stats_file(options.stats_file)
+  psnr_values, ssim_values = analyze_frames(
+      options.reference_file, options.test_file, options.width,
+      options.height, frame_pairs, jobs=options.jobs)
+  max_repeated_frames, max_skipped_frames = (
+      calculate_max_repeated_and_skipped_frames(options.stats_file))
+  _print_results(options.label, psnr_values, ssim_values, max_repeated_frames,
+                 max_skipped_frames)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(_main())
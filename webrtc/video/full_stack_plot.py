@@ -23,12 +23,24 @@ Usage examples:
   ./full_stack_plot.py -c 200 -df psnr vp8.txt vp9.txt --next \\
                        -c 200 -df sender_time vp8.txt vp9.txt --next \\
                        -c 200 -df end_to_end vp8.txt vp9.txt
+
+  Render all the graphs of a manifest file, containing arguments like the ones
+  above, to PNG files in parallel processes, without showing any windows.
+  ./full_stack_plot.py --manifest nightly.txt --jobs 16 --output_dir out
+
+The parsed samples of every file are cached in <file>.npz next to it, which
+is used as long as the file is not modified.
 """
 
 import argparse
-from collections import defaultdict
 import itertools
+import multiprocessing
+import os
+import shlex
 import sys
+import zipfile
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
 import numpy
 
@@ -55,6 +67,9 @@ FIELD_MASK = 255
 HIDE_DROPPED = 256
 RIGHT_Y_AXIS = 512
 
+# Version of the binary sample cache format, stored in the cache files.
+_CACHE_VERSION = 1
+
 # internal field id, field name, title
 _fields = [
     # Raw
@@ -96,32 +111,122 @@ class PlotLine(object):
     self.flags = flags
 
 
+class _Columns(dict):
+  """Sample columns by field ID.
+
+  Fields missing from the sample file are empty, so they are plotted as empty
+  lines.
+  """
+
+  def __missing__(self, field_id):
+    return numpy.zeros(0)
+
+
+class _CachedColumns(_Columns):
+  """Sample columns which are read from a cache file on first access."""
+
+  def __init__(self, cache):
+    super(_CachedColumns, self).__init__()
+    self._cache = cache
+
+  def __missing__(self, field_id):
+    try:
+      self[field_id] = self._cache["field_{}".format(field_id)]
+    except KeyError:
+      return super(_CachedColumns, self).__missing__(field_id)
+    return self[field_id]
+
+
 class Data(object):
-  """Object representing one full stack test."""
+  """Object representing one full stack test.
 
-  def __init__(self, filename):
-    self.title = ""
-    self.length = 0
-    self.samples = defaultdict(list)
+  The samples are read on first use. They are stored column-wise in a binary
+  cache next to the sample file, which is used instead of parsing the sample
+  file again as long as the sample file's modification time and size match.
+  """
 
-    self._read_samples(filename)
+  def __init__(self, filename):
+    self.filename = filename
+    self._title = None
+    self._length = None
+    self._samples = None
+
+  @property
+  def title(self):
+    self.load()
+    return self._title
+
+  @property
+  def length(self):
+    self.load()
+    return self._length
+
+  @property
+  def samples(self):
+    self.load()
+    return self._samples
+
+  def __reduce__(self):
+    # Only the file name is sent to worker processes, which load the samples
+    # into their own cache, from the binary cache file written by the parent.
+    return (_load_file, (self.filename,))
+
+  def load(self):
+    """Loads the samples, updating the cache file if needed."""
+    if self._samples is not None:
+      return
+    if not self._read_cache():
+      self._read_samples(self.filename)
+      self._write_cache()
+
+  def _cache_key(self):
+    stat = os.stat(self.filename)
+    return numpy.array([_CACHE_VERSION, stat.st_mtime, stat.st_size])
+
+  def _read_cache(self):
+    """Reads the samples from the cache file, if it is up to date."""
+    try:
+      cache = numpy.load(_cache_filename(self.filename))
+      if not numpy.array_equal(cache["key"], self._cache_key()):
+        return False
+      self._title = str(cache["title"])
+      self._length = int(cache["length"])
+    except (IOError, OSError, KeyError, ValueError, zipfile.BadZipfile):
+      return False
+    self._samples = _CachedColumns(cache)
+    return True
+
+  def _write_cache(self):
+    """Writes the samples to the cache file, ignoring failures."""
+    cache_filename = _cache_filename(self.filename)
+    temp_filename = "{}.{}.tmp".format(cache_filename, os.getpid())
+    columns = {"field_{}".format(field_id): values
+               for field_id, values in self._samples.iteritems()}
+    try:
+      with open(temp_filename, "wb") as f:
+        numpy.savez(f, key=self._cache_key(), title=self._title,
+                    length=self._length, **columns)
+      if os.path.exists(cache_filename):
+        os.remove(cache_filename)
+      os.rename(temp_filename, cache_filename)
+    except (IOError, OSError):
+      if os.path.exists(temp_filename):
+        os.remove(temp_filename)
 
   def _read_samples(self, filename):
     """Reads graph data from the given file."""
     f = open(filename)
-    it = iter(f)
 
-    self.title = it.next().strip()
-    self.length = int(it.next())
-    field_names = [name.strip() for name in it.next().split()]
+    self._title = f.readline().strip()
+    self._length = int(f.readline())
+    field_names = [name.strip() for name in f.readline().split()]
     field_ids = [name_to_id[name] for name in field_names]
 
-    for field_id in field_ids:
-      self.samples[field_id] = [0.0] * self.length
-
-    for sample_id in xrange(self.length):
-      for col, value in enumerate(it.next().split()):
-        self.samples[field_ids[col]][sample_id] = float(value)
+    values = numpy.fromstring(f.read(), sep=" ")
+    values = values[:self._length * len(field_ids)].reshape(
+        self._length, len(field_ids))
+    self._samples = _Columns((field_id, values[:, col].copy())
+                             for col, field_id in enumerate(field_ids))
 
     self._subtract_first_input_time()
     self._generate_additional_data()
@@ -129,37 +234,38 @@ class Data(object):
     f.close()
 
   def _subtract_first_input_time(self):
-    offset = self.samples[INPUT_TIME][0]
+    offset = self._samples[INPUT_TIME][0]
     for field in [INPUT_TIME, SEND_TIME, RECV_TIME, RENDER_TIME]:
-      if field in self.samples:
-        self.samples[field] = [x - offset for x in self.samples[field]]
+      if field in self._samples:
+        self._samples[field] -= offset
 
   def _generate_additional_data(self):
     """Calculates sender time, receiver time etc. from the raw data."""
-    s = self.samples
-    last_render_time = 0
-    for field_id in [SENDER_TIME, RECEIVER_TIME, END_TO_END, RENDERED_DELTA]:
-      s[field_id] = [0] * self.length
-
-    for k in range(self.length):
-      s[SENDER_TIME][k] = s[SEND_TIME][k] - s[INPUT_TIME][k]
-
-      decoded_time = s[RENDER_TIME][k]
-      s[RECEIVER_TIME][k] = decoded_time - s[RECV_TIME][k]
-      s[END_TO_END][k] = decoded_time - s[INPUT_TIME][k]
-      if not s[DROPPED][k]:
-        if k > 0:
-          s[RENDERED_DELTA][k] = decoded_time - last_render_time
-        last_render_time = decoded_time
+    s = self._samples
+    decoded_time = s[RENDER_TIME]
+    s[SENDER_TIME] = s[SEND_TIME] - s[INPUT_TIME]
+    s[RECEIVER_TIME] = decoded_time - s[RECV_TIME]
+    s[END_TO_END] = decoded_time - s[INPUT_TIME]
+
+    # The time since the previous rendered frame, for rendered frames other
+    # than the first frame.
+    rendered = numpy.flatnonzero(s[DROPPED] == 0)
+    render_times = decoded_time[rendered]
+    s[RENDERED_DELTA] = numpy.zeros(self._length)
+    s[RENDERED_DELTA][rendered] = numpy.diff(
+        numpy.concatenate(([0.0], render_times)))
+    if self._length:
+      s[RENDERED_DELTA][0] = 0
 
   def _hide(self, values):
     """
-    Replaces values for dropped frames with None.
+    Replaces values for dropped frames with NaN.
     These values are then skipped by the plot() method.
     """
 
-    return [None if self.samples[DROPPED][k] else values[k]
-            for k in range(len(values))]
+    if not len(values):
+      return values
+    return numpy.where(self.samples[DROPPED] != 0, numpy.nan, values)
 
   def add_samples(self, config, target_lines_list):
     """Creates graph lines from the current data set with given config."""
@@ -180,9 +286,13 @@ class Data(object):
           values, field & ~FIELD_MASK))
 
 
+def _cache_filename(filename):
+  return filename + ".npz"
+
+
 def average_over_cycle(values, length):
   """
-  Returns the list:
+  Returns the array:
     [
         avg(values[0], values[length], ...),
         avg(values[1], values[length + 1], ...),
@@ -190,20 +300,20 @@ def average_over_cycle(values, length):
         avg(values[length - 1], values[2 * length - 1], ...),
     ]
 
-  Skips None values when calculating the average value.
+  Skips NaN values when calculating the average value.
   """
 
-  total = [0.0] * length
-  count = [0] * length
-  for k in range(len(values)):
-    if values[k] is not None:
-      total[k % length] += values[k]
-      count[k % length] += 1
+  cycles = -(-len(values) // length)
+  padded = numpy.empty(cycles * length)
+  padded.fill(numpy.nan)
+  padded[:len(values)] = values
+  padded = padded.reshape(cycles, length)
 
-  result = [0.0] * length
-  for k in range(length):
-    result[k] = total[k] / count[k] if count[k] else None
-  return result
+  valid = ~numpy.isnan(padded)
+  total = numpy.where(valid, padded, 0.0).sum(axis=0)
+  count = valid.sum(axis=0)
+  with numpy.errstate(divide="ignore", invalid="ignore"):
+    return numpy.where(count > 0, total / count, numpy.nan)
 
 
 class PlotConfig(object):
@@ -283,18 +393,16 @@ class PlotConfig(object):
 
 
 def load_files(filenames):
-  result = []
-  for filename in filenames:
-    if filename in load_files.cache:
-      result.append(load_files.cache[filename])
-    else:
-      data = Data(filename)
-      load_files.cache[filename] = data
-      result.append(data)
-  return result
+  return [_load_file(filename) for filename in filenames]
 load_files.cache = {}
 
 
+def _load_file(filename):
+  if filename not in load_files.cache:
+    load_files.cache[filename] = Data(filename)
+  return load_files.cache[filename]
+
+
 def get_parser():
   class CustomAction(argparse.Action):
 
@@ -410,5 +518,100 @@ def show_or_save_plots(plot_configs):
 
   plt.show()
 
+
+def _render_plot(config):
+  """Renders a graph to its output file without a GUI backend."""
+  fig = Figure(figsize=(14.0, 10.0))
+  FigureCanvasAgg(fig)
+  ax = fig.add_subplot(1, 1, 1)
+
+  ax.set_title(config.title)
+  config.plot(ax)
+  print "Saving to", config.output_filename
+  fig.savefig(config.output_filename)
+
+
+def _clear_file_cache():
+  # Forked workers must not share the open cache files of the parent.
+  load_files.cache.clear()
+
+
+def render_plots(plot_configs, jobs):
+  """Renders graphs to files in parallel processes.
+
+  Every data file is parsed only once, by this process, which also writes the
+  binary sample caches. The worker processes then load the samples from the
+  caches.
+  """
+  for config in plot_configs:
+    for data in config.data_list:
+      data.load()
+
+  if jobs == 1:
+    for config in plot_configs:
+      _render_plot(config)
+    return
+
+  pool = multiprocessing.Pool(jobs, initializer=_clear_file_cache)
+  try:
+    pool.map(_render_plot, plot_configs, chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+
+
+def plot_configs_from_manifest(filename, output_dir, output_format):
+  """Generates plot configs for a manifest file of graph arguments.
+
+  The manifest contains the command line arguments of the graphs, separated by
+  -n/--next. Arguments can be spread over several lines and lines starting
+  with # are ignored. Graphs without -O/--output_filename are saved to
+  <output_dir>/graph_<index>.<output_format>.
+  """
+  with open(filename) as f:
+    args = shlex.split(f.read(), comments=True)
+
+  plot_configs = plot_configs_from_args(args)
+  for index, config in enumerate(plot_configs):
+    if not config.output_filename:
+      config.output_filename = os.path.join(
+          output_dir, "graph_{:03d}.{}".format(index, output_format))
+  return plot_configs
+
+
+def get_batch_parser():
+  parser = argparse.ArgumentParser(add_help=False)
+  parser.add_argument(
+      "--manifest",
+      help="Render the graphs of a manifest file of arguments instead of the "
+           "command line ones, without showing any windows.")
+  parser.add_argument(
+      "--jobs", type=int, default=multiprocessing.cpu_count(),
+      help="Number of processes rendering the graphs of the manifest.")
+  parser.add_argument(
+      "--output_dir", default=".",
+      help="Directory to save the graphs without an output filename to.")
+  parser.add_argument(
+      "--format", choices=["png", "svg"], default="png",
+      help="Format of the graphs without an output filename.")
+  return parser
+
+
+def main(argv):
+  batch_args, plot_args = get_batch_parser().parse_known_args(argv)
+  if not batch_args.manifest:
+    show_or_save_plots(plot_configs_from_args(plot_args))
+    return
+
+  if batch_args.jobs < 1:
+    raise Exception("--jobs must be at least 1")
+  if not os.path.isdir(batch_args.output_dir):
+    os.makedirs(batch_args.output_dir)
+  render_plots(plot_configs_from_manifest(batch_args.manifest,
+                                          batch_args.output_dir,
+                                          batch_args.format),
+               batch_args.jobs)
+
+
 if __name__ == "__main__":
-  show_or_save_plots(plot_configs_from_args(sys.argv[1:]))
+  main(sys.argv[1:])